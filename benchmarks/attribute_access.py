@@ -0,0 +1,32 @@
+"""Attribute read cost of loaded models, plain attributes and decoded datetime attributes
+
+Run from the repository root: python -m benchmarks.attribute_access [path to another checkout to compare against]
+"""
+import sys
+import timeit
+
+if len(sys.argv) > 1:
+    sys.path.insert(0, sys.argv[1])
+
+from elvis.models import TimberBatch, TransportOrder  # noqa: E402
+
+from tests import fixtures  # noqa: E402
+
+
+def main(reads=100000):
+    namespace = {
+        'batch': TimberBatch(dict_data=fixtures.batch(1)),
+        'order': TransportOrder(dict_data=fixtures.transport_order()),
+    }
+
+    for label, stmt in [
+        ('plain (TimberBatch.DocNumber)', 'batch.DocNumber'),
+        ('datetime (TimberBatch.DocDate)', 'batch.DocDate'),
+        ('datetime (TransportOrder.Deadline)', 'order.Deadline'),
+    ]:
+        seconds = min(timeit.repeat(stmt, globals=namespace, number=reads, repeat=3))
+        print('%-36s %8.1f ns' % (label, seconds / reads * 1e9))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+"""Memory used per object by the full models and their slot based compact versions
+
+Run from the repository root: python -m benchmarks.compact_models [objects]
+"""
+import sys
+import tracemalloc
+
+from elvis.models import (
+    CompactPack, CompactTimberAssortment, CompactTransportOrderListItem, CompactWaybillListItem, Pack,
+    TimberAssortment, TransportOrderListItem, WaybillListItem,
+)
+
+from tests import fixtures
+
+
+def assortment_without_packs(i):
+    data = fixtures.assortment(i)
+    data['Packs'] = []
+    return data
+
+
+MODELS = [
+    ('Pack', fixtures.pack, Pack, CompactPack),
+    ('TimberAssortment', assortment_without_packs, TimberAssortment, CompactTimberAssortment),
+    ('WaybillListItem', lambda i: fixtures.waybill_list_item('W%d' % i), WaybillListItem, CompactWaybillListItem),
+    ('TransportOrderListItem', lambda i: fixtures.transport_order_list_item('T%d' % i), TransportOrderListItem,
+     CompactTransportOrderListItem),
+]
+
+
+def measure(make_object, data):
+    tracemalloc.start()
+    objects = [make_object(item) for item in data]  # noqa: F841
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    return size / len(data)
+
+
+def main(count=100000):
+    for label, make_data, model, compact_model in MODELS:
+        full = measure(lambda item: model(dict_data=item), [make_data(i) for i in range(count)])
+        compact = measure(compact_model, [make_data(i) for i in range(count)])
+        print('%-24s %6.0f B -> %6.0f B per object' % (label, full, compact))
+
+
+if __name__ == '__main__':
+    main(*[int(x) for x in sys.argv[1:]])
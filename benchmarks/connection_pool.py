@@ -0,0 +1,39 @@
+"""Pooled ElvisClient requests vs. a new connection per request
+
+Run from the repository root: python -m benchmarks.connection_pool [calls]
+"""
+import sys
+import time
+
+import requests
+
+from elvis.api import ElvisClient
+
+from . import stub
+
+
+def unpooled(api_url, calls):
+    # What ElvisClient did before it kept a requests.Session: a new connection for every request
+    for _ in range(calls):
+        requests.get(api_url % 'GetInformation', headers={'Authorization': 'x'}, timeout=120).json()
+
+
+def pooled(api_url, calls):
+    with ElvisClient(api_url, '1', session_token='x') as client:
+        for _ in range(calls):
+            client.server_info()
+
+
+def main(calls=2000):
+    server, api_url = stub.start()
+
+    for label, func in [('new connection per request', unpooled), ('pooled ElvisClient', pooled)]:
+        started = time.perf_counter()
+        func(api_url, calls)
+        print('%-28s %6.0f calls/s' % (label, calls / (time.perf_counter() - started)))
+
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main(*[int(x) for x in sys.argv[1:]])
@@ -0,0 +1,48 @@
+"""Cost of loading a large Waybill response when only some of its fields are read
+
+Run from the repository root: python -m benchmarks.lazy_models [path to another checkout to compare against]
+"""
+import json
+import sys
+import time
+import tracemalloc
+
+if len(sys.argv) > 1:
+    sys.path.insert(0, sys.argv[1])
+
+from elvis.models import Waybill  # noqa: E402
+
+from tests import fixtures  # noqa: E402
+
+
+def timed(label, func, rounds=50):
+    started = time.perf_counter()
+    for _ in range(rounds):
+        func()
+    print('%-26s %8.3f ms' % (label, (time.perf_counter() - started) / rounds * 1000))
+
+
+def main():
+    data = json.dumps(fixtures.waybill(n_batches=200, n_assortments=10, n_packs=5))
+
+    def number_and_status():
+        waybill = Waybill(dict_data=json.loads(data))
+        return waybill.Number, waybill.Status
+
+    def full_access():
+        waybill = Waybill(dict_data=json.loads(data))
+        return [batch.Assortments for batch in waybill.ReceivedAssortments], waybill.Shipments, waybill.Transporter
+
+    timed('json.loads only', lambda: json.loads(data))
+    timed('load, Number and Status', number_and_status)
+    timed('load, nested models', full_access)
+
+    parsed = [json.loads(data) for _ in range(20)]
+    tracemalloc.start()
+    waybills = [Waybill(dict_data=item, adopt=True) for item in parsed]  # noqa: F841
+    print('%-26s %8.1f KB' % ('20 waybills, unread', tracemalloc.get_traced_memory()[0] / 1024))
+    tracemalloc.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""Local stand-in for the ELVIS proxy used by the benchmarks
+
+Endpoints are registered with the `handler` decorator, a handler gets the decoded request body and returns a status
+code and the response payload.
+"""
+import json
+import socketserver
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+
+HANDLERS = {}
+
+
+def handler(endpoint):
+    def decorator(func):
+        HANDLERS[endpoint] = func
+        return func
+
+    return decorator
+
+
+@handler('GetInformation')
+def get_information(body):
+    return 200, {'GetInformationResult': {'Version': '1.1'}}
+
+
+class StubServer(socketserver.ThreadingMixIn, HTTPServer):
+    # http.server.ThreadingHTTPServer needs Python 3.7
+    daemon_threads = True
+
+
+class StubRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # Keep-alive, like the proxy
+    disable_nagle_algorithm = True  # Headers and body are written separately
+
+    def log_message(self, *args):
+        pass
+
+    def handle_request(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        data = self.rfile.read(length) if length else b''
+
+        endpoint = self.path.strip('/').split('?')[0]
+        func = HANDLERS.get(endpoint)
+        if func is None:
+            status, payload = 404, {'Message': 'Unknown endpoint %s' % endpoint}
+        else:
+            status, payload = func(json.loads(data) if data else None)
+
+        content = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    do_GET = do_POST = handle_request
+
+
+def start():
+    """Start the stub in a background thread, returns the server and the api_url for ElvisClient"""
+    server = StubServer(('127.0.0.1', 0), StubRequestHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    return server, 'http://127.0.0.1:%d/%%s' % server.server_address[1]
@@ -0,0 +1,34 @@
+"""ELVIS timestamp decoding and encoding, the current codec vs. the string slicing one it replaced
+
+Run from the repository root: python -m benchmarks.timestamp_codec [timestamps]
+"""
+import random
+import sys
+import timeit
+
+from elvis.utils import decode_many, encode_many, numpy
+
+from tests.test_utils import legacy_decode, legacy_encode
+
+
+def main(count=100000):
+    rng = random.Random(2)
+    timestamps = ['/Date(%d+0300)/' % rng.randint(1577836800000, 1640995200000) for _ in range(count)]
+    values = decode_many(timestamps)
+
+    cases = [
+        ('decode, legacy', lambda: [legacy_decode(timestamp) for timestamp in timestamps]),
+        ('decode_many', lambda: decode_many(timestamps)),
+        ('encode, legacy', lambda: [legacy_encode(value) for value in values]),
+        ('encode_many', lambda: encode_many(values)),
+    ]
+    if numpy is not None:
+        cases.insert(2, ('decode_many as_numpy', lambda: decode_many(timestamps, as_numpy=True)))
+
+    for label, func in cases:
+        seconds = min(timeit.repeat(func, number=1, repeat=3))
+        print('%-22s %8.1f ms / %d' % (label, seconds * 1000, count))
+
+
+if __name__ == '__main__':
+    main(*[int(x) for x in sys.argv[1:]])
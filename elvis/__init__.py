@@ -1,2 +1,5 @@
 __version__ = '1.1.0'
-__all__ = ['api', 'enums', 'models']
+__all__ = [
+    'api', 'async_api', 'cache', 'columnar', 'encoding', 'enums', 'index', 'models', 'payloads', 'sync', 'tokens',
+    'watcher',
+]
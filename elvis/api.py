@@ -1,20 +1,23 @@
 # coding:utf-8
 
 import base64
-from copy import copy
-import json
+from concurrent.futures import ThreadPoolExecutor
+import time
 import requests
-from datetime import datetime
-from decimal import Decimal
+from requests.adapters import HTTPAdapter
+from datetime import timedelta
 
 from django.utils.encoding import force_text
 
-from .enums import WarehouseType, AssortmentType, TransportOrderRoleContext, WaybillRoleContext
+from .enums import (
+    AssortmentType, TransportOrderRoleContext, WaybillRoleContext, WaybillListItemSearchField,
+)
 from .models import (
-    FilterItem, SortItem, Address, ElvisModel, TransportOrderListPage, TransportOrder, TransportOrderStatusInfo,
+    FilterItem, SortItem, TransportOrderListPage, TransportOrder, TransportOrderStatusInfo,
     TimberWarehouse, Waybill, WaybillStatusInfo, WaybillListPage, TimberAssortment, FineMeasurementFile,
 )
-from .utils import DATE_PREFIX, DATE_SUFFIX, ELVIS_TIMEZONE
+from .cache import ReferenceDataCache, WarehouseCache
+from .encoding import Base64JSONBody, ElvisEncoder, get_default_json_backend  # noqa: F401
 
 
 class ElvisException(Exception):
@@ -59,56 +62,19 @@ class ElvisException(Exception):
         return "ElvisException %s: %s" % (self.message, self.reformat_elvis_exception_text(self.raw))
 
 
-class ElvisEncoder(json.JSONEncoder):
-    ELVIS_OBJECTS = (
-        FilterItem,
-        SortItem,
-        WarehouseType,
-        Address,
-        ElvisModel
-    )
-
-    def default(self, obj):
-        if isinstance(obj, Decimal):
-            return float(obj)
-
-        if isinstance(obj, datetime):
-            # Elvis timestamp offsets are from Tallinn time
-            timezone_offset = obj.utcoffset() - obj.astimezone(ELVIS_TIMEZONE).utcoffset()
-
-            timezone_offset_hours = timezone_offset.total_seconds() // 3600
-            timezone_offset_minutes = (timezone_offset.total_seconds() - timezone_offset_hours * 3600) // 60
-            return '%s%d+%02d%02d%s' % (
-                DATE_PREFIX,
-                (obj - datetime(1970, 1, 1)).total_seconds() * 1000,
-                timezone_offset_hours,
-                timezone_offset_minutes,
-                DATE_SUFFIX,
-            )
-
-        if not isinstance(obj, ElvisEncoder.ELVIS_OBJECTS):
-            return super(ElvisEncoder, self).default(obj)
-
-        ret = copy(obj.__dict__)
-
-        if isinstance(obj, FineMeasurementFile):
-            del ret['Data']
+class BaseElvisClient(object):
+    """Configuration, certificate handling and request/response (de)serialization shared by the ELVIS clients"""
 
-        if 'Id' in ret and ret['Id'] is None:
-            del ret['Id']
-
-        if '_already_loaded' in ret:
-            del ret['_already_loaded']
-
-        return ret
-
-
-class ElvisClient(object):
     DEFAULT_REQUEST_TIMEOUT = 120  # 120 seconds
+    DEFAULT_CONNECT_TIMEOUT = None  # Same as request timeout
+
+    DEFAULT_POOL_MAXSIZE = 10  # Max connections kept open per host
 
     def __init__(
         self, api_url, person_code, certificate_pass="",
         session_token=None, request_timeout=DEFAULT_REQUEST_TIMEOUT,
+        connect_timeout=DEFAULT_CONNECT_TIMEOUT, pool_maxsize=DEFAULT_POOL_MAXSIZE, keep_alive=True,
+        json_backend=None,
     ):
         self.api_url = api_url
 
@@ -117,6 +83,13 @@ class ElvisClient(object):
         self.certificate_password = certificate_pass or ""
         self.session_token = session_token or None
         self.request_timeout = request_timeout
+        self.connect_timeout = connect_timeout
+
+        self.pool_maxsize = pool_maxsize
+        self.keep_alive = keep_alive
+
+        # See elvis.encoding, pass json_backend=OrjsonBackend() to use orjson
+        self.json_backend = json_backend or get_default_json_backend()
 
         assert self.person_code, "Person code must be provided"
 
@@ -144,12 +117,7 @@ class ElvisClient(object):
         # Note: may need validation here?
         self.certificate = certificate_data
 
-    def __request(self, endpoint, method, attrs=None):
-
-        func = requests.get
-        if method.lower() == "post":
-            func = requests.post
-
+    def _get_request_headers(self):
         headers = {
             'Content-type': 'application/json',
             'Accept': 'text/plain',
@@ -158,23 +126,23 @@ class ElvisClient(object):
         if self.session_token:
             headers['Authorization'] = self.session_token
 
-        if method.lower() == "post":
-            result = func(self.api_url % endpoint, data=json.dumps(attrs, cls=ElvisEncoder), headers=headers,
-                          timeout=self.request_timeout)
-        else:
-            result = func(self.api_url % endpoint, params=attrs, headers=headers, timeout=self.request_timeout)
+        return headers
 
+    def _encode_request_data(self, attrs):
+        return self.json_backend.dumps(attrs)
+
+    def _decode_response(self, status_code, content):
         error_message = ""
         try:
-            json_data = json.loads(result.text)
+            json_data = self.json_backend.loads(content)
         except ValueError:
             error_message = "not json"
-            json_data = result.text
+            json_data = content.decode('utf-8', 'replace')
 
-        if result.status_code == 200:
+        if status_code == 200:
             success = True
         else:
-            error_message = "Bad status code: %d" % result.status_code,
+            error_message = "Bad status code: %d" % status_code,
             success = False
 
         result = {
@@ -187,19 +155,230 @@ class ElvisClient(object):
 
         return result
 
-    # ENDPOINTS
+    @staticmethod
+    def _clean_search_arguments(filters, sorting):
+        assert isinstance(filters, (list, tuple, FilterItem)), 'Filters must be a list or tuple'
+        if isinstance(filters, FilterItem):
+            filters = (filters, )
 
-    def server_info(self):
-        assert self.session_token, "No valid session available"
+        assert not list(filter(lambda x: not isinstance(x, FilterItem), filters)), \
+            'All filters must be instances of FilterItem'
 
-        result = self.__request("GetInformation", "GET")
+        assert isinstance(sorting, (list, tuple, SortItem)), 'Sorting must be a list or tuple'
+        if isinstance(sorting, SortItem):
+            sorting = (sorting, )
 
-        if result["Success"] and result["raw"].get("GetInformationResult", None):
-            return result["raw"]["GetInformationResult"]
+        assert not list(filter(lambda x: not isinstance(x, SortItem), sorting)), \
+            'All sorting rules must be instances of SortItem'
+
+        return filters, sorting
+
+
+class ElvisClient(BaseElvisClient):
+    DEFAULT_POOL_CONNECTIONS = 1  # Number of hosts to keep connection pools for
+    DEFAULT_TOKEN_TTL = 60 * 60  # Seconds a stored session token is reused if the proxy doesn't say otherwise
+    DEFAULT_REFERENCE_DATA_TTL = 24 * 60 * 60  # Seconds cached reference data is used before it's fetched again
+    DEFAULT_WAREHOUSE_CACHE_SIZE = 500  # Max warehouses kept by the warehouse cache
+    DEFAULT_WAREHOUSE_CACHE_TTL = 5 * 60  # Seconds a cached warehouse is used before it's fetched again
+    DEFAULT_PAGE_SIZE = 100  # Page size used by the iter_* and *_all helpers
+    DEFAULT_WORKERS = 4  # Concurrent requests made by the *_all and bulk get helpers, keep below pool_maxsize
+
+    DEFAULT_SHARD_SIZE = 500  # Max documents per time window in search_waybills_sharded
+    DEFAULT_MIN_SHARD_DURATION = timedelta(minutes=1)  # Windows shorter than that are not split further
+
+    def __init__(self, *args, **kwargs):
+        self.pool_connections = kwargs.pop('pool_connections', self.DEFAULT_POOL_CONNECTIONS)
+
+        # Optional elvis.tokens.TokenStore used to share session tokens between clients and processes
+        self.token_store = kwargs.pop('token_store', None)
+        self.token_ttl = kwargs.pop('token_ttl', self.DEFAULT_TOKEN_TTL)
+        self.session_tag = 'default'
+
+        # Reference data (assortment types) cache, reference_data_path enables persisting it between runs
+        self.reference_data = ReferenceDataCache(
+            kwargs.pop('reference_data_ttl', self.DEFAULT_REFERENCE_DATA_TTL),
+            path=kwargs.pop('reference_data_path', None),
+        )
+
+        # Optional elvis.cache.WaybillCache used by get_waybill_cached
+        self.waybill_cache = kwargs.pop('waybill_cache', None)
+
+        # Warehouse cache used by get_warehouse_cached, insert_warehouse and delete_warehouse invalidate it
+        self.warehouse_cache = WarehouseCache(
+            kwargs.pop('warehouse_cache_size', self.DEFAULT_WAREHOUSE_CACHE_SIZE),
+            kwargs.pop('warehouse_cache_ttl', self.DEFAULT_WAREHOUSE_CACHE_TTL),
+        )
+
+        super(ElvisClient, self).__init__(*args, **kwargs)
+
+        self.http_session = self.create_http_session()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def create_http_session(self):
+        """Create the HTTP session used for all requests, override to customize transport (proxies, retries, ...)
+
+        Connections are kept alive and reused between calls, so only the first request to the proxy pays for
+        the TCP (and TLS) handshake.
+        """
+        session = requests.Session()
+
+        adapter = HTTPAdapter(pool_connections=self.pool_connections, pool_maxsize=self.pool_maxsize)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+
+        if not self.keep_alive:
+            session.headers['Connection'] = 'close'
+
+        return session
+
+    def close(self):
+        """Close all pooled connections, the client opens new ones if it is used again"""
+        self.http_session.close()
+
+    def get_request_timeout(self):
+        if self.connect_timeout is None:
+            return self.request_timeout
+
+        return self.connect_timeout, self.request_timeout
+
+    @staticmethod
+    def _iter_pages(fetch_page, page_size):
+        """Yield items of consecutive pages, the next page is fetched in the background while the current is consumed
+
+        :param fetch_page: callable(start, limit) returning the list of items on that page
+        """
+        assert page_size > 0, 'Page size must be positive'
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            start = 0
+            future = executor.submit(fetch_page, start, page_size)
+
+            while future is not None:
+                items = future.result()
+
+                # An empty page is the last one, pages can be shorter than page_size if the proxy caps the limit
+                future = None
+                if items:
+                    start += len(items)
+                    future = executor.submit(fetch_page, start, page_size)
+
+                for item in items:
+                    yield item
+
+    @staticmethod
+    def _fetch_all_pages(fetch_page, page_size, workers):
+        """Fetch every page of a search concurrently and return the merged items in sort order
+
+        The first page is requested with show_count to learn how many pages there are, the rest are requested in
+        parallel from a thread pool and concatenated in page order.
+
+        Items that move between pages while the scan runs (new or deleted documents) are handled as follows:
+
+        - items are de-duplicated by Number, the first occurrence (by sort order) wins
+        - the search is continued page by page after the counted pages until an empty page is returned, so documents
+          added during the scan are not cut off
+        - if the proxy caps the limit (the first page is shorter than page_size while there are more items) the
+          pages are requested at offsets of the capped size
+        - documents that move towards the start of the list past a page that was already fetched can still be missed,
+          sort by CreatedOn ascending to keep the positions of existing documents stable while new ones are added
+
+        :param fetch_page: callable(start, limit, show_count) returning a list page (with Items and TotalCount)
+        """
+        assert page_size > 0, 'Page size must be positive'
+        assert workers > 0, 'At least one worker is needed'
+
+        first_page = fetch_page(0, page_size, True)
+        pages = [first_page.Items]
+
+        total_count = first_page.TotalCount or 0
+        step = len(first_page.Items) or page_size
+        starts = list(range(step, total_count, step))
+
+        if starts:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                pages.extend(executor.map(lambda start: fetch_page(start, page_size, False).Items, starts))
+
+        start = (starts[-1] if starts else 0) + len(pages[-1])
+        while pages[-1]:
+            pages.append(fetch_page(start, page_size, False).Items)
+            start += len(pages[-1])
+
+        seen = set()
+        items = []
+        for page in pages:
+            for item in page:
+                if item.Number not in seen:
+                    seen.add(item.Number)
+                    items.append(item)
+
+        return items
+
+    @staticmethod
+    def _map_concurrently(func, args, workers):
+        """Call func for every argument using a thread pool, return results in input order
+
+        Calls that fail with an ElvisException or a requests exception don't abort the batch, the exception is
+        returned in place of the result instead. Other exceptions (programming errors) are raised.
+        """
+        assert workers > 0, 'At least one worker is needed'
+
+        def call(arg):
+            try:
+                return func(arg)
+            except (ElvisException, requests.RequestException) as e:
+                return e
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(call, args))
+
+    def __request(self, endpoint, method, attrs=None):
+        result = self.__send(endpoint, method, attrs)
+
+        can_refresh = self.token_store is not None and self.session_token and endpoint != "Authorize"
+        if result.status_code == 401 and can_refresh:
+            # Token has expired, get a new one (or the one another worker already got) and retry once
+            self.__refresh_session_token(self.session_token)
+            result = self.__send(endpoint, method, attrs)
+
+        return self._decode_response(result.status_code, result.content)
+
+    def __send(self, endpoint, method, attrs):
+        headers = self._get_request_headers()
+
+        if method.lower() == "post":
+            data = attrs if isinstance(attrs, Base64JSONBody) else self._encode_request_data(attrs)
+            return self.http_session.post(self.api_url % endpoint, data=data,
+                                          headers=headers, timeout=self.get_request_timeout())
         else:
-            raise ElvisException("Server information not available, it was added in proxy version 1.1.*", raw=result)
+            return self.http_session.get(self.api_url % endpoint, params=attrs, headers=headers,
+                                         timeout=self.get_request_timeout())
 
-    def authorize(self, session_tag='default'):
+    def __refresh_session_token(self, stale_token=None):
+        """Take a token from the token store or authorize and store the new token
+
+        Runs under the store lock so that only one client (thread or process) authorizes at a time, the others reuse
+        the token it stored.
+        """
+        key = self.token_store.make_key(self.person_code, self.session_tag)
+
+        with self.token_store.lock(key):
+            token = self.token_store.get(key)
+
+            if token and token != stale_token:
+                self.session_token = token
+                return
+
+            auth_result = self.__authorize(self.session_tag)
+            self.session_token = auth_result["access_token"]
+            expires_in = auth_result.get("expires_in") or self.token_ttl
+            self.token_store.set(key, self.session_token, time.time() + expires_in)
+
+    def __authorize(self, session_tag):
         assert self.certificate, "Certificate must be provided"
 
         result = self.__request("Authorize", "POST", {
@@ -209,13 +388,42 @@ class ElvisClient(object):
             'connectionTag': session_tag,
         })
 
-        if result["Success"] and result["raw"].get("AuthorizeResult", None) and result['raw']['AuthorizeResult'].get('Success'):
-            auth_result = result["raw"].get("AuthorizeResult")
-            self.session_token = auth_result["access_token"]
-            return True
+        auth_result = result["raw"].get("AuthorizeResult", None) if result["Success"] else None
+        if auth_result and auth_result.get('Success'):
+            return auth_result
         else:
             raise ElvisException("Authorization failed:", result)
 
+    # ENDPOINTS
+
+    def server_info(self):
+        assert self.session_token, "No valid session available"
+
+        result = self.__request("GetInformation", "GET")
+
+        if result["Success"] and result["raw"].get("GetInformationResult", None):
+            return result["raw"]["GetInformationResult"]
+        else:
+            raise ElvisException("Server information not available, it was added in proxy version 1.1.*", raw=result)
+
+    def authorize(self, session_tag='default'):
+        """Get a session token for the session tag
+
+        With a token_store the token stored by an earlier authorization (possibly in another process) is reused while
+        it is valid, the certificate is only sent to the proxy when a new token is needed.
+        """
+        self.session_tag = session_tag
+
+        if self.token_store is not None:
+            self.session_token = self.token_store.get(self.token_store.make_key(self.person_code, session_tag))
+            if not self.session_token:
+                self.__refresh_session_token()
+
+            return True
+
+        self.session_token = self.__authorize(session_tag)["access_token"]
+        return True
+
     def get_session_tag(self):
         assert self.session_token, "No valid session available"
 
@@ -239,22 +447,22 @@ class ElvisClient(object):
         else:
             raise ElvisException(result['message'], result['raw'])
 
-    def search_warehouses(self, filters, sorting, start=0, limit=10, show_count=False):
-        assert self.session_token, "No valid session available"
-
-        assert isinstance(filters, (list, tuple, FilterItem)), 'Filters must be a list or tuple'
-        if isinstance(filters, FilterItem):
-            filters = (filters, )
+    def get_cached_assortment_types(self, assortment_type=AssortmentType.ELVIS):
+        """Same as get_assortment_types but served from the reference data cache while it is fresh"""
+        return self.reference_data.get(
+            "assortment_types:%d" % assortment_type, lambda: self.get_assortment_types(assortment_type),
+        )
 
-        assert not list(filter(lambda x: not isinstance(x, FilterItem), filters)), \
-            'All filters must be instances of FilterItem'
+    def get_assortment_type_index(self, assortment_type=AssortmentType.ELVIS):
+        """Return cached assortment types as a dict keyed by assortment type id (e.g. TimberAssortmentTypeId)"""
+        return self.reference_data.get_index(
+            "assortment_types:%d" % assortment_type, lambda: self.get_assortment_types(assortment_type),
+        )
 
-        assert isinstance(sorting, (list, tuple, SortItem)), 'Sorting must be a list or tuple'
-        if isinstance(sorting, SortItem):
-            sorting = (sorting, )
+    def search_warehouses(self, filters, sorting, start=0, limit=10, show_count=False):
+        assert self.session_token, "No valid session available"
 
-        assert not list(filter(lambda x: not isinstance(x, SortItem), sorting)), \
-            'All sorting rules must be instances of SortItem'
+        filters, sorting = self._clean_search_arguments(filters, sorting)
 
         assert filters and sorting, 'Need to add filters and sorting!'
 
@@ -267,10 +475,24 @@ class ElvisClient(object):
         })
 
         if result["Success"]:
-            return result["raw"]["SearchWarehousesResult"]
+            search_result = result["raw"]["SearchWarehousesResult"]
+
+            # Drop cached warehouses that have changed since they were cached
+            for item in search_result.get('Items') or []:
+                if item.get('Id') is not None and item.get('Version') is not None:
+                    self.warehouse_cache.check_version(item['Id'], item['Version'])
+
+            return search_result
         else:
             raise ElvisException(result['message'], result['raw'])
 
+    def iter_warehouses(self, filters, sorting, page_size=DEFAULT_PAGE_SIZE):
+        """Iterate over all warehouses matching the search, pages are requested as needed (items are dicts)"""
+        def fetch_page(start, limit):
+            return self.search_warehouses(filters, sorting, start, limit).get('Items') or []
+
+        return self._iter_pages(fetch_page, page_size)
+
     def insert_transport_order(self, transport_order):
         assert self.session_token, "No valid session available"
 
@@ -288,21 +510,9 @@ class ElvisClient(object):
     def search_transport_orders(self, context, filters, sorting, start=0, limit=10, show_count=False):
         assert self.session_token, "No valid session available"
 
-        assert context in TransportOrderRoleContext.__dict__.values(), 'Invalid context'
+        assert TransportOrderRoleContext.is_valid(context), 'Invalid context'
 
-        assert isinstance(filters, (list, tuple, FilterItem)), 'Filters must be a list or tuple'
-        if isinstance(filters, FilterItem):
-            filters = (filters, )
-
-        assert not list(filter(lambda x: not isinstance(x, FilterItem), filters)), \
-            'All filters must be instances of FilterItem'
-
-        assert isinstance(sorting, (list, tuple, SortItem)), 'Sorting must be a list or tuple'
-        if isinstance(sorting, SortItem):
-            sorting = (sorting, )
-
-        assert not list(filter(lambda x: not isinstance(x, SortItem), sorting)), \
-            'All sorting rules must be instances of SortItem'
+        filters, sorting = self._clean_search_arguments(filters, sorting)
 
         result = self.__request("SearchTransportOrders", "POST", {
             'context': context,
@@ -314,10 +524,28 @@ class ElvisClient(object):
         })
 
         if result.get("Success", False):
-            return TransportOrderListPage(dict_data=result["raw"]["SearchTransportOrdersResult"])
+            return TransportOrderListPage(dict_data=result["raw"]["SearchTransportOrdersResult"], adopt=True)
         else:
             raise ElvisException(result['message'], result['raw'])
 
+    def iter_transport_orders(self, context, filters, sorting, page_size=DEFAULT_PAGE_SIZE):
+        """Iterate over all TransportOrderListItems matching the search, pages are requested as needed"""
+        def fetch_page(start, limit):
+            return self.search_transport_orders(context, filters, sorting, start, limit).Items
+
+        return self._iter_pages(fetch_page, page_size)
+
+    def search_transport_orders_all(self, context, filters, sorting, page_size=DEFAULT_PAGE_SIZE,
+                                    workers=DEFAULT_WORKERS):
+        """Return all TransportOrderListItems matching the search, pages are fetched concurrently
+
+        See `_fetch_all_pages` for how documents changing during the scan are handled.
+        """
+        def fetch_page(start, limit, show_count):
+            return self.search_transport_orders(context, filters, sorting, start, limit, show_count)
+
+        return self._fetch_all_pages(fetch_page, page_size, workers)
+
     def get_transport_order(self, transport_order_id):
         assert self.session_token, "No valid session available"
 
@@ -327,10 +555,14 @@ class ElvisClient(object):
 
         if result.get("Success", False):
             json_obj = result["raw"]["GetTransportOrderResult"]
-            return TransportOrder(dict_data=json_obj)
+            return TransportOrder(dict_data=json_obj, adopt=True)
         else:
             raise ElvisException(result['message'], result['raw'])
 
+    def get_transport_orders(self, transport_order_ids, workers=DEFAULT_WORKERS):
+        """Get many TransportOrders concurrently, failed items are returned as exceptions (see `_map_concurrently`)"""
+        return self._map_concurrently(self.get_transport_order, transport_order_ids, workers)
+
     def get_transport_order_status(self, transport_order_id):
         assert self.session_token, "No valid session available"
 
@@ -339,10 +571,14 @@ class ElvisClient(object):
         })
 
         if result.get("Success", False):
-            return TransportOrderStatusInfo(dict_data=result["raw"]["GetTransportOrderStatusResult"])
+            return TransportOrderStatusInfo(dict_data=result["raw"]["GetTransportOrderStatusResult"], adopt=True)
         else:
             raise ElvisException(result['message'], result['raw'])
 
+    def get_transport_order_statuses(self, transport_order_ids, workers=DEFAULT_WORKERS):
+        """Get many TransportOrderStatusInfos concurrently, failed items are returned as exceptions"""
+        return self._map_concurrently(self.get_transport_order_status, transport_order_ids, workers)
+
     def set_transport_order_status(self, transport_order_id, status, feedback, version):
         assert self.session_token, "No valid session available"
 
@@ -368,11 +604,19 @@ class ElvisClient(object):
         })
 
         if result.get("Success", False):
-            return result["raw"]['InsertWarehouseResult']
+            warehouse_id = result["raw"]['InsertWarehouseResult']
+
+            # Inserting an existing warehouse updates it
+            if warehouse.Id is not None:
+                self.warehouse_cache.delete(warehouse.Id)
+            if warehouse_id is not None:
+                self.warehouse_cache.delete(warehouse_id)
+
+            return warehouse_id
         else:
             raise ElvisException(result['message'], result['raw'])
 
-    def get_warehouse(self, warehouse_id):
+    def __get_warehouse_data(self, warehouse_id):
         assert self.session_token, "No valid session available"
 
         result = self.__request("GetWarehouse", "POST", {
@@ -381,10 +625,49 @@ class ElvisClient(object):
 
         if result.get("Success", False):
             json_obj = result["raw"]["GetWarehouseResult"]
-            return TimberWarehouse(dict_data=json_obj)
+
+            if json_obj is None:
+                self.warehouse_cache.delete(warehouse_id)
+            elif json_obj.get('Version') is not None:
+                self.warehouse_cache.check_version(warehouse_id, json_obj['Version'])
+
+            return json_obj
         else:
             raise ElvisException(result['message'], result['raw'])
 
+    def get_warehouse(self, warehouse_id):
+        json_obj = self.__get_warehouse_data(warehouse_id)
+        if json_obj is None:
+            return None
+        return TimberWarehouse(dict_data=json_obj, adopt=True)
+
+    def get_warehouse_cached(self, warehouse_id, version=None):
+        """Get a TimberWarehouse through the warehouse cache (see ElvisClient(warehouse_cache_size=..., ...))
+
+        Cached warehouses are used until they expire, are invalidated by insert_warehouse / delete_warehouse or a
+        different version is seen. With `version` (e.g. from search results) only a cached warehouse with that version
+        is used.
+        """
+        data = self.warehouse_cache.get(warehouse_id, version)
+        if data is not None:
+            return TimberWarehouse(dict_data=self.json_backend.loads(data), adopt=True)
+
+        json_obj = self.__get_warehouse_data(warehouse_id)
+        if json_obj is None:
+            return None
+
+        data = self.json_backend.dumps(json_obj)
+        if not isinstance(data, bytes):
+            data = data.encode('utf-8')
+
+        self.warehouse_cache.set(warehouse_id, json_obj.get('Version', version), data)
+
+        return TimberWarehouse(dict_data=json_obj, adopt=True)
+
+    def get_warehouses(self, warehouse_ids, workers=DEFAULT_WORKERS):
+        """Get many TimberWarehouses concurrently, failed items are returned as exceptions (see `_map_concurrently`)"""
+        return self._map_concurrently(self.get_warehouse, warehouse_ids, workers)
+
     def delete_warehouse(self, warehouse_id):
         assert self.session_token, "No valid session available"
 
@@ -393,6 +676,7 @@ class ElvisClient(object):
         })
 
         if result.get("Success", False):
+            self.warehouse_cache.delete(warehouse_id)
             return result["raw"]['DeleteWarehouseResult']
         else:
             raise ElvisException(result['message'], result['raw'])
@@ -411,7 +695,7 @@ class ElvisClient(object):
         else:
             raise ElvisException(result['message'], result['raw'])
 
-    def get_waybill(self, waybill_id):
+    def __get_waybill_data(self, waybill_id):
         assert self.session_token, "No valid session available"
 
         result = self.__request("GetWaybill", "POST", {
@@ -419,13 +703,53 @@ class ElvisClient(object):
         })
 
         if result.get("Success", False):
-            json_obj = result["raw"]["GetWaybillResult"]
-            if json_obj is None:
-                return None
-            return Waybill(dict_data=json_obj)
+            return result["raw"]["GetWaybillResult"]
         else:
             raise ElvisException(result['message'], result['raw'])
 
+    def get_waybill(self, waybill_id):
+        json_obj = self.__get_waybill_data(waybill_id)
+        if json_obj is None:
+            return None
+        return Waybill(dict_data=json_obj, adopt=True)
+
+    def get_waybill_cached(self, waybill_id):
+        """Get a Waybill through the waybill cache (see ElvisClient(waybill_cache=...))
+
+        The version is checked with get_waybill_status first, the full document is only downloaded when the cached
+        version differs from it.
+        """
+        assert self.waybill_cache is not None, "No waybill cache configured"
+
+        status_info = self.get_waybill_status(waybill_id)
+
+        # A missing waybill gets an empty status info (Version defaults to []), that must not be used as a cache key
+        version = getattr(status_info, 'Version', None) if getattr(status_info, 'Number', None) else None
+
+        if version:
+            data = self.waybill_cache.get(waybill_id, version)
+            if data is not None:
+                return Waybill(dict_data=self.json_backend.loads(data), adopt=True)
+
+        json_obj = self.__get_waybill_data(waybill_id)
+        if json_obj is None:
+            self.waybill_cache.delete(waybill_id)
+            return None
+
+        version = json_obj.get('Version') or version
+        if version:
+            data = self.json_backend.dumps(json_obj)
+            if not isinstance(data, bytes):
+                data = data.encode('utf-8')
+
+            self.waybill_cache.set(waybill_id, version, data)
+
+        return Waybill(dict_data=json_obj, adopt=True)
+
+    def get_waybills(self, waybill_ids, workers=DEFAULT_WORKERS):
+        """Get many Waybills concurrently, failed items are returned as exceptions (see `_map_concurrently`)"""
+        return self._map_concurrently(self.get_waybill, waybill_ids, workers)
+
     def set_waybill_status(self, waybill_number, status, feedback, pre_journey_length,
                            total_journey_length, measurement_act_nr, version):
         assert self.session_token, "No valid session available"
@@ -453,28 +777,20 @@ class ElvisClient(object):
         })
 
         if result.get("Success", False):
-            return WaybillStatusInfo(dict_data=result["raw"]["GetWaybillStatusResult"])
+            return WaybillStatusInfo(dict_data=result["raw"]["GetWaybillStatusResult"], adopt=True)
         else:
             raise ElvisException(result['message'], result['raw'])
 
+    def get_waybill_statuses(self, waybill_ids, workers=DEFAULT_WORKERS):
+        """Get many WaybillStatusInfos concurrently, failed items are returned as exceptions"""
+        return self._map_concurrently(self.get_waybill_status, waybill_ids, workers)
+
     def search_waybills(self, context, filters, sorting, start=0, limit=10, show_count=False):
         assert self.session_token, "No valid session available"
 
-        assert context in WaybillRoleContext.__dict__.values(), 'Invalid context'
+        assert WaybillRoleContext.is_valid(context), 'Invalid context'
 
-        assert isinstance(filters, (list, tuple, FilterItem)), 'Filters must be a list or tuple'
-        if isinstance(filters, FilterItem):
-            filters = (filters, )
-
-        assert not list(filter(lambda x: not isinstance(x, FilterItem), filters)), \
-            'All filters must be instances of FilterItem'
-
-        assert isinstance(sorting, (list, tuple, SortItem)), 'Sorting must be a list or tuple'
-        if isinstance(sorting, SortItem):
-            sorting = (sorting, )
-
-        assert not list(filter(lambda x: not isinstance(x, SortItem), sorting)), \
-            'All sorting rules must be instances of SortItem'
+        filters, sorting = self._clean_search_arguments(filters, sorting)
 
         assert filters and sorting, 'Need to add filters and sorting!'
 
@@ -488,10 +804,89 @@ class ElvisClient(object):
         })
 
         if result.get("Success", False):
-            return WaybillListPage(dict_data=result["raw"]["SearchWaybillsResult"])
+            return WaybillListPage(dict_data=result["raw"]["SearchWaybillsResult"], adopt=True)
         else:
             raise ElvisException(result['message'], result['raw'])
 
+    def iter_waybills(self, context, filters, sorting, page_size=DEFAULT_PAGE_SIZE):
+        """Iterate over all WaybillListItems matching the search, pages are requested as needed"""
+        def fetch_page(start, limit):
+            return self.search_waybills(context, filters, sorting, start, limit).Items
+
+        return self._iter_pages(fetch_page, page_size)
+
+    def search_waybills_all(self, context, filters, sorting, page_size=DEFAULT_PAGE_SIZE, workers=DEFAULT_WORKERS):
+        """Return all WaybillListItems matching the search, pages are fetched concurrently
+
+        See `_fetch_all_pages` for how documents changing during the scan are handled.
+        """
+        def fetch_page(start, limit, show_count):
+            return self.search_waybills(context, filters, sorting, start, limit, show_count)
+
+        return self._fetch_all_pages(fetch_page, page_size, workers)
+
+    def search_waybills_sharded(self, context, filters, sorting, created_from, created_to,
+                                shard_size=DEFAULT_SHARD_SIZE, min_shard_duration=DEFAULT_MIN_SHARD_DURATION,
+                                page_size=DEFAULT_PAGE_SIZE, workers=DEFAULT_WORKERS):
+        """Return all WaybillListItems created between created_from and created_to without deep page offsets
+
+        The time range is split into CreatedOnStart/CreatedOnEnd windows, windows with more than `shard_size` matches
+        are halved until they fit (or get shorter than `min_shard_duration`). Windows are counted and fetched in
+        parallel and the items are returned in window order, sorted by `sorting` inside each window. Documents on a
+        window boundary match both neighbouring windows and are returned only once.
+        """
+        filters, sorting = self._clean_search_arguments(filters, sorting)
+        assert created_from < created_to, 'created_from must be before created_to'
+        assert shard_size > 0, 'Shard size must be positive'
+
+        def window_filters(window):
+            return list(filters) + [
+                FilterItem(WaybillListItemSearchField.CreatedOnStart, window[0]),
+                FilterItem(WaybillListItemSearchField.CreatedOnEnd, window[1]),
+            ]
+
+        def count_window(window):
+            return self.search_waybills(context, window_filters(window), sorting, 0, 1, True).TotalCount or 0
+
+        def fetch_window(window):
+            items = []
+            start = 0
+            while True:
+                page = self.search_waybills(context, window_filters(window), sorting, start, page_size).Items
+                if not page:
+                    return items
+                items.extend(page)
+                start += len(page)
+
+        shards = []
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            windows = [(created_from, created_to)]
+
+            while windows:
+                split_windows = []
+                for window, count in zip(windows, executor.map(count_window, windows)):
+                    window_start, window_end = window
+                    if count > shard_size and window_end - window_start > min_shard_duration:
+                        window_middle = window_start + (window_end - window_start) / 2
+                        split_windows.extend([(window_start, window_middle), (window_middle, window_end)])
+                    elif count:
+                        shards.append(window)
+
+                windows = split_windows
+
+            shards.sort()
+            shard_items = list(executor.map(fetch_window, shards))
+
+        seen = set()
+        items = []
+        for shard in shard_items:
+            for item in shard:
+                if item.Number not in seen:
+                    seen.add(item.Number)
+                    items.append(item)
+
+        return items
+
     def insert_reception_assortment(self, timber_batch_id, timber_assortment):
         assert self.session_token, "No valid session available"
 
@@ -539,11 +934,18 @@ class ElvisClient(object):
 
         assert isinstance(fine_measurement_file, FineMeasurementFile), 'Invalid FineMeasurementFile'
 
-        result = self.__request("InsertFineMeasurementFile", "POST", {
-            'waybill_number': waybill_number,
-            'file': fine_measurement_file,
-            'file_data': force_text(base64.b64encode(fine_measurement_file.Data)),
-        })
+        if fine_measurement_file.is_file_backed:
+            # Stream the file from disk instead of building the whole base64 encoded request in memory
+            result = self.__request("InsertFineMeasurementFile", "POST", Base64JSONBody(self.json_backend, {
+                'waybill_number': waybill_number,
+                'file': fine_measurement_file,
+            }, 'file_data', fine_measurement_file))
+        else:
+            result = self.__request("InsertFineMeasurementFile", "POST", {
+                'waybill_number': waybill_number,
+                'file': fine_measurement_file,
+                'file_data': force_text(base64.b64encode(fine_measurement_file.Data)),
+            })
 
         if result.get("Success", False):
             return result["raw"]["InsertFineMeasurementFileResult"]
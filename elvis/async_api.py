@@ -0,0 +1,481 @@
+# coding:utf-8
+
+import asyncio
+import base64
+
+from django.utils.encoding import force_text
+
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover
+    aiohttp = None
+
+from .api import Base64JSONBody, BaseElvisClient, ElvisException
+from .enums import AssortmentType, TransportOrderRoleContext, WaybillRoleContext
+from .models import (
+    TransportOrderListPage, TransportOrder, TransportOrderStatusInfo, TimberWarehouse, Waybill, WaybillStatusInfo,
+    WaybillListPage, TimberAssortment, FineMeasurementFile,
+)
+
+
+class AsyncElvisClient(BaseElvisClient):
+    """asyncio version of ElvisClient, requires aiohttp (pip install python-lvis[async])
+
+    All endpoints are coroutines with the same arguments and return values as their ElvisClient counterparts. At most
+    `max_concurrency` requests are in flight at once, the rest wait for a free slot so any number of calls can be
+    gathered from a single event loop.
+    """
+
+    DEFAULT_MAX_CONCURRENCY = 100
+
+    def __init__(self, *args, **kwargs):
+        if aiohttp is None:
+            raise ImportError("AsyncElvisClient requires aiohttp, install it with `pip install python-lvis[async]`")
+
+        self.max_concurrency = kwargs.pop('max_concurrency', self.DEFAULT_MAX_CONCURRENCY)
+        kwargs.setdefault('pool_maxsize', self.max_concurrency)
+
+        super(AsyncElvisClient, self).__init__(*args, **kwargs)
+
+        # Created on first request so that they are bound to the running event loop
+        self.http_session = None
+        self._semaphore = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    def create_http_session(self):
+        """Create the aiohttp session used for all requests, override to customize transport"""
+        connector = aiohttp.TCPConnector(
+            limit=self.max_concurrency,
+            limit_per_host=self.pool_maxsize,
+            force_close=not self.keep_alive,
+        )
+        timeout = aiohttp.ClientTimeout(
+            total=None,
+            sock_connect=self.request_timeout if self.connect_timeout is None else self.connect_timeout,
+            sock_read=self.request_timeout,
+        )
+
+        return aiohttp.ClientSession(connector=connector, timeout=timeout)
+
+    async def close(self):
+        """Close all pooled connections, the client opens new ones if it is used again"""
+        if self.http_session is not None:
+            await self.http_session.close()
+            self.http_session = None
+
+    async def _request(self, endpoint, method, attrs=None):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        if self.http_session is None:
+            self.http_session = self.create_http_session()
+
+        headers = self._get_request_headers()
+
+        async with self._semaphore:
+            if method.lower() == "post":
+                if isinstance(attrs, Base64JSONBody):
+                    data = self._iter_body(attrs)
+                    headers['Content-Length'] = str(len(attrs))
+                else:
+                    data = self._encode_request_data(attrs)
+
+                response = await self.http_session.post(self.api_url % endpoint, data=data, headers=headers)
+            else:
+                response = await self.http_session.get(self.api_url % endpoint, params=attrs, headers=headers)
+
+            async with response:
+                content = await response.read()
+
+        return self._decode_response(response.status, content)
+
+    @staticmethod
+    async def _iter_body(body):
+        """Yield the chunks of a Base64JSONBody, the file is read in the default executor to not block the loop"""
+        loop = asyncio.get_event_loop()
+        chunks = iter(body)
+
+        while True:
+            chunk = await loop.run_in_executor(None, next, chunks, None)
+            if chunk is None:
+                break
+
+            yield chunk
+
+    @staticmethod
+    async def _gather(coroutines):
+        """Await the coroutines concurrently, return results in input order
+
+        Like in ElvisClient._map_concurrently calls that fail with an ElvisException, an aiohttp client error or a
+        timeout don't abort the batch, the exception is returned in place of the result instead. Other exceptions
+        (programming errors) and cancellation are raised.
+        """
+        async def call(coroutine):
+            try:
+                return await coroutine
+            except (ElvisException, aiohttp.ClientError, asyncio.TimeoutError) as e:
+                return e
+
+        return await asyncio.gather(*[call(coroutine) for coroutine in coroutines])
+
+    # ENDPOINTS
+
+    async def server_info(self):
+        assert self.session_token, "No valid session available"
+
+        result = await self._request("GetInformation", "GET")
+
+        if result["Success"] and result["raw"].get("GetInformationResult", None):
+            return result["raw"]["GetInformationResult"]
+        else:
+            raise ElvisException("Server information not available, it was added in proxy version 1.1.*", raw=result)
+
+    async def authorize(self, session_tag='default'):
+        assert self.certificate, "Certificate must be provided"
+
+        result = await self._request("Authorize", "POST", {
+            'code': self.person_code,
+            'certificateData': self.certificate,
+            'password': self.certificate_password,
+            'connectionTag': session_tag,
+        })
+
+        auth_result = result["raw"].get("AuthorizeResult", None) if result["Success"] else None
+        if auth_result and auth_result.get('Success'):
+            self.session_token = auth_result["access_token"]
+            return True
+        else:
+            raise ElvisException("Authorization failed:", result)
+
+    async def get_session_tag(self):
+        assert self.session_token, "No valid session available"
+
+        result = await self._request("getSessionTag", "GET", {})
+
+        if result["Success"]:
+            return result["raw"]['getSessionTagResult']
+        else:
+            raise ElvisException(result['message'], result['raw'])
+
+    async def get_assortment_types(self, assortment_type=AssortmentType.ELVIS):
+        assert self.session_token, "No valid session available"
+        assert assortment_type in [AssortmentType.ELVIS, AssortmentType.COMPANY], "Invalid assortment type"
+
+        result = await self._request("getAssortmentTypes", "GET", {
+            'assortment_type': assortment_type,
+        })
+
+        if result["Success"]:
+            return result["raw"]['getAssortmentTypesResult']
+        else:
+            raise ElvisException(result['message'], result['raw'])
+
+    async def search_warehouses(self, filters, sorting, start=0, limit=10, show_count=False):
+        assert self.session_token, "No valid session available"
+
+        filters, sorting = self._clean_search_arguments(filters, sorting)
+
+        assert filters and sorting, 'Need to add filters and sorting!'
+
+        result = await self._request("SearchWarehouses", "POST", {
+            'filters': filters,
+            'sorting': sorting,
+            'start': start,
+            'limit': limit,
+            'show_count': show_count,
+        })
+
+        if result["Success"]:
+            return result["raw"]["SearchWarehousesResult"]
+        else:
+            raise ElvisException(result['message'], result['raw'])
+
+    async def insert_transport_order(self, transport_order):
+        assert self.session_token, "No valid session available"
+
+        assert isinstance(transport_order, TransportOrder), 'Invalid TransportOrder'
+
+        result = await self._request("InsertTransportOrder", "POST", {
+            'item': transport_order,
+        })
+
+        if result.get("Success", False):
+            return result["raw"]['InsertTransportOrderResult']
+        else:
+            raise ElvisException(result['message'], result['raw'])
+
+    async def search_transport_orders(self, context, filters, sorting, start=0, limit=10, show_count=False):
+        assert self.session_token, "No valid session available"
+
+        assert TransportOrderRoleContext.is_valid(context), 'Invalid context'
+
+        filters, sorting = self._clean_search_arguments(filters, sorting)
+
+        result = await self._request("SearchTransportOrders", "POST", {
+            'context': context,
+            'filters': filters,
+            'sorting': sorting,
+            'start': start,
+            'limit': limit,
+            'show_count': show_count,
+        })
+
+        if result.get("Success", False):
+            return TransportOrderListPage(dict_data=result["raw"]["SearchTransportOrdersResult"], adopt=True)
+        else:
+            raise ElvisException(result['message'], result['raw'])
+
+    async def get_transport_order(self, transport_order_id):
+        assert self.session_token, "No valid session available"
+
+        result = await self._request("GetTransportOrder", "POST", {
+            'transport_order_id': transport_order_id,
+        })
+
+        if result.get("Success", False):
+            json_obj = result["raw"]["GetTransportOrderResult"]
+            return TransportOrder(dict_data=json_obj, adopt=True)
+        else:
+            raise ElvisException(result['message'], result['raw'])
+
+    async def get_transport_order_status(self, transport_order_id):
+        assert self.session_token, "No valid session available"
+
+        result = await self._request("GetTransportOrderStatus", "POST", {
+            'transport_order_id': transport_order_id
+        })
+
+        if result.get("Success", False):
+            return TransportOrderStatusInfo(dict_data=result["raw"]["GetTransportOrderStatusResult"], adopt=True)
+        else:
+            raise ElvisException(result['message'], result['raw'])
+
+    async def get_transport_order_statuses(self, transport_order_ids):
+        """Get many TransportOrderStatusInfos concurrently, failed items are returned as exceptions"""
+        return await self._gather(self.get_transport_order_status(number) for number in transport_order_ids)
+
+    async def set_transport_order_status(self, transport_order_id, status, feedback, version):
+        assert self.session_token, "No valid session available"
+
+        result = await self._request("SetTransportOrderStatus", "POST", {
+            'transport_order_id': transport_order_id,
+            'status': status,
+            'feedback': feedback or "",
+            'version': version or [],
+        })
+
+        if result.get("Success", False):
+            return result["raw"]['SetTransportOrderStatusResult']
+        else:
+            raise ElvisException(result['message'], result['raw'])
+
+    async def insert_warehouse(self, warehouse):
+        assert self.session_token, "No valid session available"
+
+        assert isinstance(warehouse, TimberWarehouse), 'Invalid Warehouse'
+
+        result = await self._request("InsertWarehouse", "POST", {
+            'item': warehouse,
+        })
+
+        if result.get("Success", False):
+            return result["raw"]['InsertWarehouseResult']
+        else:
+            raise ElvisException(result['message'], result['raw'])
+
+    async def get_warehouse(self, warehouse_id):
+        assert self.session_token, "No valid session available"
+
+        result = await self._request("GetWarehouse", "POST", {
+            'warehouse_id': warehouse_id,
+        })
+
+        if result.get("Success", False):
+            json_obj = result["raw"]["GetWarehouseResult"]
+            if json_obj is None:
+                return None
+            return TimberWarehouse(dict_data=json_obj, adopt=True)
+        else:
+            raise ElvisException(result['message'], result['raw'])
+
+    async def delete_warehouse(self, warehouse_id):
+        assert self.session_token, "No valid session available"
+
+        result = await self._request("DeleteWarehouse", "POST", {
+            'warehouse_id': warehouse_id,
+        })
+
+        if result.get("Success", False):
+            return result["raw"]['DeleteWarehouseResult']
+        else:
+            raise ElvisException(result['message'], result['raw'])
+
+    async def insert_waybill(self, waybill):
+        assert self.session_token, "No valid session available"
+
+        assert isinstance(waybill, Waybill), 'Invalid Waybill'
+
+        result = await self._request("InsertWaybill", "POST", {
+            'item': waybill,
+        })
+
+        if result.get("Success", False):
+            return result["raw"]["InsertWaybillResult"]
+        else:
+            raise ElvisException(result['message'], result['raw'])
+
+    async def get_waybill(self, waybill_id):
+        assert self.session_token, "No valid session available"
+
+        result = await self._request("GetWaybill", "POST", {
+            'waybill_id': waybill_id
+        })
+
+        if result.get("Success", False):
+            json_obj = result["raw"]["GetWaybillResult"]
+            if json_obj is None:
+                return None
+            return Waybill(dict_data=json_obj, adopt=True)
+        else:
+            raise ElvisException(result['message'], result['raw'])
+
+    async def set_waybill_status(self, waybill_number, status, feedback, pre_journey_length,
+                                 total_journey_length, measurement_act_nr, version):
+        assert self.session_token, "No valid session available"
+
+        result = await self._request("SetWaybillStatus", "POST", {
+            'waybillNumber': waybill_number,
+            'status': status,
+            'feedback': feedback,
+            'preJorneyLength': pre_journey_length,
+            'totalJourneyLength': total_journey_length,
+            'measurementActNr': measurement_act_nr,
+            'version': version,
+        })
+
+        if result.get("Success", False):
+            return result["raw"]['SetWaybillStatusResult']
+        else:
+            raise ElvisException(result['message'], result['raw'])
+
+    async def get_waybill_status(self, waybill_id):
+        assert self.session_token, "No valid session available"
+
+        result = await self._request("GetWaybillStatus", "POST", {
+            'waybill_id': waybill_id
+        })
+
+        if result.get("Success", False):
+            return WaybillStatusInfo(dict_data=result["raw"]["GetWaybillStatusResult"], adopt=True)
+        else:
+            raise ElvisException(result['message'], result['raw'])
+
+    async def get_waybill_statuses(self, waybill_ids):
+        """Get many WaybillStatusInfos concurrently, failed items are returned as exceptions"""
+        return await self._gather(self.get_waybill_status(number) for number in waybill_ids)
+
+    async def search_waybills(self, context, filters, sorting, start=0, limit=10, show_count=False):
+        assert self.session_token, "No valid session available"
+
+        assert WaybillRoleContext.is_valid(context), 'Invalid context'
+
+        filters, sorting = self._clean_search_arguments(filters, sorting)
+
+        assert filters and sorting, 'Need to add filters and sorting!'
+
+        result = await self._request("SearchWaybills", "POST", {
+            'context': context,
+            'filters': filters,
+            'sorting': sorting,
+            'start': start,
+            'limit': limit,
+            'show_count': show_count,
+        })
+
+        if result.get("Success", False):
+            return WaybillListPage(dict_data=result["raw"]["SearchWaybillsResult"], adopt=True)
+        else:
+            raise ElvisException(result['message'], result['raw'])
+
+    async def insert_reception_assortment(self, timber_batch_id, timber_assortment):
+        assert self.session_token, "No valid session available"
+
+        assert isinstance(timber_assortment, TimberAssortment), 'Invalid TimberAssortment'
+
+        result = await self._request("InsertReceptionAssortment", "POST", {
+            'timber_batch_id': timber_batch_id,
+            'assortment': timber_assortment,
+        })
+
+        if result.get("Success", False):
+            return result["raw"]["InsertReceptionAssortmentResult"]
+        else:
+            raise ElvisException(result['message'], result['raw'])
+
+    async def delete_reception_assortment(self, reception_assortment_id):
+        return await self._delete_function({'id': reception_assortment_id}, 'DeleteReceptionAssortment')
+
+    async def insert_fine_measurement_assortment(self, waybill_number, timber_assortment):
+        assert self.session_token, "No valid session available"
+
+        assert isinstance(timber_assortment, TimberAssortment), 'Invalid TimberAssortment'
+
+        result = await self._request("InsertFineMeasurementAssortment", "POST", {
+            'waybill_number': waybill_number,
+            'assortment': timber_assortment,
+        })
+
+        if result.get("Success", False):
+            val = result["raw"]["InsertFineMeasurementAssortmentResult"]
+
+            if not val or val in ['0', 0]:
+                raise ElvisException('InsertFineMeasurementAssortmentResult:: returned id 0', result['raw'])
+
+            else:
+                return val
+        else:
+            raise ElvisException(result['message'], result['raw'])
+
+    async def delete_fine_measurement_assortment(self, reception_assortment_id):
+        return await self._delete_function({'id': reception_assortment_id}, 'DeleteFineMeasurementAssortment')
+
+    async def insert_fine_measurement_file(self, waybill_number, fine_measurement_file):
+        assert self.session_token, "No valid session available"
+
+        assert isinstance(fine_measurement_file, FineMeasurementFile), 'Invalid FineMeasurementFile'
+
+        if fine_measurement_file.is_file_backed:
+            # Stream the file from disk instead of building the whole base64 encoded request in memory
+            result = await self._request("InsertFineMeasurementFile", "POST", Base64JSONBody(self.json_backend, {
+                'waybill_number': waybill_number,
+                'file': fine_measurement_file,
+            }, 'file_data', fine_measurement_file))
+        else:
+            result = await self._request("InsertFineMeasurementFile", "POST", {
+                'waybill_number': waybill_number,
+                'file': fine_measurement_file,
+                'file_data': force_text(base64.b64encode(fine_measurement_file.Data)),
+            })
+
+        if result.get("Success", False):
+            return result["raw"]["InsertFineMeasurementFileResult"]
+        else:
+            raise ElvisException(result['message'], result['raw'])
+
+    async def delete_fine_measurement_file(self, fine_measurement_file_id):
+        return await self._delete_function({'id': fine_measurement_file_id}, 'DeleteFineMeasurementFile')
+
+    async def _delete_function(self, params, endpoint):
+        assert self.session_token, "No valid session available"
+
+        result = await self._request(endpoint, "POST", params)
+
+        if result.get("Success", False):
+            return result["raw"]["%sResult" % endpoint]
+        else:
+            raise ElvisException(result['message'], result['raw'])
@@ -0,0 +1,283 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+
+logger = logging.getLogger(__name__)
+
+
+class ReferenceDataCache(object):
+    """Cache for reference data lists (e.g. assortment types) with an id -> record index for each list
+
+    Lists are kept for `ttl` seconds. With `path` they are also written to that JSON file and read back on the next
+    start, so short-lived processes don't have to fetch them again.
+    """
+
+    def __init__(self, ttl, path=None, id_field='Id'):
+        self.ttl = ttl
+        self.path = path
+        self.id_field = id_field
+
+        self._entries = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        self._entries = {}
+
+        if self.path is None:
+            return
+
+        try:
+            with open(self.path, "r") as fHandle:
+                stored = json.load(fHandle)
+        except (IOError, ValueError):
+            return
+
+        for key, entry in stored.items():
+            self._entries[key] = (entry['fetched_at'], entry['items'], self._build_index(entry['items']))
+
+    def _save(self):
+        if self.path is None:
+            return
+
+        # Persisting is best effort, the fetched data is still used (and fetched again on the next start) if it fails
+        tmp_path = "%s.%d.tmp" % (self.path, os.getpid())
+        try:
+            with open(tmp_path, "w") as fHandle:
+                json.dump({
+                    key: {'fetched_at': fetched_at, 'items': items}
+                    for key, (fetched_at, items, _) in self._entries.items()
+                }, fHandle)
+
+            os.replace(tmp_path, self.path)
+        except IOError:
+            logger.warning("Saving reference data to %s failed", self.path, exc_info=True)
+
+    def _build_index(self, items):
+        return dict((item[self.id_field], item) for item in items)
+
+    def _get_entry(self, key, fetch):
+        with self._lock:
+            if self._entries is None:
+                self._load()
+
+            entry = self._entries.get(key)
+            if entry is None or entry[0] + self.ttl <= time.time():
+                items = fetch()
+                entry = (time.time(), items, self._build_index(items))
+
+                self._entries[key] = entry
+                self._save()
+
+            return entry
+
+    def get(self, key, fetch):
+        """Return the cached list stored under key, fetch() is called to (re)load it when missing or expired"""
+        return self._get_entry(key, fetch)[1]
+
+    def get_index(self, key, fetch):
+        """Same as get but returns a dict of the list items keyed by their id"""
+        return self._get_entry(key, fetch)[2]
+
+    def clear(self):
+        with self._lock:
+            self._entries = {}
+            self._save()
+
+
+class LRUCache(object):
+    """Thread safe in-memory mapping that keeps at most `maxsize` of the most recently used items
+
+    With `ttl` (seconds) items also expire that long after they were set.
+    """
+
+    def __init__(self, maxsize, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+
+        self._items = OrderedDict()  # key -> (expiry time or None, value)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._items)
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                self._items.move_to_end(key)
+            except KeyError:
+                return default
+
+            expires, value = self._items[key]
+            if expires is not None and expires <= time.monotonic():
+                del self._items[key]
+                return default
+
+            return value
+
+    def set(self, key, value):
+        expires = None if self.ttl is None else time.monotonic() + self.ttl
+
+        with self._lock:
+            self._items[key] = (expires, value)
+            self._items.move_to_end(key)
+
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._items.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+class WaybillCache(object):
+    """Local cache of waybill documents and their versions, see ElvisClient(waybill_cache=...)
+
+    Documents are kept in an in-memory LRU of `maxsize` items and, with `path`, in a sqlite database that outlives the
+    process and can be shared between processes. The `hits` / `misses` counters count get calls that did / didn't
+    find the requested version.
+    """
+
+    def __init__(self, path=None, maxsize=1000, timeout=60):
+        self.path = path
+        self.timeout = timeout
+
+        self.hits = 0
+        self.misses = 0
+
+        self._memory = LRUCache(maxsize)
+        self._lock = threading.Lock()
+
+        if self.path is not None:
+            with self._connection() as connection:
+                connection.execute(
+                    "CREATE TABLE IF NOT EXISTS elvis_waybills "
+                    "(key TEXT PRIMARY KEY, version TEXT NOT NULL, data BLOB NOT NULL)"
+                )
+
+    @staticmethod
+    def make_version(version):
+        """Versions are byte arrays (lists of ints in responses), they are stored as their JSON representation"""
+        return json.dumps(version)
+
+    @contextmanager
+    def _connection(self):
+        connection = sqlite3.connect(self.path, timeout=self.timeout)
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def _load(self, key):
+        item = self._memory.get(key)
+        if item is not None or self.path is None:
+            return item
+
+        with self._connection() as connection:
+            row = connection.execute("SELECT version, data FROM elvis_waybills WHERE key = ?", (key, )).fetchone()
+
+        if row is None:
+            return None
+
+        item = (row[0], bytes(row[1]))
+        self._memory.set(key, item)
+
+        return item
+
+    def get(self, key, version):
+        """Return the cached document data (bytes) if it has the given version, None otherwise"""
+        item = self._load(key)
+
+        hit = item is not None and item[0] == self.make_version(version)
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+        return item[1] if hit else None
+
+    def set(self, key, version, data):
+        item = (self.make_version(version), data)
+        self._memory.set(key, item)
+
+        if self.path is not None:
+            with self._connection() as connection:
+                connection.execute(
+                    "INSERT OR REPLACE INTO elvis_waybills (key, version, data) VALUES (?, ?, ?)", (key, ) + item,
+                )
+
+    def delete(self, key):
+        self._memory.delete(key)
+
+        if self.path is not None:
+            with self._connection() as connection:
+                connection.execute("DELETE FROM elvis_waybills WHERE key = ?", (key, ))
+
+    def clear(self):
+        self._memory.clear()
+
+        if self.path is not None:
+            with self._connection() as connection:
+                connection.execute("DELETE FROM elvis_waybills")
+
+
+class WarehouseCache(object):
+    """In-memory cache of warehouse documents, see ElvisClient.get_warehouse_cached
+
+    At most `maxsize` documents are kept, each for `ttl` seconds. Documents are stored with their version so that a
+    newer version seen elsewhere (e.g. in search results) invalidates them. The `hits` / `misses` counters count get
+    calls that did / didn't find a usable document.
+    """
+
+    def __init__(self, maxsize=500, ttl=5 * 60):
+        self.hits = 0
+        self.misses = 0
+
+        self._memory = LRUCache(maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(warehouse_id):
+        # Ids are numbers in responses but often given as strings
+        return str(warehouse_id)
+
+    def get(self, warehouse_id, version=None):
+        """Return the cached document data (bytes), None if it's missing, expired or doesn't have the given version"""
+        item = self._memory.get(self.make_key(warehouse_id))
+
+        hit = item is not None and (version is None or item[0] == WaybillCache.make_version(version))
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+        return item[1] if hit else None
+
+    def set(self, warehouse_id, version, data):
+        self._memory.set(self.make_key(warehouse_id), (WaybillCache.make_version(version), data))
+
+    def check_version(self, warehouse_id, version):
+        """Drop the cached document if it doesn't have the given version"""
+        key = self.make_key(warehouse_id)
+
+        item = self._memory.get(key)
+        if item is not None and item[0] != WaybillCache.make_version(version):
+            self._memory.delete(key)
+
+    def delete(self, warehouse_id):
+        self._memory.delete(self.make_key(warehouse_id))
+
+    def clear(self):
+        self._memory.clear()
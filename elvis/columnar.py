@@ -0,0 +1,205 @@
+"""Columnar (numpy) export of search results and waybill assortments, requires numpy (pip install python-lvis[numpy])
+
+The exporters read the model data directly (including nested data that hasn't been hydrated yet, see
+LazyModelAttribute) and accept models, compact models and raw response dicts alike.
+
+Missing values are NaN in float columns, -1 in integer columns, "" in string columns and -1 codes in dictionary
+encoded columns.
+"""
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+from .models import CompactModel
+
+
+class DictionaryColumn(object):
+    """Dictionary encoded string column, `codes` (int32 array) are indexes into `values` (list of unique strings)"""
+
+    def __init__(self, codes, values):
+        self.codes = codes
+        self.values = values
+
+    def __len__(self):
+        return len(self.codes)
+
+    def decode(self):
+        """Return the column as an object array of strings (None for missing values)"""
+        values = numpy.array(self.values + [None], dtype=object)
+        return values[self.codes]
+
+
+def _get_data(obj):
+    if isinstance(obj, dict):
+        return obj
+
+    if isinstance(obj, CompactModel):
+        return obj._to_dict()
+
+    return obj.__dict__
+
+
+def _get_items(data, name):
+    """Nested list `name` of the item data, without hydrating it when it's still deferred"""
+    items = data.get(name)
+    if items is None:
+        items = data.get('_deferred', {}).get(name)
+
+    return [_get_data(item) for item in items] if items else []
+
+
+def _float_column(values):
+    return numpy.array([numpy.nan if value is None else value for value in values], dtype=numpy.float64)
+
+
+def _int_column(values):
+    return numpy.array([-1 if value is None else value for value in values], dtype=numpy.int64)
+
+
+def _small_int_column(values):
+    return numpy.array([-1 if value is None else value for value in values], dtype=numpy.int32)
+
+
+def _string_column(values):
+    return numpy.array(['' if value is None else value for value in values], dtype=str)
+
+
+def _dictionary_column(values):
+    index = {None: -1}
+    codes = []
+
+    for value in values:
+        code = index.get(value)
+        if code is None:
+            code = index[value] = len(index) - 1
+
+        codes.append(code)
+
+    del index[None]
+    return DictionaryColumn(numpy.array(codes, dtype=numpy.int32), list(index))
+
+
+def _build_columns(rows, fields, **context_columns):
+    """rows is a list of data dicts, fields a list of (column name, data key, column factory)"""
+    columns = dict((column, factory([row.get(key) for row in rows])) for column, key, factory in fields)
+    columns.update(context_columns)
+
+    return columns
+
+
+WAYBILL_LIST_ITEM_FIELDS = [
+    ('Number', 'Number', _string_column),
+    ('AltNumber', 'AltNumber', _string_column),
+    ('Status', 'Status', _small_int_column),
+    ('TransportOrderNumber', 'TransportOrderNumber', _string_column),
+    ('OwnerCode', 'OwnerCode', _dictionary_column),
+    ('OwnerName', 'OwnerName', _dictionary_column),
+    ('ReceiverCode', 'ReceiverCode', _dictionary_column),
+    ('ReceiverName', 'ReceiverName', _dictionary_column),
+    ('TransporterCode', 'TransporterCode', _dictionary_column),
+    ('TransporterName', 'TransporterName', _dictionary_column),
+]
+
+ASSORTMENT_FIELDS = [
+    ('Id', 'Id', _int_column),
+    ('TimberAssortmentTypeId', 'TimberAssortmentTypeId', _small_int_column),
+    ('Amount', 'Amount', _float_column),
+    ('Description', 'Description', _dictionary_column),
+]
+
+PACK_FIELDS = [
+    ('Number', 'Number', _string_column),  # Pack numbers are not always numeric
+    ('Factor', 'Factor', _float_column),
+    ('Width', 'Width', _float_column),
+    ('Height', 'Heidht', _float_column),
+    ('Length', 'Length', _float_column),
+    ('VehicleType', 'VehicleType', _small_int_column),
+]
+
+
+def waybill_list_columns(pages):
+    """Return the items of WaybillListPages (or lists of WaybillListItems) as a dict of columns"""
+    assert numpy is not None, 'Columnar export requires numpy'
+
+    rows = []
+    for page in pages:
+        if isinstance(page, list):
+            rows.extend(_get_data(item) for item in page)
+        else:
+            rows.extend(_get_items(_get_data(page), 'Items'))
+
+    return _build_columns(rows, WAYBILL_LIST_ITEM_FIELDS)
+
+
+def _iter_assortments(waybills):
+    for waybill in waybills:
+        waybill_data = _get_data(waybill)
+        waybill_number = waybill_data.get('Number')
+
+        for batch in _get_items(waybill_data, 'ReceivedAssortments'):
+            batch_id = batch.get('Id')
+
+            for assortment in _get_items(batch, 'Assortments'):
+                yield waybill_number, batch_id, assortment
+
+
+def assortment_columns(waybills):
+    """Return the assortments of the received batches of waybills as a dict of columns, one row per assortment
+
+    Besides the assortment fields the columns include WaybillNumber and BatchId.
+    """
+    assert numpy is not None, 'Columnar export requires numpy'
+
+    rows, waybill_numbers, batch_ids = [], [], []
+    for waybill_number, batch_id, assortment in _iter_assortments(waybills):
+        rows.append(assortment)
+        waybill_numbers.append(waybill_number)
+        batch_ids.append(batch_id)
+
+    return _build_columns(
+        rows, ASSORTMENT_FIELDS,
+        WaybillNumber=_dictionary_column(waybill_numbers),
+        BatchId=_int_column(batch_ids),
+    )
+
+
+def pack_columns(waybills):
+    """Return the packs of the received assortments of waybills as a dict of columns, one row per pack
+
+    Besides the pack fields the columns include WaybillNumber, AssortmentId and TimberAssortmentTypeId.
+    """
+    assert numpy is not None, 'Columnar export requires numpy'
+
+    rows, waybill_numbers, assortment_ids, assortment_type_ids = [], [], [], []
+    for waybill_number, _, assortment in _iter_assortments(waybills):
+        packs = _get_items(assortment, 'Packs')
+
+        rows.extend(packs)
+        waybill_numbers.extend([waybill_number] * len(packs))
+        assortment_ids.extend([assortment.get('Id')] * len(packs))
+        assortment_type_ids.extend([assortment.get('TimberAssortmentTypeId')] * len(packs))
+
+    return _build_columns(
+        rows, PACK_FIELDS,
+        WaybillNumber=_dictionary_column(waybill_numbers),
+        AssortmentId=_int_column(assortment_ids),
+        TimberAssortmentTypeId=_small_int_column(assortment_type_ids),
+    )
+
+
+def to_structured_array(columns):
+    """Combine a dict of columns into a numpy structured array, dictionary encoded columns are stored as their codes"""
+    assert numpy is not None, 'Columnar export requires numpy'
+
+    arrays = dict(
+        (name, column.codes if isinstance(column, DictionaryColumn) else column) for name, column in columns.items()
+    )
+
+    size = len(next(iter(arrays.values()))) if arrays else 0
+    result = numpy.empty(size, dtype=[(name, array.dtype) for name, array in arrays.items()])
+
+    for name, array in arrays.items():
+        result[name] = array
+
+    return result
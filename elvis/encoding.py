@@ -0,0 +1,185 @@
+import base64
+import json
+from datetime import datetime
+from decimal import Decimal
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+from .enums import WarehouseType
+from .models import FilterItem, SortItem, Address, CompactModel, ElvisModel
+from .utils import encode_elvis_timestamp
+
+
+def _build_model_serializer(cls):
+    private_keys = getattr(cls, '_PRIVATE_ATTRIBUTES', ())
+
+    hydrate = bool(getattr(cls, '_LAZY_ATTRIBUTES', None))
+
+    def serialize(obj):
+        if hydrate:
+            obj._hydrate_deferred()
+
+        ret = obj.__dict__.copy()
+
+        for key in private_keys:
+            if key in ret:
+                del ret[key]
+
+        if ret.get('Id', 0) is None:
+            del ret['Id']
+
+        return ret
+
+    return serialize
+
+
+def _build_compact_model_serializer(cls):
+    def serialize(obj):
+        ret = obj._to_dict()
+
+        if ret.get('Id', 0) is None:
+            del ret['Id']
+
+        return ret
+
+    return serialize
+
+
+class SerializerRegistry(object):
+    """Functions that convert objects ElvisEncoder handles to JSON compatible values
+
+    A serializer is built once per concrete class by the factory registered for the first matching base class.
+    """
+
+    def __init__(self):
+        self._factories = []
+        self._serializers = {}
+
+    def register(self, base_class, factory):
+        """Register factory(cls) -> serializer(obj) for base_class and its subclasses"""
+        self._factories.append((base_class, factory))
+        self._serializers.clear()
+
+    def get(self, cls):
+        """Return the serializer for cls, None if objects of cls aren't handled"""
+        try:
+            return self._serializers[cls]
+        except KeyError:
+            pass
+
+        serializer = None
+        for base_class, factory in self._factories:
+            if issubclass(cls, base_class):
+                serializer = factory(cls)
+                break
+
+        self._serializers[cls] = serializer
+        return serializer
+
+
+class ElvisEncoder(json.JSONEncoder):
+    ELVIS_OBJECTS = (
+        FilterItem,
+        SortItem,
+        WarehouseType,
+        Address,
+        ElvisModel,
+    )
+
+    serializers = SerializerRegistry()
+    serializers.register(Decimal, lambda cls: float)
+    serializers.register(datetime, lambda cls: encode_elvis_timestamp)
+    serializers.register(CompactModel, _build_compact_model_serializer)
+    serializers.register(ELVIS_OBJECTS, _build_model_serializer)
+
+    def default(self, obj):
+        serializer = self.serializers.get(type(obj))
+        if serializer is None:
+            return super(ElvisEncoder, self).default(obj)
+
+        return serializer(obj)
+
+
+class JSONBackend(object):
+    """Encodes request bodies and decodes responses, `loads` gets the raw response bytes"""
+
+    def dumps(self, obj):
+        raise NotImplementedError
+
+    def loads(self, data):
+        raise NotImplementedError
+
+
+class StdlibJSONBackend(JSONBackend):
+    def dumps(self, obj):
+        return json.dumps(obj, cls=ElvisEncoder)
+
+    def loads(self, data):
+        return json.loads(data)
+
+
+class OrjsonBackend(JSONBackend):
+    """Uses orjson, which is several times faster on large payloads (pip install python-lvis[orjson])
+
+    Datetimes are passed through to ElvisEncoder.default so they keep the ELVIS /Date(...)/ format, output is
+    compact UTF-8 instead of ASCII escaped but otherwise the same JSON as StdlibJSONBackend produces.
+    """
+
+    def __init__(self):
+        assert orjson is not None, "orjson is not installed"
+
+        self._default = ElvisEncoder().default
+
+    def dumps(self, obj):
+        return orjson.dumps(obj, default=self._default, option=orjson.OPT_PASSTHROUGH_DATETIME)
+
+    def loads(self, data):
+        return orjson.loads(data)
+
+
+class Base64JSONBody(object):
+    """Request body for a JSON document with a field that holds a base64 encoded FineMeasurementFile
+
+    The document is encoded with `placeholder` in place of the file data, the file contents are then base64 encoded
+    chunk by chunk while the body is sent. The length is known upfront so the request has a Content-Length.
+    """
+
+    PLACEHOLDER = "__ELVIS_FILE_DATA__"
+    CHUNK_SIZE = 3 * 64 * 1024  # multiple of 3 so chunks encode without padding
+
+    def __init__(self, json_backend, attrs, field, fine_measurement_file):
+        attrs = dict(attrs)
+        attrs[field] = self.PLACEHOLDER
+
+        document = json_backend.dumps(attrs)
+        if not isinstance(document, bytes):
+            document = document.encode('utf-8')
+
+        self.prefix, _, self.suffix = document.rpartition(('"%s"' % self.PLACEHOLDER).encode('utf-8'))
+        self.fine_measurement_file = fine_measurement_file
+
+    def __len__(self):
+        data_size = self.fine_measurement_file.get_data_size()
+        return len(self.prefix) + 2 + (data_size + 2) // 3 * 4 + len(self.suffix)
+
+    def __iter__(self):
+        yield self.prefix + b'"'
+
+        remainder = b''
+        for chunk in self.fine_measurement_file.iter_data(self.CHUNK_SIZE):
+            chunk = remainder + chunk
+
+            cut = len(chunk) - len(chunk) % 3
+            remainder = chunk[cut:]
+            if cut:
+                yield base64.b64encode(chunk[:cut])
+
+        yield base64.b64encode(remainder) + b'"' + self.suffix
+
+
+def get_default_json_backend():
+    """The backend used when none is given, orjson is opt-in (json_backend=OrjsonBackend()) even when installed"""
+    return StdlibJSONBackend()
@@ -1,19 +1,31 @@
 class ElvisEnum(object):
+    # value -> name and name -> value maps of the (int) members, built once for each enum class
+    _NAMES = {}
+    _VALUES = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+
+        cls._NAMES = {}
+        cls._VALUES = {}
+
+        for name, value in vars(cls).items():
+            if not name.startswith("_") and isinstance(value, int):
+                cls._NAMES.setdefault(value, name)
+                cls._VALUES[name] = value
+
     @classmethod
     def display_name(cls, status):
-        for item in cls.__dict__:
-            if not item.startswith("_") and isinstance(cls.__dict__[item], int) and cls.__dict__[item] == int(status):
-                return item
-        return "Unknown"
+        return cls._NAMES.get(int(status), "Unknown")
 
     @classmethod
     def get_status_choices(cls):
-        choices = []
-        for item in cls.__dict__:
-            if not item.startswith("_") and isinstance(cls.__dict__[item], int):
-                choices.append((cls.__dict__[item], item))
+        return [(value, name) for name, value in cls._VALUES.items()]
 
-        return choices
+    @classmethod
+    def is_valid(cls, value):
+        """Check that value is one of the enum values"""
+        return value in cls._NAMES
 
 
 class AssortmentType(ElvisEnum):
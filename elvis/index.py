@@ -0,0 +1,289 @@
+"""In-process secondary indexes over locally cached waybills
+
+WaybillIndex evaluates the same FilterItem / SortItem lists as ElvisClient.search_waybills (WaybillListItemSearchField
+and WaybillListItemSortField) against the Waybills added to it, e.g. the documents of a MemorySyncStore, without a
+round trip to the proxy.
+
+Code, number, status and vehicle fields are matched exactly (case insensitive) using hash indexes, name fields match
+when they contain the filter value (case insensitive). All filters must match. The creation time of a waybill is the
+time of its first status change log.
+"""
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+import threading
+
+from .enums import SortDirection, WaybillListItemSearchField, WaybillListItemSortField
+from .utils import ELVIS_TIMEZONE, decode_elvis_timestamp
+
+
+def _get(obj, *names):
+    """Follow the attribute path names from obj, None if any of them is missing (e.g. on Composing waybills)"""
+    for name in names:
+        obj = getattr(obj, name, None)
+        if obj is None:
+            return None
+
+    return obj
+
+
+def _destination(waybill):
+    return _get(waybill, 'TimberReceiverDestination', 'Destination')
+
+
+def _transport(waybill):
+    return _get(waybill, 'Transporter', 'Transport')
+
+
+def _source_warehouses(waybill):
+    # Waybills made with TransportOrder.create_waybill may have no shipments or status change logs
+    return [
+        shipment.Warehouse for shipment in getattr(waybill, 'Shipments', None) or []
+        if getattr(shipment, 'Warehouse', None) is not None
+    ]
+
+
+def _driver_name(waybill):
+    driver = _get(_transport(waybill), 'Driver')
+    if driver is None:
+        return None
+
+    return '%s %s' % (getattr(driver, 'Firstname', None) or '', getattr(driver, 'Lastname', None) or '')
+
+
+def _created_on(waybill):
+    logs = getattr(waybill, 'StatusChangeLogs', None) or []
+
+    changed_on = [log.ChangedOn for log in logs if isinstance(getattr(log, 'ChangedOn', None), datetime)]
+    return min(changed_on) if changed_on else None
+
+
+# Search field -> function returning the values (list) of the field that are matched exactly, the nested models
+# can be missing (None values are not indexed)
+EXACT_FIELDS = {
+    WaybillListItemSearchField.OwnerCode: lambda x: [_get(x, 'TimberOwner', 'Code')],
+    WaybillListItemSearchField.RecieverCode: lambda x: [_get(x, 'TimberReceiverDestination', 'Receiver', 'Code')],
+    WaybillListItemSearchField.TransporterCode: lambda x: [_get(x, 'Transporter', 'CompanyRegistrationNumber')],
+    WaybillListItemSearchField.WaybillNumber: lambda x: [x.Number],
+    WaybillListItemSearchField.WaybillNumberAlternate: lambda x: [_get(x, 'AltNumber')],
+    WaybillListItemSearchField.StatusId: lambda x: [_get(x, 'Status')],
+    WaybillListItemSearchField.TransportOrderNumber: lambda x: [_get(x, 'TransportOrderNumber')],
+    WaybillListItemSearchField.IsDisputed: lambda x: [_get(x, 'IsDisputed')],
+    WaybillListItemSearchField.DriverPersonCode: lambda x: [_get(_transport(x), 'Driver', 'PersonCode')],
+    WaybillListItemSearchField.VanRegistrationNumber: lambda x: [_get(_transport(x), 'Van', 'RegistrationNumber')],
+    WaybillListItemSearchField.TrailerRegistrationNumber: lambda x: [
+        _get(_transport(x), 'Trailer', 'RegistrationNumber'),
+    ],
+    WaybillListItemSearchField.DestinationWarehouseCodeOrName: lambda x: [_get(_destination(x), 'Code')],
+    WaybillListItemSearchField.SourceWarehouseCodeOrName: lambda x: [y.Code for y in _source_warehouses(x)],
+}
+
+# Search field -> function returning the values (list) of the field that are matched by substring
+TEXT_FIELDS = {
+    WaybillListItemSearchField.RecieverName: lambda x: [_get(x, 'TimberReceiverDestination', 'Receiver', 'Name')],
+    WaybillListItemSearchField.OwnerCompanyName: lambda x: [_get(x, 'TimberOwner', 'Name')],
+    WaybillListItemSearchField.DestinationWarehouseName: lambda x: [_get(_destination(x), 'Name')],
+    WaybillListItemSearchField.DestinationWarehouseCodeOrName: lambda x: [_get(_destination(x), 'Name')],
+    WaybillListItemSearchField.SourceWarehouseName: lambda x: [y.Name for y in _source_warehouses(x)],
+    WaybillListItemSearchField.SourceWarehouseCodeOrName: lambda x: [y.Name for y in _source_warehouses(x)],
+    WaybillListItemSearchField.DriverName: lambda x: [_driver_name(x)],
+}
+
+SORT_FIELDS = {
+    WaybillListItemSortField.CreatedOn: _created_on,
+    WaybillListItemSortField.OwnerName: lambda x: _get(x, 'TimberOwner', 'Name'),
+    WaybillListItemSortField.DestinationWarehouseName: lambda x: _get(_destination(x), 'Name'),
+    WaybillListItemSortField.Number: lambda x: x.Number,
+}
+
+SUPPORTED_FIELDS = frozenset(EXACT_FIELDS) | frozenset(TEXT_FIELDS) | frozenset([
+    WaybillListItemSearchField.NotInStatusId,
+    WaybillListItemSearchField.CreatedOnStart,
+    WaybillListItemSearchField.CreatedOnEnd,
+])
+
+
+def _key(value):
+    return str(value).strip().lower()
+
+
+def _sort_key(value):
+    # Missing values sort first
+    return value is not None, value
+
+
+def _to_datetime(value):
+    if not isinstance(value, datetime):
+        value = decode_elvis_timestamp(value)
+        assert isinstance(value, datetime), 'CreatedOn filters need a datetime or ELVIS timestamp value'
+
+    if value.tzinfo is None:
+        # Naive datetimes are Tallinn time like in encode_elvis_timestamp
+        value = ELVIS_TIMEZONE.localize(value)
+
+    return value
+
+
+class WaybillIndex(object):
+    """Hash indexes over the fields of the added Waybills, see the module docstring
+
+    Name fields are indexed by their distinct (lowercase) values, so a name filter scans those instead of the waybills.
+
+    Adding a waybill with the number of an indexed one replaces it.
+    """
+
+    def __init__(self, waybills=None):
+        self._waybills = {}  # number -> Waybill
+        self._exact = dict((field, {}) for field in EXACT_FIELDS)  # field -> key -> set of numbers
+        self._text = dict((field, {}) for field in TEXT_FIELDS)  # field -> lowercase value -> set of numbers
+        self._keys = {}  # number -> list of (index, key) the waybill is indexed under
+        self._created_on = {}  # number -> datetime or None
+        self._created_on_sorted = None  # (sorted datetimes, numbers in the same order), rebuilt on demand
+
+        self._lock = threading.RLock()
+
+        if waybills:
+            self.update(waybills)
+
+    def __len__(self):
+        return len(self._waybills)
+
+    def __contains__(self, number):
+        return number in self._waybills
+
+    def get(self, number):
+        return self._waybills.get(number)
+
+    def add(self, waybill):
+        number = waybill.Number
+
+        with self._lock:
+            # The keys are collected before changing anything so a failing getter doesn't leave a partial entry
+            keys = []
+            for indexes, fields in ((self._exact, EXACT_FIELDS), (self._text, TEXT_FIELDS)):
+                for field, get_values in fields.items():
+                    keys.extend((indexes[field], _key(value)) for value in get_values(waybill) if value is not None)
+
+            created_on = _created_on(waybill)
+
+            self.remove(number)
+
+            self._waybills[number] = waybill
+            self._keys[number] = keys
+            for index, key in keys:
+                index.setdefault(key, set()).add(number)
+
+            self._created_on[number] = created_on
+            self._created_on_sorted = None
+
+    def update(self, waybills):
+        with self._lock:
+            for waybill in waybills:
+                self.add(waybill)
+
+    def remove(self, number):
+        """Remove a waybill from the index, returns it (None if it wasn't indexed)"""
+        with self._lock:
+            waybill = self._waybills.pop(number, None)
+            if waybill is None:
+                return None
+
+            for index, key in self._keys.pop(number):
+                numbers = index.get(key)
+                if numbers is not None:
+                    numbers.discard(number)
+                    if not numbers:
+                        del index[key]
+
+            del self._created_on[number]
+            self._created_on_sorted = None
+
+            return waybill
+
+    def _get_waybill_created_on(self, waybill):
+        return self._created_on[waybill.Number]
+
+    def _get_created_on_sorted(self):
+        if self._created_on_sorted is None:
+            items = sorted(
+                ((created_on, number) for number, created_on in self._created_on.items() if created_on is not None),
+                key=lambda x: x[0],
+            )
+            self._created_on_sorted = [created_on for created_on, _ in items], [number for _, number in items]
+
+        return self._created_on_sorted
+
+    def _match(self, filters):
+        """Numbers of the waybills matching all filters"""
+        candidates = None
+        exclude = set()
+        created_from = created_to = None
+
+        for item in filters:
+            field = item.Field
+            assert field in SUPPORTED_FIELDS, 'Search field %s is not supported by WaybillIndex' % field
+
+            if field == WaybillListItemSearchField.NotInStatusId:
+                exclude |= self._exact[WaybillListItemSearchField.StatusId].get(_key(item.Value), set())
+            elif field == WaybillListItemSearchField.CreatedOnStart:
+                created_from = _to_datetime(item.Value)
+            elif field == WaybillListItemSearchField.CreatedOnEnd:
+                created_to = _to_datetime(item.Value)
+            else:
+                value = _key(item.Value)
+                numbers = self._exact[field].get(value, set()) if field in EXACT_FIELDS else set()
+
+                if field in TEXT_FIELDS:
+                    # Name fields match the values containing the filter value, code or name fields the exact code too
+                    numbers = numbers.union(*[
+                        text_numbers for text, text_numbers in self._text[field].items() if value in text
+                    ])
+
+                candidates = set(numbers) if candidates is None else candidates & numbers
+
+        if created_from is not None or created_to is not None:
+            created_on_sorted, numbers_sorted = self._get_created_on_sorted()
+
+            start = 0 if created_from is None else bisect_left(created_on_sorted, created_from)
+            end = len(created_on_sorted) if created_to is None else bisect_right(created_on_sorted, created_to)
+
+            numbers = set(numbers_sorted[start:end])
+            candidates = numbers if candidates is None else candidates & numbers
+
+        if candidates is None:
+            candidates = set(self._waybills)
+
+        return candidates - exclude
+
+    def search(self, filters, sorting, start=0, limit=None):
+        """Return the Waybills matching filters (list of FilterItems) ordered by sorting (list of SortItems)
+
+        Waybills that sort equal (and all of them without sorting) are ordered by number.
+        """
+        if not isinstance(filters, (list, tuple)):
+            filters = (filters, )
+        if not isinstance(sorting, (list, tuple)):
+            sorting = (sorting, )
+
+        with self._lock:
+            waybills = [self._waybills[number] for number in sorted(self._match(filters))]
+
+            for item in reversed(sorting):
+                assert item.SortColumn in SORT_FIELDS, \
+                    'Sort field %s is not supported by WaybillIndex' % item.SortColumn
+
+                if item.SortColumn == WaybillListItemSortField.CreatedOn:
+                    get_value = self._get_waybill_created_on
+                else:
+                    get_value = SORT_FIELDS[item.SortColumn]
+
+                waybills.sort(key=lambda x: _sort_key(get_value(x)), reverse=item.SortDirection == SortDirection.Desc)
+
+        return waybills[start:None if limit is None else start + limit]
+
+    def count(self, filters):
+        """Number of waybills matching filters"""
+        if not isinstance(filters, (list, tuple)):
+            filters = (filters, )
+
+        with self._lock:
+            return len(self._match(filters))
@@ -1,5 +1,6 @@
 import hashlib
-import json
+import os
+import threading
 
 from django.utils.encoding import force_bytes
 
@@ -19,25 +20,156 @@ class SortItem(object):
         self.SortDirection = direction
 
 
+class LazyModelAttribute(object):
+    """Nested model (or list of models with many=True) that is hydrated from the raw response data on first access
+
+    ElvisModel keeps the raw data of these attributes aside when it's loaded from a response, once hydrated the value
+    is stored in the instance __dict__ and read from there like any other attribute.
+
+    Hydration is done under a lock so threads reading the attribute for the first time at once get the same value.
+    """
+
+    def __init__(self, model_class, many=False):
+        self.model_class = model_class
+        self.many = many
+        self.name = None
+
+        self._lock = threading.RLock()
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+
+        with self._lock:
+            # Another thread may have hydrated the value while this one was waiting for the lock
+            try:
+                return instance.__dict__[self.name]
+            except KeyError:
+                pass
+
+            deferred = instance.__dict__.get('_deferred')
+            if not deferred or self.name not in deferred:
+                raise AttributeError(self.name)
+
+            value = self.hydrate(deferred[self.name], adopt=instance._adopted)
+            instance.__dict__[self.name] = value
+            del deferred[self.name]
+
+        return value
+
+    def hydrate(self, raw, adopt=False):
+        model_class = self.model_class
+
+        if not self.many:
+            return raw if isinstance(raw, model_class) else model_class(dict_data=raw, adopt=adopt)
+
+        if not raw:
+            return []
+
+        return [item if isinstance(item, model_class) else model_class(dict_data=item, adopt=adopt) for item in raw]
+
+
+class DatetimeAttribute(object):
+    """Attribute listed in _DATETIME_ATTRIBUTES, reads return the decoded timestamp
+
+    The raw value is kept in the instance __dict__ (and encoded as is), the decoded value is cached until the
+    attribute is assigned again.
+    """
+
+    def __init__(self, name):
+        self.name = name
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+
+        try:
+            raw = instance.__dict__[self.name]
+        except KeyError:
+            raise AttributeError(self.name)
+
+        decoded = instance.__dict__.get('_decoded')
+        if decoded is not None:
+            cached = decoded.get(self.name)
+            if cached is not None and cached[0] is raw:
+                return cached[1]
+
+        value = decode_elvis_timestamp(raw)
+        if value is not raw:
+            instance.__dict__.setdefault('_decoded', {})[self.name] = (raw, value)
+
+        return value
+
+    def __set__(self, instance, value):
+        instance.__dict__[self.name] = value
+
+    def __delete__(self, instance):
+        try:
+            del instance.__dict__[self.name]
+        except KeyError:
+            raise AttributeError(self.name)
+
+
 class ElvisModel(object):
     _DATETIME_ATTRIBUTES = []
+    _LAZY_ATTRIBUTES = ()
+
+    # Set on instances that took ownership of their dict_data (see __init__), nested models then adopt their data too
+    _adopted = False
+
+    # Instance attributes that are not part of the model data, these are left out when the model is encoded
+    _PRIVATE_ATTRIBUTES = ('_already_loaded', '_adopted', '_deferred', '_decoded')
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+
+        for name in vars(cls).get('_DATETIME_ATTRIBUTES', ()):
+            setattr(cls, name, DatetimeAttribute(name))
+
+        lazy_attributes = []
+        for klass in reversed(cls.__mro__):
+            for name, value in vars(klass).items():
+                if isinstance(value, LazyModelAttribute) and name not in lazy_attributes:
+                    lazy_attributes.append(name)
+
+        cls._LAZY_ATTRIBUTES = tuple(lazy_attributes)
 
     def __init__(self, **kwargs):
+        """Create a new model from kwargs or load it from response data (dict_data)
+
+        With adopt=True the model takes ownership of dict_data (and the nested dicts in it) instead of copying it, only
+        use it when nothing else holds a reference to the data.
+        """
         dict_data = kwargs.get('dict_data', None)
         if dict_data:
-            self.__dict__ = dict_data.copy()
+            if kwargs.get('adopt', False):
+                self.__dict__ = dict_data
+                self._adopted = True
+            else:
+                self.__dict__ = dict_data.copy()
+
             self._already_loaded = True
+
+            if self._LAZY_ATTRIBUTES:
+                self._deferred = dict(
+                    (name, self.__dict__.pop(name)) for name in self._LAZY_ATTRIBUTES if name in self.__dict__
+                )
         else:
             self._already_loaded = False
 
-    def __getattribute__(self, name):
-        if name.startswith("_"):
-            return super().__getattribute__(name)
+    def _hydrate_deferred(self):
+        """Hydrate all lazy attributes that haven't been accessed yet"""
+        for name in list(self.__dict__.get('_deferred', ())):
+            getattr(self, name)
 
-        if name not in self._DATETIME_ATTRIBUTES:
-            return super().__getattribute__(name)
+    def _get_data(self):
+        """Return a shallow copy of the model data, without private attributes"""
+        self._hydrate_deferred()
 
-        return decode_elvis_timestamp(super().__getattribute__(name))
+        return dict((key, value) for key, value in self.__dict__.items() if key not in self._PRIVATE_ATTRIBUTES)
 
 
 # noinspection PyPep8Naming
@@ -108,7 +240,7 @@ class TimberAssortment(ElvisModel):
 
             if packs:
                 for pack in packs:
-                    self.Packs.append(Pack(dict_data=pack))
+                    self.Packs.append(Pack(dict_data=pack, adopt=self._adopted))
 
         assert self.Amount is not None, 'TimberAssortment::Amount cant be None'
 
@@ -161,9 +293,9 @@ class TimberBatch(ElvisModel):
             self.Certificates = []
 
             for item in assortments:
-                self.Assortments.append(TimberAssortment(dict_data=item))
+                self.Assortments.append(TimberAssortment(dict_data=item, adopt=self._adopted))
             for item in certs:
-                self.Certificates.append(Certificate(dict_data=item))
+                self.Certificates.append(Certificate(dict_data=item, adopt=self._adopted))
 
 
 # noinspection PyPep8Naming
@@ -203,18 +335,19 @@ class Warehouse(ElvisModel):
             self.AdditionalProperties = additional_properties
         else:
             if not isinstance(self.Address, Address):
-                self.Address = Address(dict_data=self.Address)
+                self.Address = Address(dict_data=self.Address, adopt=self._adopted)
 
             props = self.AdditionalProperties
             self.AdditionalProperties = []
 
             if props:
                 for item in props:
-                    self.AdditionalProperties.append(AdditionalProperty(dict_data=item))
+                    self.AdditionalProperties.append(AdditionalProperty(dict_data=item, adopt=self._adopted))
 
 
 # noinspection PyPep8Naming
 class TimberWarehouse(Warehouse):
+    TimberBatches = LazyModelAttribute(TimberBatch, many=True)
 
     def __init__(self, **kwargs):
 
@@ -237,12 +370,6 @@ class TimberWarehouse(Warehouse):
 
             self.ExtensionData = None
             self.Version = kwargs.get('version', None)  # Note: byte array
-        else:
-            batches = self.TimberBatches
-            self.TimberBatches = []
-
-            for batch in batches:
-                self.TimberBatches.append(TimberBatch(dict_data=batch))
 
 
 # noinspection PyPep8Naming
@@ -263,6 +390,9 @@ class WaybillStatusChangeLog(ElvisModel):
 
 # noinspection PyPep8Naming
 class Shipment(ElvisModel):
+    Warehouse = LazyModelAttribute(Warehouse)
+    TimberBatches = LazyModelAttribute(TimberBatch, many=True)
+
     def __init__(self, **kwargs):
 
         super(Shipment, self).__init__(**kwargs)
@@ -279,15 +409,6 @@ class Shipment(ElvisModel):
             self.TimberBatches = timber_batches
 
             self.ExtensionData = None
-        else:
-            if not isinstance(self.Warehouse, Warehouse):
-                self.Warehouse = Warehouse(dict_data=self.Warehouse)
-
-            batches = self.TimberBatches
-            self.TimberBatches = []
-
-            for batch in batches:
-                self.TimberBatches.append(TimberBatch(dict_data=batch))
 
 
 # noinspection PyPep8Naming
@@ -316,7 +437,7 @@ class AuthorizedPerson(Person):
             self.AuthorizationBase = kwargs.get('authorization_base')
         else:
             if not isinstance(self.Address, Address):
-                self.Address = Address(dict_data=self.Address)
+                self.Address = Address(dict_data=self.Address, adopt=self._adopted)
 
 
 # noinspection PyPep8Naming
@@ -347,7 +468,7 @@ class TimberOwner(Party):
 
         else:
             if not isinstance(self.AuthorizedPerson, AuthorizedPerson):
-                self.AuthorizedPerson = AuthorizedPerson(dict_data=self.AuthorizedPerson)
+                self.AuthorizedPerson = AuthorizedPerson(dict_data=self.AuthorizedPerson, adopt=self._adopted)
 
 
 # noinspection PyPep8Naming
@@ -373,14 +494,14 @@ class TimberReceiver(Party):
             self.AdditionalProperties = additional_properties
         else:
             if not isinstance(self.Address, Address):
-                self.Address = Address(dict_data=self.Address)
+                self.Address = Address(dict_data=self.Address, adopt=self._adopted)
 
             props = self.AdditionalProperties
             self.AdditionalProperties = []
 
             if props:
                 for item in props:
-                    self.AdditionalProperties.append(AdditionalProperty(dict_data=item))
+                    self.AdditionalProperties.append(AdditionalProperty(dict_data=item, adopt=self._adopted))
 
 
 # noinspection PyPep8Naming
@@ -398,10 +519,10 @@ class TimberReceiverDestination(ElvisModel):
             self.ExtensionData = None
         else:
             if not isinstance(self.Destination, Warehouse):
-                self.Destination = Warehouse(dict_data=self.Destination)
+                self.Destination = Warehouse(dict_data=self.Destination, adopt=self._adopted)
 
             if not isinstance(self.Receiver, TimberReceiver):
-                self.Receiver = TimberReceiver(dict_data=self.Receiver)
+                self.Receiver = TimberReceiver(dict_data=self.Receiver, adopt=self._adopted)
 
 
 # noinspection PyPep8Naming
@@ -434,13 +555,18 @@ class Transport(ElvisModel):
             self.ExtensionData = None
         else:
             if not isinstance(self.Driver, Person):
-                self.Driver = Person(dict_data=self.Driver)
+                self.Driver = Person(dict_data=self.Driver, adopt=self._adopted)
 
             if not isinstance(self.Trailer, Vehicle):
-                self.Trailer = Vehicle(dict_data=self.Trailer)
+                self.Trailer = Vehicle(dict_data=self.Trailer, adopt=self._adopted)
 
             if not isinstance(self.Van, Vehicle):
-                self.Van = Vehicle(dict_data=self.Van)
+                self.Van = Vehicle(dict_data=self.Van, adopt=self._adopted)
+
+    def get_hash(self):
+        """Hash of the driver and vehicles, identifies the transport within a transport order"""
+        key = "%s%s%s" % (self.Driver.PersonCode, self.Trailer.RegistrationNumber, self.Van.RegistrationNumber)
+        return hashlib.md5(key.encode("utf-8")).hexdigest()
 
 
 # noinspection PyPep8Naming
@@ -468,7 +594,7 @@ class Transporter(ElvisModel):
 
             if props:
                 for item in props:
-                    self.AdditionalProperties.append(AdditionalProperty(dict_data=item))
+                    self.AdditionalProperties.append(AdditionalProperty(dict_data=item, adopt=self._adopted))
 
 
 # noinspection PyPep8Naming
@@ -482,11 +608,19 @@ class WaybillTransporter(Transporter):
             self.Transport = kwargs.get('transport')
         else:
             if not isinstance(self.Transport, Transport):
-                self.Transport = Transport(dict_data=self.Transport)
+                self.Transport = Transport(dict_data=self.Transport, adopt=self._adopted)
 
 
 # noinspection PyPep8Naming
 class Waybill(ElvisModel):
+    TimberOwner = LazyModelAttribute(TimberOwner)
+    TimberReceiverDestination = LazyModelAttribute(TimberReceiverDestination)
+    Transporter = LazyModelAttribute(WaybillTransporter)
+    FineMeasurements = LazyModelAttribute(TimberAssortment, many=True)
+    ReceivedAssortments = LazyModelAttribute(TimberBatch, many=True)
+    StatusChangeLogs = LazyModelAttribute(WaybillStatusChangeLog, many=True)
+    Shipments = LazyModelAttribute(Shipment, many=True)
+
     def __init__(self, **kwargs):
         super(Waybill, self).__init__(**kwargs)
 
@@ -554,50 +688,6 @@ class Waybill(ElvisModel):
 
                 assert not list(filter(lambda x: not isinstance(x, Shipment), shipments))
                 self.Shipments = shipments
-        else:
-            # Timber owner
-            if not isinstance(self.TimberOwner, TimberOwner):
-                self.TimberOwner = TimberOwner(dict_data=self.TimberOwner)
-
-            # Timber receiver destination
-            if not isinstance(self.TimberReceiverDestination, TimberReceiverDestination):
-                self.TimberReceiverDestination = TimberReceiverDestination(dict_data=self.TimberReceiverDestination)
-
-            # Transporter
-            if not isinstance(self.Transporter, WaybillTransporter):
-                self.Transporter = WaybillTransporter(dict_data=self.Transporter)
-
-            # Load fine measurements
-            fine_measurements = self.FineMeasurements
-            self.FineMeasurements = []
-
-            if fine_measurements:
-                for fine_measurement in fine_measurements:
-                    self.FineMeasurements.append(TimberAssortment(dict_data=fine_measurement))
-
-            # Load received assortments
-            received_assortments = self.ReceivedAssortments
-            self.ReceivedAssortments = []
-
-            if received_assortments:
-                for received_assortment in received_assortments:
-                    self.ReceivedAssortments.append(TimberBatch(dict_data=received_assortment))
-
-            # Load status change logs
-            status_change_logs = self.StatusChangeLogs
-            self.StatusChangeLogs = []
-
-            if status_change_logs:
-                for item in status_change_logs:
-                    self.StatusChangeLogs.append(WaybillStatusChangeLog(dict_data=item))
-
-            # Load shipments
-            shipments = self.Shipments
-            self.Shipments = []
-
-            if shipments:
-                for item in shipments:
-                    self.Shipments.append(Shipment(dict_data=item))
 
 
 # noinspection PyPep8Naming
@@ -683,7 +773,7 @@ class WaybillListPage(ElvisModel):
 
             if items:
                 for item in items:
-                    self.Items.append(WaybillListItem(dict_data=item))
+                    self.Items.append(WaybillListItem(dict_data=item, adopt=self._adopted))
 
 
 # noinspection PyPep8Naming
@@ -714,7 +804,7 @@ class TransportOrderListPage(ElvisModel):
 
             if items:
                 for item in items:
-                    self.Items.append(TransportOrderListItem(dict_data=item))
+                    self.Items.append(TransportOrderListItem(dict_data=item, adopt=self._adopted))
 
 
 # noinspection PyPep8Naming
@@ -748,6 +838,8 @@ class TransportOrderStatusChangeLog(WaybillStatusChangeLog):
 
 # noinspection PyPep8Naming
 class TransportOrderTransporter(Transporter):
+    _PRIVATE_ATTRIBUTES = Transporter._PRIVATE_ATTRIBUTES + ('_transport_index', )
+
     def __init__(self, **kwargs):
         super(TransportOrderTransporter, self).__init__(**kwargs)
 
@@ -768,31 +860,54 @@ class TransportOrderTransporter(Transporter):
                 if isinstance(transport, Transport):
                     self.Transports.append(transport)
                 else:
-                    self.Transports.append(Transport(dict_data=transport))
+                    self.Transports.append(Transport(dict_data=transport, adopt=self._adopted))
+
+    def get_transport_index(self, rebuild=False):
+        """Return the transports keyed by Transport.get_hash() (the first one for equal hashes)
+
+        The index is cached. It's rebuilt when Transports is replaced, its length changes or rebuild is set, but not
+        when transports are replaced or modified in place. get_waybill_transporter checks the transport it finds and
+        rebuilds a stale index.
+        """
+        transports = self.Transports
+
+        cached = self.__dict__.get('_transport_index')
+        if rebuild or cached is None or cached[0] is not transports or cached[1] != len(transports):
+            index = {}
+            for transport in transports:
+                index.setdefault(transport.get_hash(), transport)
+
+            cached = (transports, len(transports), index)
+            self._transport_index = cached
+
+        return cached[2]
 
     def get_waybill_transporter(self, transport_hash):
-        transport = None
-        for t in self.Transports:
-            if transport_hash == hashlib.md5(
-                ("%s%s%s" % (t.Driver.PersonCode, t.Trailer.RegistrationNumber, t.Van.RegistrationNumber)).encode("utf-8")
-            ).hexdigest():
-                transport = t
-                break
+        transport = self.get_transport_index().get(transport_hash)
+        if transport is None or transport not in self.Transports or transport.get_hash() != transport_hash:
+            # Transports may have been replaced or modified in place since the index was built
+            transport = self.get_transport_index(rebuild=True).get(transport_hash)
         assert transport
 
-        from elvis.api import ElvisEncoder
-        dict_data = json.loads(json.dumps(self, cls=ElvisEncoder))
+        dict_data = self._get_data()
         del dict_data['Transports']
+
+        dict_data['AdditionalProperties'] = [item._get_data() for item in dict_data['AdditionalProperties']]
         dict_data['Transport'] = transport
-        waybill_transport_order = WaybillTransporter(dict_data=dict_data)
 
-        return waybill_transport_order
+        return WaybillTransporter(dict_data=dict_data, adopt=True)
 
 
 # noinspection PyPep8Naming
 class TransportOrder(ElvisModel):
     _DATETIME_ATTRIBUTES = ["Deadline"]
 
+    TimberOwner = LazyModelAttribute(TimberOwner)
+    TimberReceiverDestination = LazyModelAttribute(TimberReceiverDestination)
+    Transporter = LazyModelAttribute(TransportOrderTransporter)
+    StatusChangeLogs = LazyModelAttribute(TransportOrderStatusChangeLog, many=True)
+    Shipments = LazyModelAttribute(Shipment, many=True)
+
     def __init__(self, **kwargs):
         super(TransportOrder, self).__init__(**kwargs)
 
@@ -847,50 +962,176 @@ class TransportOrder(ElvisModel):
 
                 assert not list(filter(lambda x: not isinstance(x, Shipment), shipments))
                 self.Shipments = shipments
-        else:
-            # Timber owner
-            if not isinstance(self.TimberOwner, TimberOwner):
-                self.TimberOwner = TimberOwner(dict_data=self.TimberOwner)
-
-            # Timber receiver destination
-            if not isinstance(self.TimberReceiverDestination, TimberReceiverDestination):
-                self.TimberReceiverDestination = TimberReceiverDestination(dict_data=self.TimberReceiverDestination)
 
-            # Transporter
-            if not isinstance(self.Transporter, TransportOrderTransporter):
-                self.Transporter = TransportOrderTransporter(dict_data=self.Transporter)
+    def create_waybill(self, transport_hash, **kwargs):
+        """Create a new Waybill for this transport order, driven by the transport identified by transport_hash
 
-            # Load status change logs
-            status_change_logs = self.StatusChangeLogs
-            self.StatusChangeLogs = []
+        Timber owner, receiver destination and shipments are shared with the transport order, other kwargs are passed
+        to Waybill (e.g. status, alt_number, pre_journey_length).
+        """
+        kwargs.setdefault('transport_order_number', self.Number)
+        kwargs.setdefault('timber_owner', self.TimberOwner)
+        kwargs.setdefault('timber_receiver_destination', self.TimberReceiverDestination)
+        kwargs.setdefault('shipments', list(getattr(self, 'Shipments', None) or []))
 
-            if status_change_logs:
-                for item in status_change_logs:
-                    self.StatusChangeLogs.append(TransportOrderStatusChangeLog(dict_data=item))
+        if 'transporter' not in kwargs:
+            kwargs['transporter'] = self.Transporter.get_waybill_transporter(transport_hash)
 
-            # Load shipments
-            shipments = self.Shipments
-            self.Shipments = []
+        return Waybill(**kwargs)
 
-            if shipments:
-                for item in shipments:
-                    self.Shipments.append(Shipment(dict_data=item))
+    @staticmethod
+    def create_waybills(transport_orders, transport_hash, **kwargs):
+        """Create Waybills for many transport orders driven by the same transport, see create_waybill"""
+        return [transport_order.create_waybill(transport_hash, **kwargs) for transport_order in transport_orders]
 
 
 # noinspection PyPep8Naming
 class FineMeasurementFile(ElvisModel):
+    """Fine measurement file, the contents are given as `data` (bytes) or read from `file_path` / `file` (binary file
+    object) when the file is uploaded. File backed contents are streamed, so they are never fully loaded to memory.
+    """
+    _PRIVATE_ATTRIBUTES = ElvisModel._PRIVATE_ATTRIBUTES + ('Data', '_file_path', '_file', '_file_offset')
 
     def __init__(self, **kwargs):
         super(FineMeasurementFile, self).__init__(**kwargs)
 
+        self._file_path = None
+        self._file = None
+        self._file_offset = 0
+
         if not self._already_loaded:
             self.Description = kwargs.get('description')
             self.ContentType = kwargs.get('content_type')
             self.FileName = kwargs.get('file_name')
 
-            self.Data = force_bytes(kwargs.get('data'))
+            if kwargs.get('file_path') is not None:
+                self._file_path = kwargs.get('file_path')
+                self.Data = None
+            elif kwargs.get('file') is not None:
+                self._file = kwargs.get('file')
+                self._file_offset = self._file.tell()
+                self.Data = None
+            else:
+                self.Data = force_bytes(kwargs.get('data'))
 
             self.ExtensionData = None
 
         else:
             self.Data = force_bytes(self.Data)
+
+    @property
+    def is_file_backed(self):
+        return self._file_path is not None or self._file is not None
+
+    def get_data_size(self):
+        if self._file_path is not None:
+            return os.path.getsize(self._file_path)
+
+        if self._file is not None:
+            self._file.seek(0, os.SEEK_END)
+            return self._file.tell() - self._file_offset
+
+        return len(self.Data)
+
+    def iter_data(self, chunk_size=64 * 1024):
+        """Yield the file contents in chunks of at most chunk_size bytes"""
+        if self._file_path is not None:
+            with open(self._file_path, 'rb') as fHandle:
+                for chunk in iter(lambda: fHandle.read(chunk_size), b''):
+                    yield chunk
+
+        elif self._file is not None:
+            self._file.seek(self._file_offset)
+            for chunk in iter(lambda: self._file.read(chunk_size), b''):
+                yield chunk
+
+        else:
+            for start in range(0, len(self.Data), chunk_size):
+                yield self.Data[start:start + chunk_size]
+
+    def read_data(self):
+        if not self.is_file_backed:
+            return self.Data
+
+        return b''.join(self.iter_data())
+
+
+class CompactModel(object):
+    """Slot based model with a declared field list, for keeping large numbers of objects in memory
+
+    Fields missing from the data are left unset (like with ElvisModel), fields that are not declared are kept in
+    `_extra` so encoding a compact model gives the same output as the ElvisModel it was made from.
+    """
+    __slots__ = ('_extra', )
+
+    _FIELDS = ()
+    _NESTED = {}  # field name -> CompactModel class of the list items
+
+    def __init__(self, dict_data):
+        self._extra = None
+
+        for name, value in dict_data.items():
+            if name in self._NESTED and value:
+                item_class = self._NESTED[name]
+                value = [item_class.from_model(item) for item in value]
+
+            if name in self._FIELDS:
+                setattr(self, name, value)
+            elif not name.startswith('_'):
+                if self._extra is None:
+                    self._extra = {}
+
+                self._extra[name] = value
+
+    @classmethod
+    def from_model(cls, obj):
+        """Create a compact copy of an ElvisModel (or of raw response data)"""
+        if isinstance(obj, cls):
+            return obj
+
+        return cls(obj if isinstance(obj, dict) else obj.__dict__)
+
+    def _to_dict(self):
+        ret = {}
+
+        for name in self._FIELDS:
+            try:
+                ret[name] = getattr(self, name)
+            except AttributeError:
+                pass
+
+        if self._extra:
+            ret.update(self._extra)
+
+        return ret
+
+
+# noinspection PyPep8Naming
+class CompactPack(CompactModel):
+    _FIELDS = ('Factor', 'Width', 'Heidht', 'Length', 'Number', 'VehicleType', 'ExtensionData')
+    __slots__ = _FIELDS
+
+
+# noinspection PyPep8Naming
+class CompactTimberAssortment(CompactModel):
+    _FIELDS = ('Id', 'Amount', 'Description', 'TimberAssortmentTypeId', 'Packs', 'ExtensionData')
+    _NESTED = {'Packs': CompactPack}
+    __slots__ = _FIELDS
+
+
+# noinspection PyPep8Naming
+class CompactWaybillListItem(CompactModel):
+    _FIELDS = (
+        'Number', 'AltNumber', 'OwnerCode', 'OwnerName', 'ReceiverCode', 'ReceiverName', 'Status',
+        'TransportOrderNumber', 'TransporterCode', 'TransporterName', 'Version', 'ExtensionData',
+    )
+    __slots__ = _FIELDS
+
+
+# noinspection PyPep8Naming
+class CompactTransportOrderListItem(CompactModel):
+    _FIELDS = (
+        'Number', 'AltNumber', 'OwnerCode', 'OwnerName', 'ReceiverCode', 'ReceiverName', 'TransporterCode',
+        'TransporterName', 'Deadline', 'GroupId', 'Version', 'Status', 'Priority', 'ExtensionData',
+    )
+    __slots__ = _FIELDS
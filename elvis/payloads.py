@@ -0,0 +1,151 @@
+"""Bulk builders for Pack, TimberAssortment and TimberBatch insert payloads
+
+The builders take the same arguments as the model constructors, either as rows (a list of kwargs dicts) or as
+columns (a dict of kwarg -> list or numpy array, all of the same length), and return the dicts ElvisEncoder would
+produce for the models. Validation is done for all payloads at once and raises the same errors as the model
+constructors.
+"""
+from datetime import datetime
+
+from .models import Pack
+from .utils import UTC, encode_elvis_timestamp
+
+
+PACK_FIELDS = (
+    ('Factor', 'factor'),
+    ('Width', 'width'),
+    ('Heidht', 'height'),
+    ('Length', 'length'),
+    ('Number', 'number'),
+    ('VehicleType', 'vehicle_type'),
+)
+
+TIMBER_ASSORTMENT_FIELDS = (
+    ('Amount', 'amount'),
+    ('Description', 'description'),
+    ('TimberAssortmentTypeId', 'assortment_type'),
+    ('Id', 'timber_assortment_id'),
+    ('Packs', 'packs'),
+)
+
+TIMBER_BATCH_FIELDS = (
+    ('Appropriation', 'appropriation'),
+    ('Assortments', 'assortments'),
+    ('Certificates', 'certificates'),
+    ('Description', 'description'),
+    ('CadastralNumber', 'cadastral_number'),
+    ('DocDate', 'doc_date'),
+    ('DocNumber', 'doc_number'),
+    ('HoldingBaseId', 'holding_base_id'),
+    ('Id', 'batch_id'),
+    ('ForestNotice', 'forest_notice'),
+    ('PreviousOwnerAddress', 'prev_owner_address'),
+    ('PreviousOwnerCode', 'prev_owner_code'),
+    ('PreviousOwnerName', 'prev_owner_name'),
+    ('Quarter', 'quarter'),
+    ('RegisteredImmovableNumber', 'reg_immovable_number'),
+)
+
+
+# Default for nested item lists that are not given, replaced with a new list for each payload
+_NO_ITEMS = object()
+
+
+def _is_datetime64(value):
+    dtype = getattr(value, 'dtype', None)
+    return dtype is not None and dtype.kind == 'M'
+
+
+def _datetime64_to_datetime(value):
+    # datetime64 values are UTC instants (like decode_many(as_numpy=True) returns), tolist() gives ints for ns precision
+    value = value.astype('datetime64[us]').item()
+    return None if value is None else UTC.localize(value)
+
+
+def _to_list(column):
+    # numpy arrays are converted to lists of python values so the payloads can be encoded
+    if _is_datetime64(column):
+        return [_datetime64_to_datetime(value) for value in column]
+
+    return column.tolist() if hasattr(column, 'tolist') else list(column)
+
+
+def _build(data, fields, defaults):
+    """Build payload dicts from row (list of kwargs dicts) or column (dict of kwarg -> values) oriented data"""
+    keys = tuple(key for key, _ in fields)
+    kwargs = [kwarg for _, kwarg in fields]
+    default_values = [defaults.get(kwarg) for kwarg in kwargs]
+
+    if isinstance(data, dict):
+        given = dict((kwarg, _to_list(column)) for kwarg, column in data.items())
+        sizes = set(len(column) for column in given.values())
+        assert len(sizes) <= 1, 'All columns must have the same length, got %s' % ', '.join(
+            '%s: %d' % (kwarg, len(column)) for kwarg, column in sorted(given.items())
+        )
+
+        size = sizes.pop() if sizes else 0
+        columns = [given.get(kwarg, [default] * size) for kwarg, default in zip(kwargs, default_values)]
+        return [dict(zip(keys, row), ExtensionData=None) for row in zip(*columns)]
+
+    return [dict(zip(keys, map(row.get, kwargs, default_values)), ExtensionData=None) for row in data]
+
+
+def _drop_none_ids(payloads):
+    for payload in payloads:
+        if payload['Id'] is None:
+            del payload['Id']
+
+
+def _validate_items(payloads, key, item_class):
+    """Validate nested item lists like the constructors do, payload dicts made by the builders are accepted as well"""
+    for payload in payloads:
+        items = payload[key]
+
+        if items is _NO_ITEMS:
+            payload[key] = []
+        elif isinstance(items, item_class):
+            payload[key] = [items, ]
+        else:
+            assert not isinstance(items, dict), '%s must be a list of items, not a single payload' % key
+
+    assert not [
+        item for payload in payloads for item in payload[key] if not isinstance(item, (item_class, dict))
+    ]
+
+
+def build_packs(data):
+    """Build Pack payloads, data has the Pack constructor arguments as rows or columns"""
+    return _build(data, PACK_FIELDS, {})
+
+
+def build_timber_assortments(data):
+    """Build TimberAssortment payloads, data has the TimberAssortment constructor arguments as rows or columns
+
+    `packs` can hold Pack objects or payloads made with build_packs.
+    """
+    payloads = _build(data, TIMBER_ASSORTMENT_FIELDS, {'packs': _NO_ITEMS})
+
+    _validate_items(payloads, 'Packs', Pack)
+    assert None not in [payload['Amount'] for payload in payloads], 'TimberAssortment::Amount cant be None'
+
+    _drop_none_ids(payloads)
+    return payloads
+
+
+def build_timber_batches(data):
+    """Build TimberBatch payloads, data has the TimberBatch constructor arguments as rows or columns
+
+    `assortments` can hold TimberAssortment objects or payloads made with build_timber_assortments, `doc_date` can be a
+    datetime or a numpy datetime64 (UTC) value.
+    """
+    payloads = _build(data, TIMBER_BATCH_FIELDS, {})
+
+    for payload in payloads:
+        if _is_datetime64(payload['DocDate']):
+            payload['DocDate'] = _datetime64_to_datetime(payload['DocDate'])
+
+        if isinstance(payload['DocDate'], datetime):
+            payload['DocDate'] = encode_elvis_timestamp(payload['DocDate'])
+
+    _drop_none_ids(payloads)
+    return payloads
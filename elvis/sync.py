@@ -0,0 +1,315 @@
+"""Incremental synchronization of waybills and transport orders into a local store
+
+Each sync keeps a watermark per document kind and role context in its SyncStore: the start of the search window, the
+versions of the documents it tracks and which of them are still open (not Finalized or Cancelled, or not downloaded
+yet). A run searches only the window (list items are cheap), checks the open documents that have left the window with
+the bulk status getters, downloads the documents that are new or whose version changed with the bulk getters, saves
+them to the store and then moves the window forward to the start of the run (minus `lookback`). Documents that can't
+be found anymore are deleted from the store.
+"""
+import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from .encoding import get_default_json_backend
+from .enums import (
+    SortDirection, TransportOrderListItemSearchField, TransportOrderListItemSortField, WaybillListItemSearchField,
+    WaybillListItemSortField,
+)
+from .models import FilterItem, SortItem
+from .utils import ELVIS_TIMEZONE, decode_elvis_timestamp, encode_elvis_timestamp
+from .watcher import TERMINAL_STATUSES, TRANSPORT_ORDER, WAYBILL
+
+
+class SyncStore(object):
+    """Local storage for synced documents and sync watermarks, see SyncEngine"""
+
+    def get_watermark(self, key):
+        """Return the watermark dict stored under key, None before the first sync"""
+        raise NotImplementedError
+
+    def set_watermark(self, key, watermark):
+        raise NotImplementedError
+
+    def save_documents(self, kind, documents):
+        """Save (insert or replace) documents, a dict of number -> model"""
+        raise NotImplementedError
+
+    def delete_documents(self, kind, numbers):
+        raise NotImplementedError
+
+
+class MemorySyncStore(SyncStore):
+    """Keeps the documents and watermarks in dicts, mostly useful for tests and short-lived jobs"""
+
+    def __init__(self):
+        self.watermarks = {}
+        self.documents = {}
+
+        self._lock = threading.Lock()
+
+    def get_watermark(self, key):
+        return self.watermarks.get(key)
+
+    def set_watermark(self, key, watermark):
+        with self._lock:
+            self.watermarks[key] = watermark
+
+    def save_documents(self, kind, documents):
+        with self._lock:
+            self.documents.setdefault(kind, {}).update(documents)
+
+    def delete_documents(self, kind, numbers):
+        with self._lock:
+            documents = self.documents.get(kind, {})
+            for number in numbers:
+                documents.pop(number, None)
+
+
+class SqliteSyncStore(SyncStore):
+    """Stores the documents (as JSON) and watermarks in a sqlite database"""
+
+    def __init__(self, path, json_backend=None, timeout=60):
+        self.path = path
+        self.json_backend = json_backend or get_default_json_backend()
+        self.timeout = timeout
+
+        with self._connection() as connection:
+            connection.execute("CREATE TABLE IF NOT EXISTS elvis_sync_watermarks (key TEXT PRIMARY KEY, data TEXT)")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS elvis_sync_documents "
+                "(kind TEXT NOT NULL, number TEXT NOT NULL, data BLOB NOT NULL, PRIMARY KEY (kind, number))"
+            )
+
+    @contextmanager
+    def _connection(self):
+        connection = sqlite3.connect(self.path, timeout=self.timeout)
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def get_watermark(self, key):
+        with self._connection() as connection:
+            row = connection.execute("SELECT data FROM elvis_sync_watermarks WHERE key = ?", (key, )).fetchone()
+
+        return json.loads(row[0]) if row else None
+
+    def set_watermark(self, key, watermark):
+        with self._connection() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO elvis_sync_watermarks (key, data) VALUES (?, ?)", (key, json.dumps(watermark)),
+            )
+
+    def save_documents(self, kind, documents):
+        rows = []
+        for number, document in documents.items():
+            data = self.json_backend.dumps(document)
+            rows.append((kind, number, data.encode('utf-8') if isinstance(data, str) else data))
+
+        with self._connection() as connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO elvis_sync_documents (kind, number, data) VALUES (?, ?, ?)", rows,
+            )
+
+    def delete_documents(self, kind, numbers):
+        with self._connection() as connection:
+            connection.executemany(
+                "DELETE FROM elvis_sync_documents WHERE kind = ? AND number = ?",
+                [(kind, number) for number in numbers],
+            )
+
+    def get_document_data(self, kind, number):
+        """Return the stored document as a dict, None if it's not stored"""
+        with self._connection() as connection:
+            row = connection.execute(
+                "SELECT data FROM elvis_sync_documents WHERE kind = ? AND number = ?", (kind, number),
+            ).fetchone()
+
+        return self.json_backend.loads(bytes(row[0])) if row else None
+
+
+class SyncResult(object):
+    def __init__(self, added, changed, failed, unchanged, watermark, deleted=None):
+        self.added = added  # numbers of documents not seen before
+        self.changed = changed  # numbers of documents with a new version
+        self.failed = failed  # number -> exception for documents that could not be checked or downloaded (retried)
+        self.unchanged = unchanged  # count of checked documents that didn't change
+        self.watermark = watermark
+        self.deleted = deleted or []  # numbers of documents that were not found anymore (removed from the store)
+
+
+class SyncEngine(object):
+    """Base class of the document syncs, subclasses define the kind, window filter field and the client calls
+
+    `filters` are added to every search (sorted by SORT_FIELD unless `sorting` is given), `initial_from` is the start
+    of the window for the first run and `lookback` how far before the start of the previous run the next window starts.
+    Documents older than the window are checked for changes with the status getters until they reach a terminal status.
+    """
+
+    KIND = None
+    WINDOW_FIELD = None
+    SORT_FIELD = None
+    TERMINAL_STATUSES = frozenset()
+
+    DEFAULT_LOOKBACK = timedelta(hours=1)
+
+    def __init__(self, client, context, store, filters=None, sorting=None, initial_from=None, lookback=DEFAULT_LOOKBACK,
+                 workers=None):
+        self.client = client
+        self.context = context
+        self.store = store
+        self.filters = list(filters or [])
+        self.sorting = sorting or [SortItem(self.SORT_FIELD, SortDirection.Asc)]
+        self.initial_from = initial_from or datetime(2000, 1, 1)
+        self.lookback = lookback
+        self.workers = workers or client.DEFAULT_WORKERS
+
+    @property
+    def key(self):
+        return "%s:%s" % (self.KIND, self.context)
+
+    @staticmethod
+    def _now():
+        return datetime.now(ELVIS_TIMEZONE)
+
+    def search(self, filters):
+        raise NotImplementedError
+
+    def get_documents(self, numbers):
+        raise NotImplementedError
+
+    def get_statuses(self, numbers):
+        raise NotImplementedError
+
+    def run(self):
+        """Sync the documents of the current window and the open documents before it, returns a SyncResult"""
+        started = self._now()
+
+        watermark = self.store.get_watermark(self.key) or {}
+        window_from = decode_elvis_timestamp(watermark['window_from']) if 'window_from' in watermark else None
+        versions = watermark.get('versions', {})
+
+        items = self.search(self.filters + [FilterItem(self.WINDOW_FIELD, window_from or self.initial_from)])
+
+        new_versions, statuses = {}, {}
+        added, changed, unchanged = [], [], 0
+        failed = {}
+
+        for item in items:
+            version = json.dumps(item.Version)
+            new_versions[item.Number] = version
+            statuses[item.Number] = item.Status
+
+            if versions.get(item.Number) is None:
+                added.append(item.Number)
+            elif versions[item.Number] != version:
+                changed.append(item.Number)
+            else:
+                unchanged += 1
+
+        # Open documents that have left the window are checked with the (cheap) status getters
+        # (watermarks saved before open documents were tracked treat all their documents as open)
+        recheck = [number for number in watermark.get('open', versions) if number not in new_versions]
+
+        for number, info in zip(recheck, self.get_statuses(recheck) if recheck else []):
+            if isinstance(info, Exception):
+                failed[number] = info
+                new_versions[number] = versions.get(number)
+                statuses[number] = None
+                continue
+
+            version = json.dumps(info.Version)
+            new_versions[number] = version
+            statuses[number] = info.Status
+
+            if versions.get(number) is None:
+                added.append(number)
+            elif versions[number] != version:
+                changed.append(number)
+            else:
+                unchanged += 1
+
+        to_fetch = added + changed
+        documents, deleted = {}, []
+
+        for number, document in zip(to_fetch, self.get_documents(to_fetch)):
+            if isinstance(document, Exception):
+                failed[number] = document
+                # Keep the previously synced version (None for new documents) and keep the document open so it's
+                # downloaded again on the next run, even once it has left the window
+                new_versions[number] = versions.get(number)
+                statuses[number] = None
+            elif document is None:
+                deleted.append(number)
+                del new_versions[number]
+            else:
+                documents[number] = document
+                statuses[number] = getattr(document, 'Status', statuses.get(number))
+
+        if documents:
+            self.store.save_documents(self.KIND, documents)
+        if deleted:
+            self.store.delete_documents(self.KIND, deleted)
+
+        open_numbers = set(number for number in new_versions if statuses.get(number) not in self.TERMINAL_STATUSES)
+
+        # Closed documents that have left the window are not tracked anymore
+        for number in recheck:
+            if number in new_versions and number not in open_numbers:
+                del new_versions[number]
+
+        watermark = {
+            'window_from': encode_elvis_timestamp(started - self.lookback),
+            'versions': new_versions,
+            'open': sorted(open_numbers),
+        }
+        self.store.set_watermark(self.key, watermark)
+
+        return SyncResult(
+            [number for number in added if number in documents],
+            [number for number in changed if number in documents],
+            failed, unchanged, watermark, deleted,
+        )
+
+
+class WaybillSync(SyncEngine):
+    """Syncs waybills created since the previous run (minus lookback)"""
+
+    KIND = 'waybills'
+    WINDOW_FIELD = WaybillListItemSearchField.CreatedOnStart
+    SORT_FIELD = WaybillListItemSortField.CreatedOn
+    TERMINAL_STATUSES = TERMINAL_STATUSES[WAYBILL]
+
+    def search(self, filters):
+        return self.client.search_waybills_all(self.context, filters, self.sorting, workers=self.workers)
+
+    def get_documents(self, numbers):
+        return self.client.get_waybills(numbers, workers=self.workers)
+
+    def get_statuses(self, numbers):
+        return self.client.get_waybill_statuses(numbers, workers=self.workers)
+
+
+class TransportOrderSync(SyncEngine):
+    """Syncs transport orders with a deadline after the previous run (minus lookback)
+
+    Transport orders can't be searched by creation time, the window is based on the deadline instead.
+    """
+
+    KIND = 'transport_orders'
+    WINDOW_FIELD = TransportOrderListItemSearchField.DeadlineFrom
+    SORT_FIELD = TransportOrderListItemSortField.Deadline
+    TERMINAL_STATUSES = TERMINAL_STATUSES[TRANSPORT_ORDER]
+
+    def search(self, filters):
+        return self.client.search_transport_orders_all(self.context, filters, self.sorting, workers=self.workers)
+
+    def get_documents(self, numbers):
+        return self.client.get_transport_orders(numbers, workers=self.workers)
+
+    def get_statuses(self, numbers):
+        return self.client.get_transport_order_statuses(numbers, workers=self.workers)
@@ -0,0 +1,183 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+
+class TokenStore(object):
+    """Session token storage shared between ElvisClient instances, see ElvisClient(token_store=...)
+
+    Tokens are stored under a key made of the person code and the session (connection) tag. `lock` must provide
+    mutual exclusion between all users of the store (threads and processes) since it is used to make sure only one
+    of them authorizes at a time.
+    """
+
+    @staticmethod
+    def make_key(person_code, session_tag):
+        return "%s:%s" % (person_code, session_tag)
+
+    def get(self, key):
+        """Return the stored token if it hasn't expired yet, None otherwise"""
+        raise NotImplementedError
+
+    def set(self, key, token, expires_at):
+        """Store the token, expires_at is a unix timestamp"""
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    def lock(self, key):
+        """Return a context manager that holds the store wide lock for key (re-entrant within a thread)"""
+        raise NotImplementedError
+
+
+class FileTokenStore(TokenStore):
+    """Stores tokens in a JSON file, locking is done with flock on `<path>.lock` (process local on Windows)"""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock_path = "%s.lock" % path
+
+        self._thread_lock = threading.RLock()
+        self._lock_file = None
+
+    def _read(self):
+        try:
+            with open(self.path, "r") as fHandle:
+                return json.load(fHandle)
+        except (IOError, ValueError):
+            return {}
+
+    def _write(self, data):
+        tmp_path = "%s.%d.tmp" % (self.path, os.getpid())
+        with open(tmp_path, "w") as fHandle:
+            json.dump(data, fHandle)
+
+        os.replace(tmp_path, self.path)
+
+    def get(self, key):
+        item = self._read().get(key)
+
+        if item and item['expires_at'] > time.time():
+            return item['token']
+
+        return None
+
+    def set(self, key, token, expires_at):
+        with self.lock(key):
+            data = self._read()
+            data[key] = {'token': token, 'expires_at': expires_at}
+            self._write(data)
+
+    def delete(self, key):
+        with self.lock(key):
+            data = self._read()
+            if data.pop(key, None) is not None:
+                self._write(data)
+
+    @contextmanager
+    def lock(self, key):
+        with self._thread_lock:
+            # flock is not re-entrant between file descriptors of the same process, only take it once per thread
+            if fcntl is None or self._lock_file is not None:
+                yield
+                return
+
+            with open(self.lock_path, "a") as self._lock_file:
+                fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+                    self._lock_file = None
+
+
+class SqliteTokenStore(TokenStore):
+    """Stores tokens in a sqlite database, locking is done with an immediate (write) transaction
+
+    The lock is held while the holder authorizes, so `timeout` (how long other users wait for it) must be longer than
+    the request timeout of the clients using the store plus some margin. The default suits the default ElvisClient
+    request timeout (120 seconds).
+    """
+
+    DEFAULT_TIMEOUT = 180
+
+    def __init__(self, path, timeout=DEFAULT_TIMEOUT):
+        self.path = path
+        self.timeout = timeout
+
+        self._local = threading.local()
+
+        with self._connection() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS elvis_session_tokens "
+                "(key TEXT PRIMARY KEY, token TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=self.timeout)
+
+    @contextmanager
+    def _connection(self):
+        # Inside lock() the connection holding the write lock must be reused, otherwise we would wait for ourselves
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            yield connection
+            return
+
+        connection = self._connect()
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def get(self, key):
+        with self._connection() as connection:
+            row = connection.execute(
+                "SELECT token FROM elvis_session_tokens WHERE key = ? AND expires_at > ?", (key, time.time()),
+            ).fetchone()
+
+        return row[0] if row else None
+
+    def set(self, key, token, expires_at):
+        with self._connection() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO elvis_session_tokens (key, token, expires_at) VALUES (?, ?, ?)",
+                (key, token, expires_at),
+            )
+
+    def delete(self, key):
+        with self._connection() as connection:
+            connection.execute("DELETE FROM elvis_session_tokens WHERE key = ?", (key, ))
+
+    @contextmanager
+    def lock(self, key):
+        if getattr(self._local, 'connection', None) is not None:
+            yield
+            return
+
+        connection = self._connect()
+        connection.isolation_level = None
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            self._local.connection = connection
+            try:
+                yield
+            except Exception:
+                connection.execute("ROLLBACK")
+                raise
+            else:
+                connection.execute("COMMIT")
+            finally:
+                self._local.connection = None
+        finally:
+            connection.close()
@@ -1,32 +1,133 @@
-from datetime import datetime
+import re
+from datetime import datetime, timedelta
+from functools import lru_cache
+
 import pytz
 
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
 DATE_PREFIX = '/Date('
 DATE_SUFFIX = ')/'
 
 ELVIS_TIMEZONE = pytz.timezone('Europe/Tallinn')
 UTC = pytz.timezone('UTC')
 
+# Milliseconds and the (optional) timezone offset, parsed the same way as the original string slicing did
+ELVIS_TIMESTAMP_RE = re.compile(r'/Date\(([^+]*)(?:\+(.*))?\)/', re.DOTALL)
+
+EPOCH = datetime(1970, 1, 1)
+MILLISECONDS_IN_DAY = 24 * 60 * 60 * 1000
+
+
+@lru_cache(maxsize=None)
+def _get_offset(timezone_offset_string):
+    """Timezone offset in milliseconds for the part after "+", raises ValueError if it's not a number"""
+    if timezone_offset_string is None or len(timezone_offset_string) != 4:
+        return 0
+
+    return (int(timezone_offset_string[:2]) * 60 + int(timezone_offset_string[2:])) * 60 * 1000
+
+
+@lru_cache(maxsize=65536)
+def _get_elvis_tzinfo(day):
+    """Tallinn tzinfo for naive wall clock times on the given day (days since epoch), None if it has a DST transition"""
+    start = EPOCH + timedelta(days=day)
+
+    try:
+        tzinfo = ELVIS_TIMEZONE.localize(start, is_dst=None).tzinfo
+        end_tzinfo = ELVIS_TIMEZONE.localize(start + timedelta(days=1, microseconds=-1), is_dst=None).tzinfo
+    except (pytz.AmbiguousTimeError, pytz.NonExistentTimeError):
+        return None
+
+    return tzinfo if tzinfo is end_tzinfo else None
+
+
+@lru_cache(maxsize=65536)
+def _get_elvis_utc_offset(day):
+    """UTC offset in milliseconds of Tallinn wall clock times on the given day, None if it has a DST transition"""
+    tzinfo = _get_elvis_tzinfo(day)
+    if tzinfo is None:
+        return None
+
+    return tzinfo.utcoffset(EPOCH.replace(tzinfo=tzinfo)) // timedelta(milliseconds=1)
+
+
+def _parse_elvis_timestamp(timestamp):
+    """Tallinn wall clock time of an ELVIS timestamp string as milliseconds since epoch, None if it isn't one"""
+    match = ELVIS_TIMESTAMP_RE.fullmatch(timestamp.strip())
+    if match is None:
+        return None
+
+    try:
+        # Elvis Timezone offsets are relevant to Elvis natural timezone (Tallinn)
+        return int(match.group(1)) - _get_offset(match.group(2))
+    except ValueError:
+        return None
+
+
+def _localize(wall_time):
+    tzinfo = _get_elvis_tzinfo((wall_time - EPOCH).days)
+    if tzinfo is None:
+        return ELVIS_TIMEZONE.localize(wall_time)
+
+    return wall_time.replace(tzinfo=tzinfo)
+
 
 def decode_elvis_timestamp(timestamp: str):
     """Try to convert the argument to timestamp using ELVIS rules, return it unmodified if impossible"""
-    str_timestamp = str(timestamp).strip()
-    if str_timestamp.startswith(DATE_PREFIX) and str_timestamp.endswith(DATE_SUFFIX):
-        milliseconds = str_timestamp[len(DATE_PREFIX):-len(DATE_SUFFIX)]
-        timezone_offset = 0
-        try:
-            if "+" in milliseconds:
-                timezone_offset_string = milliseconds[milliseconds.index("+")+1:]
-                milliseconds = milliseconds[:milliseconds.index("+")]
-                if len(timezone_offset_string) == 4:
-                    timezone_offset = int(timezone_offset_string[:2])*60+int(timezone_offset_string[2:])
-            seconds = int(milliseconds) / 1000
-        except ValueError:
-            return timestamp
+    milliseconds = _parse_elvis_timestamp(timestamp if isinstance(timestamp, str) else str(timestamp))
+    if milliseconds is None:
+        return timestamp
+
+    return _localize(EPOCH + timedelta(milliseconds=milliseconds))
+
+
+def encode_elvis_timestamp(value: datetime):
+    """Convert datetime to ELVIS timestamp (Tallinn wall clock time), naive datetimes are assumed to be Tallinn time"""
+    if value.tzinfo is not None:
+        wall_time = value.replace(tzinfo=None)
+
+        # Values decoded from ELVIS already have the right Tallinn tzinfo, skip the conversion for them
+        if value.tzinfo is not _get_elvis_tzinfo((wall_time - EPOCH).days):
+            wall_time = value.astimezone(ELVIS_TIMEZONE).replace(tzinfo=None)
+
+        value = wall_time
+
+    return '%s%d+0000%s' % (DATE_PREFIX, (value - EPOCH).total_seconds() * 1000, DATE_SUFFIX)
+
+
+def decode_many(timestamps, as_numpy=False):
+    """Decode a list of ELVIS timestamps, values that aren't timestamps are returned unmodified
+
+    With as_numpy=True a numpy datetime64[ms] array of the UTC instants is returned instead and values that aren't
+    timestamps become NaT.
+    """
+    if not as_numpy:
+        return [decode_elvis_timestamp(timestamp) for timestamp in timestamps]
+
+    assert numpy is not None, 'decode_many(as_numpy=True) requires numpy'
+
+    nat = numpy.iinfo(numpy.int64).min
+    milliseconds = []
+
+    for timestamp in timestamps:
+        wall_time = _parse_elvis_timestamp(timestamp if isinstance(timestamp, str) else str(timestamp))
+        if wall_time is None:
+            milliseconds.append(nat)
+            continue
+
+        utc_offset = _get_elvis_utc_offset(wall_time // MILLISECONDS_IN_DAY)
+        if utc_offset is None:
+            utc_offset = _localize(EPOCH + timedelta(milliseconds=wall_time)).utcoffset() // timedelta(milliseconds=1)
+
+        milliseconds.append(wall_time - utc_offset)
+
+    return numpy.array(milliseconds, dtype=numpy.int64).view('datetime64[ms]')
 
-        # Elvis Timezone offsets are relevant to Elvis natural timezone (Tallinn)
-        return ELVIS_TIMEZONE.localize(datetime.fromtimestamp(seconds).astimezone(
-            pytz.FixedOffset(-timezone_offset)
-        ).replace(tzinfo=None))
 
-    return timestamp
+def encode_many(values):
+    """Encode a list of datetimes as ELVIS timestamps"""
+    return [encode_elvis_timestamp(value) for value in values]
@@ -0,0 +1,315 @@
+"""Status watchers that poll tracked waybills and transport orders until they reach a terminal status
+
+Tracked documents are kept in a priority queue ordered by the time of their next poll and the due ones are polled
+concurrently with the bulk status getters. A document whose status (or version) changed is polled again after
+`min_interval`, otherwise its interval grows by `backoff` up to `max_interval` (or the max interval of its status in
+`status_max_intervals`), so recently changed documents are polled often and stale ones back off. Documents that reach
+a terminal status (Finalized or Cancelled) are dropped automatically after their change is delivered.
+"""
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+
+from .enums import TransportOrderStatus, WaybillStatus
+
+
+WAYBILL = 'waybill'
+TRANSPORT_ORDER = 'transport_order'
+
+TERMINAL_STATUSES = {
+    WAYBILL: frozenset([WaybillStatus.Finalized, WaybillStatus.Cancelled]),
+    TRANSPORT_ORDER: frozenset([TransportOrderStatus.Finalized, TransportOrderStatus.Cancelled]),
+}
+
+
+class StatusChange(object):
+    def __init__(self, kind, number, previous_status, info):
+        self.kind = kind  # WAYBILL or TRANSPORT_ORDER
+        self.number = number
+        self.previous_status = previous_status  # None on the first poll of a document watched without a status
+        self.status = info.Status
+        self.version = info.Version
+        self.info = info  # WaybillStatusInfo or TransportOrderStatusInfo
+
+    @property
+    def is_terminal(self):
+        return self.status in TERMINAL_STATUSES[self.kind]
+
+    def __repr__(self):
+        return 'StatusChange(%s %s: %s -> %s)' % (self.kind, self.number, self.previous_status, self.status)
+
+
+class _TrackedDocument(object):
+    __slots__ = ('kind', 'number', 'status', 'version', 'interval', 'due')
+
+    def __init__(self, kind, number, status, version, interval, due):
+        self.kind = kind
+        self.number = number
+        self.status = status
+        self.version = version
+        self.interval = interval
+        self.due = due
+
+
+class BaseStatusWatcher(object):
+    """Scheduling shared by StatusWatcher and AsyncStatusWatcher, intervals are in seconds"""
+
+    DEFAULT_MIN_INTERVAL = 30
+    DEFAULT_MAX_INTERVAL = 30 * 60
+    DEFAULT_BACKOFF = 2
+
+    # Loaded timber is on its way or being received, these documents usually change soon so don't back off as far
+    DEFAULT_STATUS_MAX_INTERVALS = {
+        WaybillStatus.Confirmed: 5 * 60,
+        WaybillStatus.Unloaded: 5 * 60,
+        WaybillStatus.Received: 10 * 60,
+        TransportOrderStatus.Accepted: 10 * 60,
+    }
+
+    def __init__(self, client, on_change=None, on_error=None, min_interval=DEFAULT_MIN_INTERVAL,
+                 max_interval=DEFAULT_MAX_INTERVAL, backoff=DEFAULT_BACKOFF, status_max_intervals=None):
+        assert 0 < min_interval <= max_interval, 'min_interval must be positive and not above max_interval'
+        assert backoff >= 1, 'backoff must be at least 1'
+
+        self.client = client
+        self.on_change = on_change  # Called with every StatusChange
+        self.on_error = on_error  # Called with kind, number and exception when polling a document fails
+
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.status_max_intervals = (
+            self.DEFAULT_STATUS_MAX_INTERVALS if status_max_intervals is None else status_max_intervals
+        )
+
+        self._documents = {}  # (kind, number) -> _TrackedDocument
+        self._queue = []  # heap of (due, sequence, _TrackedDocument), entries of rescheduled documents are skipped
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._documents)
+
+    def __contains__(self, key):
+        return key in self._documents
+
+    def watch_waybill(self, number, status=None, version=None):
+        """Start tracking a waybill, returns False if the given status is already terminal"""
+        return self._watch(WAYBILL, number, status, version)
+
+    def watch_transport_order(self, number, status=None, version=None):
+        """Start tracking a transport order, returns False if the given status is already terminal"""
+        return self._watch(TRANSPORT_ORDER, number, status, version)
+
+    def unwatch(self, kind, number):
+        with self._lock:
+            self._documents.pop((kind, number), None)
+
+    def next_poll_in(self):
+        """Seconds until the next document is due (0 if some are due already), None if nothing is tracked"""
+        with self._lock:
+            self._drop_stale()
+            if not self._queue:
+                return None
+
+            return max(0, self._queue[0][0] - time.monotonic())
+
+    def _watch(self, kind, number, status, version):
+        if status in TERMINAL_STATUSES[kind]:
+            return False
+
+        with self._lock:
+            tracked = self._documents.get((kind, number))
+            if tracked is None:
+                tracked = self._documents[(kind, number)] = _TrackedDocument(
+                    kind, number, status, version, self.min_interval, None,
+                )
+            self._schedule(tracked, time.monotonic())
+
+        return True
+
+    def _schedule(self, tracked, due):
+        tracked.due = due
+        heapq.heappush(self._queue, (due, next(self._sequence), tracked))
+
+    def _is_current(self, entry):
+        due, _, tracked = entry
+        return tracked.due == due and self._documents.get((tracked.kind, tracked.number)) is tracked
+
+    def _drop_stale(self):
+        while self._queue and not self._is_current(self._queue[0]):
+            heapq.heappop(self._queue)
+
+    def _pop_due(self):
+        """Return the due documents grouped by kind (kind -> list of _TrackedDocument)"""
+        now = time.monotonic()
+        due = {WAYBILL: [], TRANSPORT_ORDER: []}
+
+        with self._lock:
+            while self._queue and self._queue[0][0] <= now:
+                entry = heapq.heappop(self._queue)
+                if self._is_current(entry):
+                    entry[2].due = None
+                    due[entry[2].kind].append(entry[2])
+
+        return due
+
+    def _handle_results(self, documents, results):
+        """Update and reschedule the polled documents, returns the StatusChanges"""
+        changes = []
+        errors = []
+        now = time.monotonic()
+
+        with self._lock:
+            for tracked, result in zip(documents, results):
+                if self._documents.get((tracked.kind, tracked.number)) is not tracked or tracked.due is not None:
+                    # Unwatched (or watched again) while it was polled
+                    continue
+
+                if isinstance(result, Exception):
+                    errors.append((tracked.kind, tracked.number, result))
+                    changed = False
+                else:
+                    changed = tracked.status is None or result.Status != tracked.status or (
+                        tracked.version is not None and result.Version != tracked.version
+                    )
+
+                if changed:
+                    changes.append(StatusChange(tracked.kind, tracked.number, tracked.status, result))
+
+                    tracked.status = result.Status
+                    tracked.version = result.Version
+                    tracked.interval = self.min_interval
+                else:
+                    max_interval = self.status_max_intervals.get(tracked.status, self.max_interval)
+                    tracked.interval = max(min(tracked.interval * self.backoff, max_interval), self.min_interval)
+
+                if tracked.status in TERMINAL_STATUSES[tracked.kind]:
+                    del self._documents[(tracked.kind, tracked.number)]
+                else:
+                    self._schedule(tracked, now + tracked.interval)
+
+        if self.on_error is not None:
+            for kind, number, error in errors:
+                self.on_error(kind, number, error)
+
+        if self.on_change is not None:
+            for change in changes:
+                self.on_change(change)
+
+        return changes
+
+
+class StatusWatcher(BaseStatusWatcher):
+    """Polls tracked documents with an ElvisClient, `workers` status requests are made concurrently
+
+    Changes are passed to `on_change` and returned by `poll`, `run` polls until nothing is tracked or `stop` is called.
+    Documents can be watched and unwatched from other threads while the watcher is running.
+    """
+
+    def __init__(self, client, on_change=None, workers=None, **kwargs):
+        super(StatusWatcher, self).__init__(client, on_change=on_change, **kwargs)
+
+        self.workers = workers or client.DEFAULT_WORKERS
+        self._wakeup = threading.Event()
+        self._stopped = False
+
+    def _watch(self, kind, number, status, version):
+        watched = super(StatusWatcher, self)._watch(kind, number, status, version)
+        self._wakeup.set()
+
+        return watched
+
+    def poll(self):
+        """Poll the documents that are due, returns the StatusChanges"""
+        due = self._pop_due()
+
+        changes = []
+        if due[WAYBILL]:
+            results = self.client.get_waybill_statuses([x.number for x in due[WAYBILL]], workers=self.workers)
+            changes.extend(self._handle_results(due[WAYBILL], results))
+
+        if due[TRANSPORT_ORDER]:
+            results = self.client.get_transport_order_statuses(
+                [x.number for x in due[TRANSPORT_ORDER]], workers=self.workers,
+            )
+            changes.extend(self._handle_results(due[TRANSPORT_ORDER], results))
+
+        return changes
+
+    def run(self):
+        """Poll until all tracked documents reach a terminal status or stop is called"""
+        self._stopped = False
+
+        while True:
+            # Cleared before checking stop and computing the wait so a watch or stop call made in between wakes us up
+            self._wakeup.clear()
+            if self._stopped:
+                break
+
+            wait = self.next_poll_in()
+            if wait is None:
+                break
+
+            if wait > 0:
+                self._wakeup.wait(wait)
+                continue
+
+            self.poll()
+
+    def stop(self):
+        self._stopped = True
+        self._wakeup.set()
+
+
+class AsyncStatusWatcher(BaseStatusWatcher):
+    """Polls tracked documents with an AsyncElvisClient (concurrency is limited by the client's max_concurrency)
+
+    Changes are put to `queue` (an asyncio.Queue), passed to `on_change` and returned by `poll`.
+    """
+
+    def __init__(self, client, queue=None, **kwargs):
+        super(AsyncStatusWatcher, self).__init__(client, **kwargs)
+
+        self.queue = asyncio.Queue() if queue is None else queue
+        self._stopped = False
+
+    async def poll(self):
+        """Poll the documents that are due, returns the StatusChanges"""
+        due = self._pop_due()
+
+        waybill_results, transport_order_results = await asyncio.gather(
+            self.client.get_waybill_statuses([x.number for x in due[WAYBILL]]),
+            self.client.get_transport_order_statuses([x.number for x in due[TRANSPORT_ORDER]]),
+        )
+
+        changes = self._handle_results(due[WAYBILL], waybill_results)
+        changes.extend(self._handle_results(due[TRANSPORT_ORDER], transport_order_results))
+
+        for change in changes:
+            await self.queue.put(change)
+
+        return changes
+
+    async def run(self):
+        """Poll until all tracked documents reach a terminal status or stop is called
+
+        Documents watched while the watcher is sleeping are polled when it wakes up (within `min_interval`).
+        """
+        self._stopped = False
+
+        while not self._stopped:
+            wait = self.next_poll_in()
+            if wait is None:
+                break
+
+            if wait > 0:
+                await asyncio.sleep(min(wait, self.min_interval))
+                continue
+
+            await self.poll()
+
+    def stop(self):
+        self._stopped = True
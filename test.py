@@ -2,8 +2,12 @@
 from datetime import datetime
 import uuid
 import json
+import tempfile
 
 from elvis.api import ElvisClient, ElvisException, ElvisEncoder
+from elvis.cache import WaybillCache
+from elvis.index import WaybillIndex
+from elvis.watcher import StatusWatcher
 from elvis.enums import (WarehouseType, WarehouseListItemSearchField, WarehouseListItemSortField, SortDirection, VehicleType, WaybillStatus,
                          WaybillRoleContext, WaybillListItemSearchField, WaybillListItemSortField, AssortmentType)
 from elvis.models import (TimberAssortment, Certificate, TimberBatch, TimberWarehouse, Address, FilterItem, SortItem, Pack, Shipment,
@@ -139,6 +143,17 @@ class ElvisProxyTest(object):
 
         print("Lao lugemine õnnestus %d!" % ware.Id)
 
+    def test_get_warehouse_cached(self):
+        print("Lao lugemine vahemälu kaudu (number = %d) ..." % self.warehouse_id)
+
+        self.client.warehouse_cache.clear()
+        first = self.client.get_warehouse_cached(self.warehouse_id)
+        second = self.client.get_warehouse_cached(self.warehouse_id)
+
+        assert first.Id == second.Id
+
+        print("Lao lugemine vahemälu kaudu õnnestus %d!" % second.Id)
+
     def test_search_warehouse(self):
         print("Ladude otsimine.")
 
@@ -366,6 +381,30 @@ class ElvisProxyTest(object):
         self.waybill = self.client.get_waybill(self.waybill_id)
         print("Veoselehe lugemine õnnestus %s!" % str(self.waybill.Number))
 
+    def test_get_waybills(self):
+        print("Veoselehtede lugemine korraga (number = %s) ..." % self.waybill_id)
+
+        waybill, missing = self.client.get_waybills([self.waybill_id, 'olematu-veoseleht'])
+        assert waybill.Number == self.waybill.Number
+        assert isinstance(missing, (ElvisException, type(None)))
+
+        print("Veoselehtede lugemine korraga õnnestus %s!" % str(waybill.Number))
+
+    def test_get_waybill_cached(self):
+        print("Veoselehe lugemine vahemälu kaudu (number = %s) ..." % self.waybill_id)
+
+        self.client.waybill_cache = WaybillCache()
+        try:
+            first = self.client.get_waybill_cached(self.waybill_id)
+            second = self.client.get_waybill_cached(self.waybill_id)
+        finally:
+            cache, self.client.waybill_cache = self.client.waybill_cache, None
+
+        assert first.Number == second.Number
+        assert (cache.hits, cache.misses) == (1, 1)
+
+        print("Veoselehe lugemine vahemälu kaudu õnnestus %s!" % str(second.Number))
+
     def test_set_waybill_status(self):
         print("Veoselehe (number = %s) staatuse muutmine %d -> %d ..." % (self.waybill.Number,
                                                                            self.waybill.Status,
@@ -380,6 +419,18 @@ class ElvisProxyTest(object):
         status = self.client.get_waybill_status(self.waybill.Number)
         print("Veoselehe staatuse päring õnnestus, staatus on %s." % status.Status)
 
+    def test_status_watcher(self):
+        print("Veoselehe (number = %s) staatuse jälgimine..." % str(self.waybill.Number))
+
+        changes = []
+        watcher = StatusWatcher(self.client, on_change=changes.append)
+        watcher.watch_waybill(self.waybill.Number)
+        watcher.poll()
+
+        assert len(changes) == 1 and changes[0].number == self.waybill.Number
+
+        print("Veoselehe staatuse jälgimine õnnestus, staatus on %s." % changes[0].status)
+
     def test_search_waybills(self):
         print("Veoselehtede otsimine ...")
 
@@ -398,6 +449,64 @@ class ElvisProxyTest(object):
 
         print("Veoselehtede otsimine õnnestus! (%d tulemust)" % search_result.TotalCount)
 
+    def test_waybill_index(self):
+        print("Veoselehtede otsimine lokaalsest indeksist ...")
+
+        index = WaybillIndex([self.client.get_waybill(self.waybill.Number)])
+        result = index.search(
+            FilterItem(
+                WaybillListItemSearchField.WaybillNumber,
+                self.waybill.Number
+            ),
+            SortItem(
+                WaybillListItemSortField.CreatedOn,
+                SortDirection.Asc
+            ),
+        )
+
+        assert [x.Number for x in result] == [self.waybill.Number]
+
+        print("Veoselehtede otsimine lokaalsest indeksist õnnestus! (%d tulemust)" % len(result))
+
+    def test_iter_waybills(self):
+        print("Veoselehtede läbimine lehekülgede kaupa ...")
+
+        numbers = [item.Number for item in self.client.iter_waybills(
+            WaybillRoleContext.All,
+            FilterItem(
+                WaybillListItemSearchField.WaybillNumber,
+                self.waybill.Number
+            ),
+            SortItem(
+                WaybillListItemSortField.CreatedOn,
+                SortDirection.Asc
+            ),
+            page_size=1,
+        )]
+        assert self.waybill.Number in numbers
+
+        print("Veoselehtede läbimine õnnestus! (%d tulemust)" % len(numbers))
+
+    def test_search_waybills_all(self):
+        print("Kõikide veoselehtede paralleelne otsimine ...")
+
+        items = self.client.search_waybills_all(
+            WaybillRoleContext.All,
+            FilterItem(
+                WaybillListItemSearchField.WaybillNumber,
+                self.waybill.Number
+            ),
+            SortItem(
+                WaybillListItemSortField.CreatedOn,
+                SortDirection.Asc
+            ),
+            page_size=1,
+            workers=2,
+        )
+        assert self.waybill.Number in [item.Number for item in items]
+
+        print("Kõikide veoselehtede otsimine õnnestus! (%d tulemust)" % len(items))
+
     def test_reception_assortments(self):
         print("Vastuvõetud sortimendide lisamine ...", self.waybill.Shipments[0].TimberBatches[0].Id)
 
@@ -485,6 +594,26 @@ class ElvisProxyTest(object):
         else:
             raise Exception("Täppismõõdetud faili kustutamine ebaõnnestus!")
 
+    def test_fine_measurement_file_from_disk(self):
+        print("Täppismõõdetud faili lisamine kettalt ...")
+
+        with tempfile.NamedTemporaryFile(suffix='.txt') as fHandle:
+            fHandle.write(b'Test tekstifail kettalt')
+            fHandle.flush()
+
+            fine_measurement_file_id = self.client.insert_fine_measurement_file(
+                self.waybill.Number,
+                FineMeasurementFile(content_type='text/plain', file_path=fHandle.name,
+                                    description='Testimiseks lisatud', file_name='Test.txt'),
+            )
+        print("Täppismõõdetud faili lisamine õnnestus (id = %s)" % fine_measurement_file_id)
+
+        if self.client.delete_fine_measurement_file(fine_measurement_file_id):
+            print("Täppismõõdetud faili kustutamine õnnestus!")
+
+        else:
+            raise Exception("Täppismõõdetud faili kustutamine ebaõnnestus!")
+
 
 if __name__ == '__main__':
     test = ElvisProxyTest()
@@ -513,6 +642,7 @@ if __name__ == '__main__':
             print('Testing warehouses')
             test.test_add_warehouse()
             test.test_get_warehouse()
+            test.test_get_warehouse_cached()
             test.test_search_warehouse()
             test.test_delete_warehouse()
 
@@ -521,14 +651,21 @@ if __name__ == '__main__':
 
             test.test_insert_waybill()
             test.test_get_waybill()
+            test.test_get_waybills()
+            test.test_get_waybill_cached()
             test.test_set_waybill_status()
             test.test_get_waybill_status()
+            test.test_status_watcher()
 
             test.test_search_waybills()
+            test.test_waybill_index()
+            test.test_iter_waybills()
+            test.test_search_waybills_all()
 
             if all_tests or lvis_test_config.TEST_LEVEL_WAYBILL_ASSORTMENTS in lvis_test_config.TESTING_RANGE:
                 test.test_reception_assortments()
                 test.test_fine_measurement_assortments()
                 test.test_fine_measurement_files()
+                test.test_fine_measurement_file_from_disk()
 
     print("Testi lõpp!")
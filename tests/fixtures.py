@@ -0,0 +1,157 @@
+"""Response data (as decoded from the proxy JSON) used by the offline tests and the benchmarks"""
+
+TIMESTAMP = '/Date(1625646000000+0300)/'
+
+
+def address():
+    return {
+        'AddressAdditionalInformation': 'Metsa 1', 'CityBorough': 'Tartu', 'County': 'Tartumaa', 'EHAK': '0795',
+        'NearAddress': 'Metsa', 'RuralDistrict': None, 'ExtensionData': None,
+    }
+
+
+def warehouse(i=1):
+    return {
+        'Id': i, 'Name': 'Ladu %d' % i, 'Code': 'L%d' % i, 'ContactEmail': None, 'ContactName': 'Mari',
+        'ContactPhone': '5555555', 'Description': 'Vahelaoplats', 'Appropriation': 'Metsamaa', 'Quarter': 'KU123',
+        'IsDry': True, 'IsParallelLoading': False, 'LambertEstX': 6470000.5, 'LambertEstY': 660000.5,
+        'Address': address(), 'ForestDistrictId': 8001, 'ExtensionData': None,
+        'AdditionalProperties': [{'TypeId': 25001, 'Value': 'Suvitee', 'ExtensionData': None}],
+    }
+
+
+def pack(number):
+    return {
+        'Factor': 0.6, 'Width': 2.4, 'Heidht': 2.1, 'Length': 3.0 + number, 'Number': number, 'VehicleType': 9001,
+        'ExtensionData': None,
+    }
+
+
+def assortment(i, n_packs=3):
+    return {
+        'Id': i, 'Amount': 1.25 + i % 10, 'Description': None, 'TimberAssortmentTypeId': 30 + i % 10,
+        'ExtensionData': None, 'Packs': [pack(k) for k in range(n_packs)],
+    }
+
+
+def batch(i, n_assortments=5, n_packs=3):
+    return {
+        'Id': i, 'Appropriation': 'Metsamaa', 'Description': None, 'CadastralNumber': '79401:001:0001',
+        'DocDate': TIMESTAMP, 'DocNumber': 'D%d' % i, 'HoldingBaseId': 6001, 'ForestNotice': None,
+        'PreviousOwnerAddress': None, 'PreviousOwnerCode': None, 'PreviousOwnerName': None, 'Quarter': 'KU123',
+        'RegisteredImmovableNumber': '1234', 'ExtensionData': None,
+        'Certificates': [{'CertificateNumber': 'FSC-1', 'TypeId': 3001, 'ExtensionData': None}],
+        'Assortments': [assortment(j + 1000 * i, n_packs) for j in range(n_assortments)],
+    }
+
+
+def person(code='47101010033'):
+    return {
+        'EMail': 'juht@example.com', 'Firstname': 'Jaan', 'Lastname': 'Juht', 'PersonCode': code, 'Phone': '5555555',
+        'ExtensionData': None,
+    }
+
+
+def transport(code='47101010033', trailer='123ABC', van='456DEF'):
+    return {
+        'Driver': person(code), 'ExtensionData': None,
+        'Trailer': {'Model': 'Kraker', 'RegistrationNumber': trailer, 'ExtensionData': None},
+        'Van': {'Model': 'Volvo', 'RegistrationNumber': van, 'ExtensionData': None},
+    }
+
+
+def owner():
+    authorized_person = person()
+    authorized_person.update({'Address': address(), 'AuthorizationBase': 'Volikiri'})
+
+    return {
+        'Code': '10000001', 'Email': 'omanik@example.com', 'Name': 'Metsaomanik OÜ', 'Phone': '5555555',
+        'ExtensionData': None, 'Address': address(), 'AuthorizedPerson': authorized_person,
+    }
+
+
+def receiver_destination():
+    return {
+        'Destination': warehouse(3), 'ExtensionData': None,
+        'Receiver': {
+            'Code': '10000002', 'Email': 'saaja@example.com', 'Name': 'Saeveski AS', 'Phone': '5555555',
+            'ContactEmail': None, 'ContactName': 'Mari', 'ContactPhone': '5555555', 'Address': address(),
+            'AuthorizationBase': None, 'AdditionalProperties': [], 'ExtensionData': None,
+        },
+    }
+
+
+def transporter(transports):
+    data = {
+        'CompanyRegistrationNumber': '10000003', 'ContactEmail': None, 'ContactName': 'Mari',
+        'ContactPhone': '5555555', 'AdditionalProperties': [], 'ExtensionData': None,
+    }
+    if isinstance(transports, list):
+        data['Transports'] = transports
+    else:
+        data['Transport'] = transports
+
+    return data
+
+
+def status_change_log(status):
+    return {'ChangedBy': 'Jaan Juht', 'ChangedOn': TIMESTAMP, 'Status': status, 'ExtensionData': None}
+
+
+def waybill(number='W1', n_batches=4, n_assortments=5, n_packs=3, status=7002):
+    return {
+        'Number': number, 'AltNumber': 'A-%s' % number, 'Description': None, 'IsDisputed': False, 'Status': status,
+        'TransportOrderNumber': 'T1', 'PreJourneyLength': 10, 'TotalJourneyLength': 120,
+        'Version': [0, 0, 0, 0, 0, 1, 2, 3], 'ExtensionData': None,
+        'TimberOwner': owner(), 'TimberReceiverDestination': receiver_destination(),
+        'Transporter': transporter(transport()),
+        'FineMeasurements': [],
+        'ReceivedAssortments': [batch(i, n_assortments, n_packs) for i in range(n_batches)],
+        'StatusChangeLogs': [status_change_log(7001)],
+        'Shipments': [
+            {
+                'Warehouse': warehouse(i), 'ExtensionData': None,
+                'TimberBatches': [batch(j, n_assortments, n_packs) for j in range(n_batches)],
+            } for i in range(2)
+        ],
+    }
+
+
+def transport_order(number='T1', n_transports=3, status=4002):
+    return {
+        'Number': number, 'AltNumber': 'A-%s' % number, 'Deadline': TIMESTAMP, 'GroupId': None, 'Status': status,
+        'Priority': 11002, 'Description': None, 'TransportContractNumber': 'L-1', 'IsPartialOperationsAllowed': True,
+        'IsVisibleToReceiver': True, 'Version': [0, 0, 0, 0, 0, 0, 0, 1], 'ExtensionData': None,
+        'TimberOwner': owner(), 'TimberReceiverDestination': receiver_destination(),
+        'Transporter': transporter([transport('3%010d' % i, 'T%d' % i, 'V%d' % i) for i in range(n_transports)]),
+        'StatusChangeLogs': [status_change_log(4001)],
+        'Shipments': [{'Warehouse': warehouse(1), 'TimberBatches': [batch(1)], 'ExtensionData': None}],
+    }
+
+
+def timber_warehouse(i=1, n_batches=50):
+    data = warehouse(i)
+    data.update({
+        'CadastralNumber': '79401:001:0001', 'IsActive': True, 'IsPublic': True, 'Type': 5001,
+        'Version': [0, 0, 0, 0, 0, 0, 0, 1], 'TimberBatches': [batch(j) for j in range(n_batches)],
+    })
+
+    return data
+
+
+def waybill_list_item(number='W1', status=7002):
+    return {
+        'Number': number, 'AltNumber': None, 'OwnerCode': '10000001', 'OwnerName': 'Metsaomanik OÜ',
+        'ReceiverCode': '10000002', 'ReceiverName': 'Saeveski AS', 'Status': status, 'TransportOrderNumber': None,
+        'TransporterCode': '10000003', 'TransporterName': 'Vedaja OÜ', 'Version': 'AAAAAAAAB9E=',
+        'ExtensionData': None,
+    }
+
+
+def transport_order_list_item(number='T1', status=4002):
+    return {
+        'Number': number, 'AltNumber': None, 'OwnerCode': '10000001', 'OwnerName': 'Metsaomanik OÜ',
+        'ReceiverCode': '10000002', 'ReceiverName': 'Saeveski AS', 'TransporterCode': '10000003',
+        'TransporterName': 'Vedaja OÜ', 'Deadline': TIMESTAMP, 'GroupId': None, 'Version': 'AAAAAAAAB9E=',
+        'Status': status, 'Priority': 11002, 'ExtensionData': None,
+    }
@@ -0,0 +1,135 @@
+import asyncio
+import json
+import unittest
+
+import requests
+
+from elvis.api import ElvisClient, ElvisException
+from elvis.async_api import AsyncElvisClient, aiohttp
+
+from . import fixtures
+
+
+def get_document(number):
+    if number == 'error':
+        raise ElvisException('Not found', None)
+    if number == 'offline':
+        raise requests.ConnectionError('Connection refused')
+
+    return number
+
+
+class MapConcurrentlyTestCase(unittest.TestCase):
+    def test_request_errors_are_returned_in_place(self):
+        results = ElvisClient._map_concurrently(get_document, ['a', 'error', 'offline', 'b'], workers=2)
+
+        self.assertEqual(results[0], 'a')
+        self.assertIsInstance(results[1], ElvisException)
+        self.assertIsInstance(results[2], requests.ConnectionError)
+        self.assertEqual(results[3], 'b')
+
+    def test_programming_errors_are_raised(self):
+        def get(number):
+            assert number != 'bad', 'No valid session available'
+            return number
+
+        self.assertRaises(AssertionError, ElvisClient._map_concurrently, get, ['a', 'bad'], workers=2)
+        self.assertRaises(TypeError, ElvisClient._map_concurrently, lambda x: x + 1, ['a'], workers=2)
+
+
+@unittest.skipIf(aiohttp is None, 'aiohttp is not installed')
+class GatherTestCase(unittest.TestCase):
+    def gather(self, get, numbers):
+        loop = asyncio.new_event_loop()
+        try:
+            return loop.run_until_complete(AsyncElvisClient._gather(get(number) for number in numbers))
+        finally:
+            loop.close()
+
+    def test_request_errors_are_returned_in_place(self):
+        async def get(number):
+            if number == 'offline':
+                raise aiohttp.ClientConnectionError('Connection refused')
+            if number == 'slow':
+                raise asyncio.TimeoutError()
+            return get_document(number)
+
+        results = self.gather(get, ['a', 'error', 'offline', 'slow'])
+
+        self.assertEqual(results[0], 'a')
+        self.assertIsInstance(results[1], ElvisException)
+        self.assertIsInstance(results[2], aiohttp.ClientError)
+        self.assertIsInstance(results[3], asyncio.TimeoutError)
+
+    def test_programming_errors_are_raised(self):
+        async def get(number):
+            assert number != 'bad', 'No valid session available'
+            return number
+
+        self.assertRaises(AssertionError, self.gather, get, ['a', 'bad'])
+
+
+class FakeBulkClient(ElvisClient):
+    """Answers the Get* document requests from dicts of id -> data, missing ids get an empty result"""
+
+    RESULTS = {
+        'GetWaybill': ('waybill_id', 'GetWaybillResult'),
+        'GetTransportOrder': ('transport_order_id', 'GetTransportOrderResult'),
+        'GetWarehouse': ('warehouse_id', 'GetWarehouseResult'),
+    }
+
+    def __init__(self, documents):
+        super(FakeBulkClient, self).__init__('http://localhost/%s', '1', session_token='x')
+        self.documents = documents  # endpoint -> id -> data
+
+    def _ElvisClient__request(self, endpoint, method, attrs=None):
+        id_argument, result_key = self.RESULTS[endpoint]
+        document_id = attrs[id_argument]
+
+        if document_id == 'offline':
+            raise requests.ConnectionError('Connection refused')
+        if document_id == 'error':
+            return {'Success': False, 'message': 'Bad status code: 500', 'raw': 'Internal error'}
+
+        # Each response is new data, like a decoded response body
+        data = json.loads(json.dumps(self.documents[endpoint].get(document_id)))
+        return {'Success': True, 'raw': {result_key: data}}
+
+
+class BulkGetTestCase(unittest.TestCase):
+    def setUp(self):
+        self.client = FakeBulkClient({
+            'GetWaybill': {'W1': fixtures.waybill('W1', n_batches=1), 'W2': fixtures.waybill('W2', n_batches=1)},
+            'GetTransportOrder': {'T1': fixtures.transport_order('T1'), 'T2': fixtures.transport_order('T2')},
+            'GetWarehouse': dict((i, fixtures.timber_warehouse(i, n_batches=1)) for i in (1, 2)),
+        })
+
+    def test_get_waybills(self):
+        results = self.client.get_waybills(['W2', 'missing', 'error', 'offline', 'W1'], workers=3)
+
+        self.assertEqual(results[0].Number, 'W2')
+        self.assertIsNone(results[1])
+        self.assertIsInstance(results[2], ElvisException)
+        self.assertIsInstance(results[3], requests.ConnectionError)
+        self.assertEqual(results[4].Number, 'W1')
+
+    def test_get_transport_orders(self):
+        results = self.client.get_transport_orders(['T2', 'missing', 'error', 'T1'], workers=3)
+
+        self.assertEqual(results[0].Number, 'T2')
+        # The TransportOrder constructor rejects an empty result
+        self.assertIsInstance(results[1], ElvisException)
+        self.assertIsInstance(results[2], ElvisException)
+        self.assertEqual(results[3].Number, 'T1')
+
+    def test_get_warehouses(self):
+        results = self.client.get_warehouses([2, 3, 'offline', 1], workers=3)
+
+        self.assertEqual([getattr(result, 'Id', result) for result in results[:2]], [2, None])
+        self.assertIsInstance(results[2], requests.ConnectionError)
+        self.assertEqual(results[3].Id, 1)
+
+    def test_programming_errors_are_raised(self):
+        self.client.session_token = None
+
+        self.assertRaises(AssertionError, self.client.get_waybills, ['W1', 'W2'])
@@ -0,0 +1,43 @@
+import unittest
+
+from elvis.columnar import assortment_columns, numpy, pack_columns, to_structured_array, waybill_list_columns
+from elvis.models import CompactWaybillListItem, Waybill, WaybillListPage
+
+from . import fixtures
+
+
+@unittest.skipIf(numpy is None, 'numpy is not installed')
+class ColumnarTestCase(unittest.TestCase):
+    def test_waybill_list_columns(self):
+        items = [fixtures.waybill_list_item('W%d' % i, status=7001 + i % 2) for i in range(4)]
+        items[3]['OwnerName'] = None
+        page = WaybillListPage(dict_data={'Items': items[:2], 'TotalCount': 4})
+
+        columns = waybill_list_columns([page, [CompactWaybillListItem(item) for item in items[2:]]])
+
+        self.assertEqual(columns['Number'].tolist(), ['W0', 'W1', 'W2', 'W3'])
+        self.assertEqual(columns['Status'].tolist(), [7001, 7002, 7001, 7002])
+        self.assertEqual(columns['OwnerName'].decode().tolist(), ['Metsaomanik OÜ'] * 3 + [None])
+        self.assertEqual(len(to_structured_array(columns)), 4)
+
+    def test_pack_numbers_may_be_strings(self):
+        data = fixtures.waybill(n_batches=1, n_assortments=1, n_packs=3)
+        packs = data['ReceivedAssortments'][0]['Assortments'][0]['Packs']
+        packs[1]['Number'] = 'P-2'
+        packs[2]['Number'] = None
+
+        columns = pack_columns([Waybill(dict_data=data)])
+
+        self.assertEqual(columns['Number'].tolist(), ['0', 'P-2', ''])
+        self.assertEqual(columns['WaybillNumber'].decode().tolist(), ['W1'] * 3)
+        self.assertEqual(columns['AssortmentId'].tolist(), [0] * 3)
+
+    def test_assortment_columns_read_deferred_data(self):
+        waybill = Waybill(dict_data=fixtures.waybill(n_batches=2, n_assortments=2))
+
+        columns = assortment_columns([waybill, fixtures.waybill('W2', n_batches=1, n_assortments=2)])
+
+        self.assertEqual(columns['Id'].tolist(), [0, 1, 1000, 1001, 0, 1])
+        self.assertEqual(columns['BatchId'].tolist(), [0, 0, 1, 1, 0, 0])
+        self.assertEqual(columns['WaybillNumber'].decode().tolist(), ['W1'] * 4 + ['W2'] * 2)
+        self.assertIn('ReceivedAssortments', waybill.__dict__['_deferred'])
@@ -0,0 +1,127 @@
+import json
+import unittest
+from copy import copy
+from datetime import datetime
+from decimal import Decimal
+
+from elvis.api import ElvisClient
+from elvis.encoding import ElvisEncoder, OrjsonBackend, StdlibJSONBackend, get_default_json_backend, orjson
+from elvis.enums import SortDirection, WarehouseType, WaybillListItemSearchField, WaybillListItemSortField
+from elvis.models import (
+    Address, CompactModel, CompactTimberAssortment, CompactWaybillListItem, ElvisModel, FilterItem,
+    FineMeasurementFile, SortItem, TimberAssortment, TimberBatch, TimberWarehouse, TransportOrder, Waybill,
+)
+from elvis.utils import ELVIS_TIMEZONE, encode_elvis_timestamp
+
+from . import fixtures
+
+
+class LegacyEncoder(json.JSONEncoder):
+    """ElvisEncoder as it was before the serializer registry was added, copied unchanged
+
+    Checks and special cases are evaluated for every object.
+    """
+
+    ELVIS_OBJECTS = (
+        FilterItem,
+        SortItem,
+        WarehouseType,
+        Address,
+        ElvisModel,
+        CompactModel,
+    )
+
+    def default(self, obj):
+        if isinstance(obj, Decimal):
+            return float(obj)
+
+        if isinstance(obj, datetime):
+            return encode_elvis_timestamp(obj)
+
+        if not isinstance(obj, LegacyEncoder.ELVIS_OBJECTS):
+            return super(LegacyEncoder, self).default(obj)
+
+        if isinstance(obj, ElvisModel):
+            obj._hydrate_deferred()
+
+        if isinstance(obj, CompactModel):
+            ret = obj._to_dict()
+        else:
+            ret = copy(obj.__dict__)
+
+        if isinstance(obj, FineMeasurementFile):
+            del ret['Data']
+            del ret['_file_path']
+            del ret['_file']
+            del ret['_file_offset']
+
+        if 'Id' in ret and ret['Id'] is None:
+            del ret['Id']
+
+        if '_already_loaded' in ret:
+            del ret['_already_loaded']
+
+        if '_deferred' in ret:
+            del ret['_deferred']
+
+        if '_decoded' in ret:
+            del ret['_decoded']
+
+        return ret
+
+
+def make_objects():
+    waybill = Waybill(dict_data=fixtures.waybill())
+    waybill.TimberReceiverDestination  # Partly hydrated
+
+    order = TransportOrder(dict_data=fixtures.transport_order())
+    order.Deadline  # Decoded value cached
+
+    return [
+        FilterItem(WaybillListItemSearchField.CreatedOnStart, datetime(2021, 7, 7, 12, 30)),
+        SortItem(WaybillListItemSortField.CreatedOn, SortDirection.Asc),
+        WarehouseType(),
+        Decimal('12.5'),
+        ELVIS_TIMEZONE.localize(datetime(2021, 7, 7, 12, 30)),
+        TimberBatch(doc_number='D1', doc_date=datetime(2021, 7, 7), assortments=[
+            TimberAssortment(amount=Decimal('1.5'), assortment_type=30, description=None),
+        ]),
+        TimberBatch(batch_id=12, doc_number='D2'),
+        FineMeasurementFile(content_type='text/plain', data=b'Test', file_name='Test.txt', description='Test'),
+        Waybill(dict_data=fixtures.waybill()),
+        waybill,
+        order,
+        TimberWarehouse(dict_data=fixtures.timber_warehouse(n_batches=3)),
+        CompactTimberAssortment(fixtures.assortment(1)),
+        CompactWaybillListItem(fixtures.waybill_list_item()),
+    ]
+
+
+class SerializerTestCase(unittest.TestCase):
+    def test_output_matches_legacy_encoder(self):
+        for obj, expected in zip(make_objects(), make_objects()):
+            self.assertEqual(json.dumps(obj, cls=ElvisEncoder), json.dumps(expected, cls=LegacyEncoder), obj)
+
+    def test_backends_match_legacy_encoder(self):
+        backends = [StdlibJSONBackend()] + ([OrjsonBackend()] if orjson is not None else [])
+        expected = json.loads(json.dumps(make_objects(), cls=LegacyEncoder))
+
+        for backend in backends:
+            self.assertEqual(json.loads(backend.dumps(make_objects())), expected, backend)
+
+    def test_orjson_is_opt_in(self):
+        self.assertIsInstance(get_default_json_backend(), StdlibJSONBackend)
+        self.assertIsInstance(ElvisClient('http://localhost/%s', '1').json_backend, StdlibJSONBackend)
+
+    def test_subclasses_get_their_own_serializer(self):
+        class CustomBatch(TimberBatch):
+            _PRIVATE_ATTRIBUTES = TimberBatch._PRIVATE_ATTRIBUTES + ('Secret', )
+
+        batch = CustomBatch(doc_number='D1')
+        batch.Secret = 'x'
+
+        self.assertNotIn('Secret', json.loads(json.dumps(batch, cls=ElvisEncoder)))
+        self.assertIn('DocNumber', json.loads(json.dumps(batch, cls=ElvisEncoder)))
+
+    def test_unknown_objects_are_rejected(self):
+        self.assertRaises(TypeError, json.dumps, object(), cls=ElvisEncoder)
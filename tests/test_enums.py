@@ -0,0 +1,58 @@
+import inspect
+import unittest
+
+from elvis import enums
+from elvis.enums import ElvisEnum, Priority, WaybillStatus
+
+
+ENUMS = [
+    value for value in vars(enums).values()
+    if inspect.isclass(value) and issubclass(value, ElvisEnum) and value is not ElvisEnum
+]
+
+
+def legacy_display_name(cls, status):
+    for item in cls.__dict__:
+        if not item.startswith("_") and isinstance(cls.__dict__[item], int) and cls.__dict__[item] == int(status):
+            return item
+    return "Unknown"
+
+
+def legacy_get_status_choices(cls):
+    choices = []
+    for item in cls.__dict__:
+        if not item.startswith("_") and isinstance(cls.__dict__[item], int):
+            choices.append((cls.__dict__[item], item))
+
+    return choices
+
+
+class ElvisEnumTestCase(unittest.TestCase):
+    def test_display_name_matches_legacy(self):
+        for cls in ENUMS:
+            for value in [value for value, _ in legacy_get_status_choices(cls)] + [-1, 99999]:
+                self.assertEqual(cls.display_name(value), legacy_display_name(cls, value), (cls, value))
+                self.assertEqual(cls.display_name(str(value)), legacy_display_name(cls, value), (cls, value))
+
+    def test_get_status_choices_matches_legacy(self):
+        for cls in ENUMS:
+            self.assertEqual(cls.get_status_choices(), legacy_get_status_choices(cls), cls)
+
+    def test_display_name(self):
+        self.assertEqual(WaybillStatus.display_name(WaybillStatus.Composing), 'Composing')
+        self.assertEqual(Priority.display_name('11003'), 'High')
+        self.assertEqual(Priority.display_name(1), 'Unknown')
+        self.assertRaises(ValueError, Priority.display_name, 'High')
+
+    def test_is_valid(self):
+        self.assertTrue(Priority.is_valid(Priority.Normal))
+        self.assertFalse(Priority.is_valid(WaybillStatus.Composing))
+        self.assertFalse(Priority.is_valid(None))
+
+    def test_subclasses_have_their_own_maps(self):
+        class ExtendedPriority(Priority):
+            Urgent = 11004
+
+        self.assertEqual(ExtendedPriority.display_name(11004), 'Urgent')
+        self.assertEqual(ExtendedPriority.get_status_choices(), [(11004, 'Urgent')])
+        self.assertEqual(Priority.display_name(11004), 'Unknown')
@@ -0,0 +1,113 @@
+import asyncio
+import base64
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from elvis.async_api import AsyncElvisClient, aiohttp
+from elvis.encoding import Base64JSONBody, StdlibJSONBackend
+from elvis.models import FineMeasurementFile
+
+
+class FakeResponse(object):
+    def __init__(self, status, content):
+        self.status = status
+        self.content = content
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        pass
+
+    async def read(self):
+        return self.content
+
+
+class FakeHttpSession(object):
+    """Reads request bodies chunk by chunk like aiohttp does and answers InsertFineMeasurementFile"""
+
+    def __init__(self):
+        self.requests = []
+
+    async def post(self, url, data, headers):
+        if isinstance(data, (bytes, str)):
+            chunks = [data]
+        else:
+            chunks = [chunk async for chunk in data]
+
+        self.requests.append((url, headers, chunks))
+        return FakeResponse(200, json.dumps({'InsertFineMeasurementFileResult': 5}).encode('utf-8'))
+
+    async def close(self):
+        pass
+
+
+class FineMeasurementFileTestMixin(object):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.path)
+
+    def make_file(self, size):
+        file_path = os.path.join(self.path, 'measurements.txt')
+        with open(file_path, 'wb') as fHandle:
+            fHandle.write(os.urandom(size))
+
+        return FineMeasurementFile(file_path=file_path, file_name='measurements.txt', content_type='text/plain')
+
+
+class Base64JSONBodyTestCase(FineMeasurementFileTestMixin, unittest.TestCase):
+    def test_body_matches_the_in_memory_request(self):
+        for size in [0, 1, 2, 3, Base64JSONBody.CHUNK_SIZE + 1, 2 * Base64JSONBody.CHUNK_SIZE + 2]:
+            fine_measurement_file = self.make_file(size)
+            backend = StdlibJSONBackend()
+
+            body = Base64JSONBody(backend, {'waybill_number': 'W1'}, 'file_data', fine_measurement_file)
+            data = b''.join(body)
+
+            self.assertEqual(len(data), len(body))
+            self.assertEqual(json.loads(data.decode('utf-8')), {
+                'waybill_number': 'W1',
+                'file_data': base64.b64encode(fine_measurement_file.read_data()).decode('ascii'),
+            })
+
+
+@unittest.skipIf(aiohttp is None, 'aiohttp is not installed')
+class AsyncInsertFineMeasurementFileTestCase(FineMeasurementFileTestMixin, unittest.TestCase):
+    def insert(self, fine_measurement_file):
+        client = AsyncElvisClient('http://localhost/%s', '1', session_token='x')
+        client.http_session = FakeHttpSession()
+
+        loop = asyncio.new_event_loop()
+        try:
+            result = loop.run_until_complete(client.insert_fine_measurement_file('W1', fine_measurement_file))
+        finally:
+            loop.close()
+
+        self.assertEqual(result, 5)
+        self.assertEqual(len(client.http_session.requests), 1)
+
+        return client.http_session.requests[0]
+
+    def test_file_backed_files_are_streamed(self):
+        fine_measurement_file = self.make_file(2 * Base64JSONBody.CHUNK_SIZE + 1)
+        url, headers, chunks = self.insert(fine_measurement_file)
+        data = b''.join(chunks)
+
+        self.assertEqual(url, 'http://localhost/InsertFineMeasurementFile')
+        self.assertGreater(len(chunks), 2)
+        self.assertEqual(headers['Content-Length'], str(len(data)))
+
+        document = json.loads(data.decode('utf-8'))
+        self.assertEqual(document['waybill_number'], 'W1')
+        self.assertEqual(document['file']['FileName'], 'measurements.txt')
+        self.assertEqual(base64.b64decode(document['file_data']), fine_measurement_file.read_data())
+
+    def test_in_memory_files_are_sent_in_one_piece(self):
+        url, headers, chunks = self.insert(FineMeasurementFile(data=b'1;2;3', file_name='measurements.txt'))
+
+        self.assertEqual(len(chunks), 1)
+        self.assertNotIn('Content-Length', headers)
+        self.assertEqual(base64.b64decode(json.loads(chunks[0])['file_data']), b'1;2;3')
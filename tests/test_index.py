@@ -0,0 +1,118 @@
+import unittest
+from unittest import mock
+from datetime import datetime, timedelta
+
+from elvis.enums import SortDirection, WaybillListItemSearchField, WaybillListItemSortField
+from elvis.index import EXACT_FIELDS, WaybillIndex
+from elvis.models import FilterItem, SortItem, TransportOrder, Waybill
+from elvis.utils import ELVIS_TIMEZONE, encode_elvis_timestamp
+
+from . import fixtures
+
+
+CREATED_ON = ELVIS_TIMEZONE.localize(datetime(2021, 7, 7, 12, 0))
+
+
+def make_waybill(number, created_on=CREATED_ON, **changes):
+    data = fixtures.waybill(number, n_batches=1)
+    data['StatusChangeLogs'][0]['ChangedOn'] = encode_elvis_timestamp(created_on)
+    data.update(changes)
+
+    return Waybill(dict_data=data)
+
+
+def numbers(waybills):
+    return [waybill.Number for waybill in waybills]
+
+
+class WaybillIndexTestCase(unittest.TestCase):
+    def setUp(self):
+        self.index = WaybillIndex([
+            make_waybill('W1', CREATED_ON - timedelta(days=2), Status=7001),
+            make_waybill('W2', CREATED_ON, Status=7002),
+            make_waybill('W3', CREATED_ON + timedelta(days=2), Status=7002),
+        ])
+        self.sort = SortItem(WaybillListItemSortField.CreatedOn, SortDirection.Desc)
+
+    def test_exact_and_text_filters(self):
+        self.assertEqual(
+            numbers(self.index.search(FilterItem(WaybillListItemSearchField.StatusId, 7002), self.sort)), ['W3', 'W2'],
+        )
+        self.assertEqual(
+            numbers(self.index.search([
+                FilterItem(WaybillListItemSearchField.OwnerCompanyName, 'metsaomanik'),
+                FilterItem(WaybillListItemSearchField.NotInStatusId, 7002),
+            ], self.sort)),
+            ['W1'],
+        )
+        self.assertEqual(self.index.count(FilterItem(WaybillListItemSearchField.SourceWarehouseCodeOrName, 'l1')), 3)
+
+    def test_created_on_range(self):
+        filters = [
+            FilterItem(WaybillListItemSearchField.CreatedOnStart, CREATED_ON),
+            FilterItem(WaybillListItemSearchField.CreatedOnEnd, encode_elvis_timestamp(CREATED_ON + timedelta(days=2))),
+        ]
+
+        self.assertEqual(numbers(self.index.search(filters, self.sort)), ['W3', 'W2'])
+        self.assertEqual(numbers(self.index.search(filters[1:], self.sort, start=1, limit=1)), ['W2'])
+
+    def test_numeric_numbers_with_equal_created_on(self):
+        index = WaybillIndex([make_waybill(1), make_waybill(2), make_waybill(3, CREATED_ON + timedelta(hours=1))])
+
+        result = index.search(FilterItem(WaybillListItemSearchField.CreatedOnEnd, CREATED_ON), [])
+        self.assertEqual(numbers(result), [1, 2])
+
+    def test_waybills_without_shipments_or_status_change_logs(self):
+        order = TransportOrder(dict_data=fixtures.transport_order())
+        transport_hash = order.Transporter.Transports[0].get_hash()
+
+        waybill = order.create_waybill(transport_hash, shipments=[])
+        waybill.Number = 'W4'
+        self.index.add(waybill)
+
+        self.assertEqual(
+            numbers(self.index.search(FilterItem(WaybillListItemSearchField.TransportOrderNumber, 'T1'), self.sort)),
+            ['W3', 'W2', 'W1', 'W4'],
+        )
+        self.assertEqual(self.index.count(FilterItem(WaybillListItemSearchField.CreatedOnStart, CREATED_ON)), 2)
+
+    def test_remove(self):
+        self.assertEqual(numbers([self.index.remove('W2')]), ['W2'])
+        self.assertIsNone(self.index.remove('W2'))
+        self.assertEqual(self.index.count(FilterItem(WaybillListItemSearchField.StatusId, 7002)), 1)
+        self.assertEqual(self.index.count(FilterItem(WaybillListItemSearchField.CreatedOnStart, CREATED_ON)), 1)
+
+    def test_waybills_without_nested_models(self):
+        # Composing waybills can miss the owner, transporter and destination
+        self.index.add(Waybill(dict_data={'Number': 'W4'}))
+
+        self.assertEqual(len(self.index), 4)
+        self.assertEqual(self.index.count(FilterItem(WaybillListItemSearchField.WaybillNumber, 'w4')), 1)
+        self.assertEqual(self.index.count(FilterItem(WaybillListItemSearchField.OwnerCode, '10000001')), 3)
+        self.assertEqual(self.index.count(FilterItem(WaybillListItemSearchField.DriverName, 'jaan')), 3)
+        self.assertEqual(numbers(self.index.search([], self.sort)), ['W3', 'W2', 'W1', 'W4'])
+        for field in (WaybillListItemSortField.OwnerName, WaybillListItemSortField.DestinationWarehouseName):
+            self.assertEqual(
+                numbers(self.index.search([], SortItem(field, SortDirection.Asc))), ['W4', 'W1', 'W2', 'W3'],
+            )
+
+        self.index.add(Waybill(dict_data={'Number': 'W4', 'Status': 7001}))
+        self.assertEqual(self.index.count(FilterItem(WaybillListItemSearchField.StatusId, 7001)), 2)
+        self.assertEqual(numbers([self.index.remove('W4')]), ['W4'])
+        self.assertEqual(len(self.index), 3)
+
+    def test_failed_add_leaves_the_index_unchanged(self):
+        def fail(waybill):
+            raise AttributeError('Code')
+
+        waybill = make_waybill('W4')
+        with mock.patch.dict(EXACT_FIELDS, {WaybillListItemSearchField.OwnerCode: fail}):
+            self.assertRaises(AttributeError, self.index.add, waybill)
+            self.assertRaises(AttributeError, self.index.add, make_waybill('W2'))
+
+        self.assertEqual(len(self.index), 3)
+        self.assertNotIn('W4', self.index)
+        self.assertEqual(numbers(self.index.search([], self.sort)), ['W3', 'W2', 'W1'])
+
+        self.index.add(waybill)
+        self.assertEqual(numbers(self.index.search([], self.sort)), ['W3', 'W2', 'W4', 'W1'])
@@ -0,0 +1,284 @@
+import hashlib
+import json
+import sys
+import threading
+import unittest
+from datetime import datetime
+
+from elvis.encoding import ElvisEncoder
+from elvis.models import (
+    AdditionalProperty, CompactPack, CompactTimberAssortment, CompactTransportOrderListItem, CompactWaybillListItem,
+    Pack, TimberAssortment, TimberBatch, TimberWarehouse, Transport, TransportOrder, TransportOrderListItem, Waybill,
+    WaybillListItem, WaybillListPage, WaybillTransporter,
+)
+from elvis.utils import decode_elvis_timestamp
+
+from . import fixtures
+
+
+class LazyModelAttributeTestCase(unittest.TestCase):
+    def setUp(self):
+        # Switch threads often so they overlap inside hydration
+        self.switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+
+    def tearDown(self):
+        sys.setswitchinterval(self.switch_interval)
+
+    def test_concurrent_first_reads(self):
+        errors = []
+
+        for _ in range(50):
+            waybill = Waybill(dict_data=fixtures.waybill(n_batches=20), adopt=True)
+            barrier = threading.Barrier(8)
+            values = []
+
+            def read():
+                barrier.wait()
+                try:
+                    values.append(waybill.Shipments)
+                except AttributeError as e:
+                    errors.append(e)
+
+            threads = [threading.Thread(target=read) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+            self.assertTrue(all(value is values[0] for value in values))
+
+        self.assertEqual(errors, [])
+
+    def test_missing_attribute(self):
+        waybill = Waybill(dict_data={'Number': 'W1'})
+
+        self.assertRaises(AttributeError, getattr, waybill, 'Shipments')
+        self.assertFalse(hasattr(waybill, 'Transporter'))
+
+
+def encode(obj):
+    return json.loads(json.dumps(obj, cls=ElvisEncoder))
+
+
+class DatetimeAttributeTestCase(unittest.TestCase):
+    def test_reads_are_decoded(self):
+        batch = TimberBatch(dict_data=fixtures.batch(1))
+        order = TransportOrder(dict_data=fixtures.transport_order())
+
+        self.assertEqual(batch.DocDate, decode_elvis_timestamp(fixtures.TIMESTAMP))
+        self.assertEqual(order.Deadline, decode_elvis_timestamp(fixtures.TIMESTAMP))
+        self.assertEqual(order.StatusChangeLogs[0].ChangedOn, decode_elvis_timestamp(fixtures.TIMESTAMP))
+        self.assertIs(batch.DocDate, batch.DocDate)
+
+    def test_assignment_replaces_cached_value(self):
+        batch = TimberBatch(dict_data=fixtures.batch(1))
+        self.assertEqual(batch.DocDate.year, 2021)
+
+        batch.DocDate = '/Date(946677600000+0200)/'
+        self.assertEqual(batch.DocDate, decode_elvis_timestamp('/Date(946677600000+0200)/'))
+
+        value = datetime(2020, 1, 2, 3, 4, 5)
+        batch.DocDate = value
+        self.assertIs(batch.DocDate, value)
+
+        del batch.DocDate
+        self.assertFalse(hasattr(batch, 'DocDate'))
+
+    def test_encoding_keeps_raw_values(self):
+        for model, data in [
+            (TimberBatch, fixtures.batch(1)),
+            (TransportOrder, fixtures.transport_order()),
+            (Waybill, fixtures.waybill()),
+        ]:
+            obj = model(dict_data=json.loads(json.dumps(data)))
+            expected = encode(obj)
+
+            # Reading (and caching) the decoded values doesn't change the output
+            for name in dir(obj):
+                if not name.startswith('_'):
+                    getattr(obj, name)
+
+            self.assertEqual(encode(obj), expected)
+            self.assertEqual(expected, data)
+
+
+class CompactModelTestCase(unittest.TestCase):
+    def test_encoding_matches_full_models(self):
+        for model, compact_model, data in [
+            (Pack, CompactPack, fixtures.pack(1)),
+            (TimberAssortment, CompactTimberAssortment, fixtures.assortment(1)),
+            (WaybillListItem, CompactWaybillListItem, fixtures.waybill_list_item()),
+            (TransportOrderListItem, CompactTransportOrderListItem, fixtures.transport_order_list_item()),
+        ]:
+            obj = model(dict_data=json.loads(json.dumps(data)))
+
+            self.assertEqual(encode(compact_model(json.loads(json.dumps(data)))), encode(obj))
+            self.assertEqual(encode(compact_model.from_model(obj)), encode(obj))
+
+    def test_missing_fields_stay_unset(self):
+        pack = CompactPack({'Number': 1, 'Custom': 'x'})
+
+        self.assertEqual(pack.Number, 1)
+        self.assertFalse(hasattr(pack, 'Length'))
+        self.assertEqual(encode(pack), {'Number': 1, 'Custom': 'x'})
+
+
+class AdoptTestCase(unittest.TestCase):
+    CASES = [
+        (Waybill, lambda: fixtures.waybill()),
+        (TransportOrder, lambda: fixtures.transport_order()),
+        (TimberWarehouse, lambda: fixtures.timber_warehouse(n_batches=3)),
+        (WaybillListPage, lambda: {
+            'Items': [fixtures.waybill_list_item('W%d' % i) for i in range(3)], 'TotalCount': 3,
+        }),
+    ]
+
+    def test_adopted_models_encode_like_copies(self):
+        for model, make_data in self.CASES:
+            self.assertEqual(encode(model(dict_data=make_data(), adopt=True)), encode(model(dict_data=make_data())))
+
+    def test_copies_leave_the_data_untouched(self):
+        for model, make_data in self.CASES:
+            data = make_data()
+            encode(model(dict_data=data))
+
+            self.assertEqual(data, make_data())
+
+    def test_adopted_data_is_shared_with_nested_models(self):
+        data = fixtures.waybill()
+        owner_data = data['TimberOwner']
+        batch_data = data['Shipments'][0]['TimberBatches'][0]
+
+        waybill = Waybill(dict_data=data, adopt=True)
+
+        self.assertIs(waybill.__dict__, data)
+        self.assertIs(waybill.TimberOwner.__dict__, owner_data)
+        self.assertIs(waybill.Shipments[0].TimberBatches[0].__dict__, batch_data)
+        self.assertNotIn('_adopted', encode(waybill))
+
+    def test_copies_are_not_adopted(self):
+        data = fixtures.waybill()
+        waybill = Waybill(dict_data=data)
+
+        self.assertIsNot(waybill.__dict__, data)
+        self.assertFalse(waybill.TimberOwner._adopted)
+        self.assertIsNot(waybill.TimberOwner.__dict__, data['TimberOwner'])
+
+
+def legacy_get_waybill_transporter(transporter, transport_hash):
+    """TransportOrderTransporter.get_waybill_transporter before the transport index"""
+    transport = None
+    for t in transporter.Transports:
+        if transport_hash == hashlib.md5(
+            ("%s%s%s" % (t.Driver.PersonCode, t.Trailer.RegistrationNumber, t.Van.RegistrationNumber)).encode("utf-8")
+        ).hexdigest():
+            transport = t
+            break
+    assert transport
+
+    dict_data = json.loads(json.dumps(transporter, cls=ElvisEncoder))
+    del dict_data['Transports']
+    dict_data['Transport'] = transport
+
+    return WaybillTransporter(dict_data=dict_data)
+
+
+class TransportOrderTransporterTestCase(unittest.TestCase):
+    def setUp(self):
+        self.order = TransportOrder(dict_data=fixtures.transport_order(n_transports=5))
+        self.transports = self.order.Transporter.Transports
+
+    def test_transport_hash(self):
+        transport = self.transports[1]
+
+        self.assertEqual(transport.get_hash(), hashlib.md5(b'3000000000' b'1' b'T1' b'V1').hexdigest())
+
+    def test_transport_index(self):
+        transporter = self.order.Transporter
+        index = transporter.get_transport_index()
+
+        self.assertEqual(index, dict((transport.get_hash(), transport) for transport in self.transports))
+        self.assertIs(transporter.get_transport_index(), index)
+
+        # The first transport wins on duplicate hashes
+        duplicate = Transport(dict_data=fixtures.transport('30000000000', 'T0', 'V0'))
+        transporter.Transports.append(duplicate)
+        self.assertIs(transporter.get_transport_index()[duplicate.get_hash()], self.transports[0])
+
+        # Replacing the list rebuilds the index
+        transporter.Transports = [duplicate]
+        self.assertEqual(transporter.get_transport_index(), {duplicate.get_hash(): duplicate})
+
+    def test_waybill_transporter_after_in_place_changes(self):
+        transporter = self.order.Transporter
+        old_hash = self.transports[1].get_hash()
+        transporter.get_transport_index()
+
+        # Replaced in place, the list and its length stay the same
+        replacement = Transport(dict_data=fixtures.transport('40000000000', 'T9', 'V9'))
+        transporter.Transports[1] = replacement
+
+        waybill_transporter = transporter.get_waybill_transporter(replacement.get_hash())
+        self.assertEqual(waybill_transporter.Transport.Driver.PersonCode, '40000000000')
+        self.assertRaises(AssertionError, transporter.get_waybill_transporter, old_hash)
+
+        # Modified in place
+        transport = self.transports[2]
+        transport_hash = transport.get_hash()
+        transport.Van.RegistrationNumber = 'V10'
+
+        self.assertRaises(AssertionError, transporter.get_waybill_transporter, transport_hash)
+        waybill_transporter = transporter.get_waybill_transporter(transport.get_hash())
+        self.assertEqual(waybill_transporter.Transport.Van.RegistrationNumber, 'V10')
+        self.assertEqual(
+            encode(waybill_transporter), encode(legacy_get_waybill_transporter(transporter, transport.get_hash())),
+        )
+
+    def test_waybill_transporter_matches_legacy(self):
+        for transport in self.transports:
+            transport_hash = transport.get_hash()
+            waybill_transporter = self.order.Transporter.get_waybill_transporter(transport_hash)
+
+            self.assertIsInstance(waybill_transporter, WaybillTransporter)
+            self.assertEqual(
+                encode(waybill_transporter),
+                encode(legacy_get_waybill_transporter(self.order.Transporter, transport_hash)),
+            )
+            self.assertNotIn('_transport_index', encode(self.order))
+
+    def test_waybill_transporter_is_a_copy(self):
+        self.order.Transporter.AdditionalProperties = [AdditionalProperty(type_id=25001, value='x')]
+        waybill_transporter = self.order.Transporter.get_waybill_transporter(self.transports[0].get_hash())
+
+        waybill_transporter.ContactName = 'Changed'
+        waybill_transporter.AdditionalProperties[0].Value = 'y'
+
+        self.assertEqual(self.order.Transporter.ContactName, 'Mari')
+        self.assertEqual(self.order.Transporter.AdditionalProperties[0].Value, 'x')
+
+    def test_unknown_transport(self):
+        self.assertRaises(AssertionError, self.order.Transporter.get_waybill_transporter, 'unknown')
+
+    def test_create_waybill(self):
+        transport_hash = self.transports[2].get_hash()
+        waybill = self.order.create_waybill(transport_hash, alt_number='A-1')
+
+        self.assertIsInstance(waybill, Waybill)
+        self.assertEqual(waybill.TransportOrderNumber, 'T1')
+        self.assertEqual(waybill.AltNumber, 'A-1')
+        self.assertIs(waybill.TimberOwner, self.order.TimberOwner)
+        self.assertEqual(waybill.Shipments, self.order.Shipments)
+        self.assertEqual(waybill.Transporter.Transport.get_hash(), transport_hash)
+        self.assertEqual(
+            encode(waybill.Transporter), encode(self.order.Transporter.get_waybill_transporter(transport_hash)),
+        )
+
+    def test_create_waybills(self):
+        orders = [TransportOrder(dict_data=fixtures.transport_order('T%d' % i)) for i in range(3)]
+        transport_hash = orders[0].Transporter.Transports[0].get_hash()
+
+        waybills = TransportOrder.create_waybills(orders, transport_hash)
+
+        self.assertEqual([waybill.TransportOrderNumber for waybill in waybills], ['T0', 'T1', 'T2'])
+        self.assertTrue(all(waybill.Transporter.Transport.get_hash() == transport_hash for waybill in waybills))
@@ -0,0 +1,134 @@
+import unittest
+from datetime import datetime, timedelta
+
+from elvis.api import ElvisClient
+from elvis.enums import WaybillListItemSearchField
+from elvis.models import WaybillListPage
+
+
+def list_items(count):
+    return [{'Number': 'W%04d' % i} for i in range(count)]
+
+
+class CappedSearchClient(ElvisClient):
+    """Serves search_waybills from a list, returning at most max_limit items per page like a capping proxy"""
+
+    def __init__(self, items, max_limit):
+        super(CappedSearchClient, self).__init__('http://localhost/%s', '1', session_token='x')
+        self.items = items
+        self.max_limit = max_limit
+
+    def search_waybills(self, context, filters, sorting, start=0, limit=20, show_count=False):
+        return WaybillListPage(dict_data={
+            'Items': self.items[start:start + min(limit, self.max_limit)],
+            'TotalCount': len(self.items) if show_count else None,
+        })
+
+
+class CreatedOnSearchClient(CappedSearchClient):
+    """Applies the CreatedOnStart/CreatedOnEnd filters (both inclusive) to items created at the given times"""
+
+    def __init__(self, created_on, max_limit):
+        self.created_on = created_on  # number -> datetime
+        self.requests = []
+
+        numbers = sorted(created_on, key=lambda number: (created_on[number], number))
+        super(CreatedOnSearchClient, self).__init__([{'Number': number} for number in numbers], max_limit)
+
+    def search_waybills(self, context, filters, sorting, start=0, limit=20, show_count=False):
+        window = dict((item.Field, item.Value) for item in filters)
+        created_from = window[WaybillListItemSearchField.CreatedOnStart]
+        created_to = window[WaybillListItemSearchField.CreatedOnEnd]
+        self.requests.append((created_from, created_to, show_count))
+
+        items = [item for item in self.items if created_from <= self.created_on[item['Number']] <= created_to]
+        return WaybillListPage(dict_data={
+            'Items': items[start:start + min(limit, self.max_limit)],
+            'TotalCount': len(items) if show_count else None,
+        })
+
+
+class PagingTestCase(unittest.TestCase):
+    def assertNumbers(self, items, expected):
+        self.assertEqual([item.Number for item in items], [item['Number'] for item in expected])
+
+    def test_iter_pages_continues_after_capped_pages(self):
+        items = list_items(25)
+        client = CappedSearchClient(items, max_limit=10)
+
+        self.assertNumbers(client.iter_waybills(1, [], [], page_size=100), items)
+        self.assertNumbers(client.iter_waybills(1, [], [], page_size=5), items)
+
+    def test_fetch_all_pages_uses_capped_page_size(self):
+        items = list_items(95)
+        client = CappedSearchClient(items, max_limit=20)
+
+        self.assertNumbers(client.search_waybills_all(1, [], [], page_size=100, workers=4), items)
+        self.assertNumbers(client.search_waybills_all(1, [], [], page_size=7, workers=4), items)
+
+    def test_fetch_all_pages_without_results(self):
+        client = CappedSearchClient([], max_limit=20)
+
+        self.assertEqual(client.search_waybills_all(1, [], [], page_size=10), [])
+
+    def test_fetch_all_pages_picks_up_items_added_after_counting(self):
+        items = list_items(30)
+        client = CappedSearchClient(items[:20], max_limit=10)
+        search_waybills = client.search_waybills
+
+        def search_and_add(*args, **kwargs):
+            page = search_waybills(*args, **kwargs)
+            client.items = items
+            return page
+
+        client.search_waybills = search_and_add
+
+        self.assertNumbers(client.search_waybills_all(1, [], [], page_size=10, workers=1), items)
+
+    def test_sharded_windows_continue_after_capped_pages(self):
+        items = list_items(45)
+        client = CappedSearchClient(items, max_limit=10)
+
+        created_from = datetime(2021, 1, 1)
+        result = client.search_waybills_sharded(1, [], [], created_from, created_from + timedelta(days=1),
+                                                shard_size=100, page_size=50)
+        self.assertNumbers(result, items)
+
+    def test_sharded_windows_are_split(self):
+        created_from = datetime(2021, 1, 1)
+        created_to = created_from + timedelta(days=1)
+
+        # Spread over the day, with some documents exactly on the window boundaries the splits create
+        created_on = dict(('W%04d' % i, created_from + timedelta(minutes=7 * i)) for i in range(200))
+        for i in range(17):
+            created_on['B%02d' % i] = created_from + timedelta(days=1) * i / 16
+
+        client = CreatedOnSearchClient(created_on, max_limit=10)
+        result = client.search_waybills_sharded(1, [], [], created_from, created_to, shard_size=30, page_size=20)
+
+        expected = [item['Number'] for item in client.items]
+        self.assertEqual([item.Number for item in result], expected)
+
+        fetched = sorted(set((start, end) for start, end, show_count in client.requests if not show_count))
+        self.assertGreaterEqual(len(fetched), 8)
+
+        # The fetched windows cover the range without gaps and each of them fits the shard size
+        self.assertEqual(fetched[0][0], created_from)
+        self.assertEqual(fetched[-1][1], created_to)
+        for (_, end), (next_start, _) in zip(fetched, fetched[1:]):
+            self.assertEqual(end, next_start)
+        for start, end in fetched:
+            self.assertLessEqual(len([x for x in created_on.values() if start <= x <= end]), 30)
+
+    def test_sharded_windows_stop_splitting_at_min_duration(self):
+        created_from = datetime(2021, 1, 1)
+        created_on = dict(('W%04d' % i, created_from + timedelta(hours=1)) for i in range(50))
+        created_on['W9999'] = created_from + timedelta(hours=3)
+
+        client = CreatedOnSearchClient(created_on, max_limit=10)
+        result = client.search_waybills_sharded(
+            1, [], [], created_from, created_from + timedelta(hours=4), shard_size=10,
+            min_shard_duration=timedelta(minutes=30),
+        )
+
+        self.assertEqual([item.Number for item in result], sorted(created_on))
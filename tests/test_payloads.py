@@ -0,0 +1,111 @@
+import json
+import unittest
+from datetime import datetime
+
+import pytz
+
+from elvis.encoding import ElvisEncoder
+from elvis.models import Pack, TimberAssortment, TimberBatch
+from elvis.payloads import build_packs, build_timber_assortments, build_timber_batches
+from elvis.utils import ELVIS_TIMEZONE, numpy
+
+
+def encode(obj):
+    return json.loads(json.dumps(obj, cls=ElvisEncoder))
+
+
+def to_columns(rows):
+    return dict((key, [row[key] for row in rows]) for key in rows[0])
+
+
+PACK_ROWS = [
+    {'factor': 0.6, 'width': 2.4, 'height': 2.1, 'length': 3.0 + i, 'number': i, 'vehicle_type': 9001}
+    for i in range(3)
+]
+
+BATCH_ROWS = [
+    {
+        'appropriation': 'Metsamaa', 'certificates': [], 'description': None, 'cadastral_number': '79401:001:0001',
+        'doc_date': datetime(2021, 7, 7, 12, 30), 'doc_number': 'D%d' % i, 'holding_base_id': 6001,
+        'batch_id': i or None, 'forest_notice': None, 'prev_owner_address': None, 'prev_owner_code': None,
+        'prev_owner_name': None, 'quarter': 'KU123', 'reg_immovable_number': '1234',
+    } for i in range(3)
+]
+
+
+class PayloadBuilderTestCase(unittest.TestCase):
+    def test_packs_match_models(self):
+        expected = encode([Pack(**row) for row in PACK_ROWS])
+
+        self.assertEqual(encode(build_packs(PACK_ROWS)), expected)
+        self.assertEqual(encode(build_packs(to_columns(PACK_ROWS))), expected)
+        self.assertEqual(build_packs([]), [])
+        self.assertEqual(build_packs({}), [])
+
+    def test_column_lengths_must_match(self):
+        columns = to_columns(PACK_ROWS)
+        columns['number'] = columns['number'][:2]
+        self.assertRaises(AssertionError, build_packs, columns)
+
+        # The first column isn't special, columns that are not given are filled to the common length
+        columns = {'width': [2.4] * 3, 'length': [3.0] * 3}
+        self.assertEqual([payload['Factor'] for payload in build_packs(columns)], [None] * 3)
+
+        columns['factor'] = [0.6] * 4
+        self.assertRaises(AssertionError, build_packs, columns)
+        self.assertRaises(AssertionError, build_timber_batches, dict(to_columns(BATCH_ROWS), quarter=['KU123']))
+
+    def test_timber_assortments_match_models(self):
+        packs = [Pack(**row) for row in PACK_ROWS]
+        rows = [
+            {'amount': 1.5, 'description': None, 'assortment_type': 30, 'timber_assortment_id': None, 'packs': packs},
+            {'amount': 2.5, 'description': 'x', 'assortment_type': 31, 'timber_assortment_id': 12, 'packs': packs[0]},
+            {'amount': 3.5, 'description': None, 'assortment_type': 32},
+        ]
+        expected = encode([TimberAssortment(**row) for row in rows])
+
+        self.assertEqual(encode(build_timber_assortments(rows)), expected)
+        self.assertEqual(encode(build_timber_assortments(to_columns(rows[:2]))), expected[:2])
+
+        # Payloads made with build_packs are accepted in place of Packs
+        rows[0]['packs'] = build_packs(PACK_ROWS)
+        self.assertEqual(encode(build_timber_assortments(rows)), expected)
+
+    def test_timber_assortment_validation(self):
+        self.assertRaises(AssertionError, build_timber_assortments, [{'amount': None}])
+        self.assertRaises(AssertionError, build_timber_assortments, [{'amount': 1, 'packs': ['x']}])
+
+        # A single payload dict would be iterated as its keys
+        self.assertRaises(AssertionError, build_timber_assortments, [{'amount': 1, 'packs': build_packs(PACK_ROWS)[0]}])
+
+    def test_timber_batches_match_models(self):
+        assortments = [TimberAssortment(amount=1.5, assortment_type=30)]
+        rows = [dict(row, assortments=assortments) for row in BATCH_ROWS]
+        expected = encode([TimberBatch(**row) for row in rows])
+
+        self.assertEqual(encode(build_timber_batches(rows)), expected)
+        self.assertEqual(encode(build_timber_batches(to_columns(rows))), expected)
+        self.assertNotIn('Id', build_timber_batches(rows)[0])
+
+    @unittest.skipIf(numpy is None, 'numpy is not installed')
+    def test_numpy_columns(self):
+        instant = pytz.utc.localize(datetime(2021, 7, 7, 9, 30))
+        rows = [dict(row, assortments=[], doc_date=instant) for row in BATCH_ROWS]
+        expected = encode([TimberBatch(**row) for row in rows])
+
+        for unit in ['ns', 'us', 's']:
+            columns = to_columns(rows)
+            columns['doc_date'] = numpy.array([numpy.datetime64('2021-07-07T09:30', unit)] * 3)
+            columns['holding_base_id'] = numpy.array(columns['holding_base_id'])
+
+            self.assertEqual(encode(build_timber_batches(columns)), expected, unit)
+
+        rows[0]['doc_date'] = numpy.datetime64('2021-07-07T09:30', 'ns')
+        self.assertEqual(encode(build_timber_batches(rows[:1])), expected[:1])
+        self.assertEqual(
+            build_timber_batches(rows[:1])[0]['DocDate'],
+            encode(ELVIS_TIMEZONE.localize(datetime(2021, 7, 7, 12, 30))),
+        )
+
+        packs = build_packs(dict((key, numpy.array(values)) for key, values in to_columns(PACK_ROWS).items()))
+        self.assertEqual(encode(packs), encode([Pack(**row) for row in PACK_ROWS]))
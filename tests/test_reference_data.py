@@ -0,0 +1,134 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from elvis.api import ElvisClient
+from elvis.cache import ReferenceDataCache
+from elvis.enums import AssortmentType
+
+
+ASSORTMENT_TYPES = [
+    {'Id': 30, 'Name': 'Palk', 'ExtensionData': None},
+    {'Id': 31, 'Name': 'Paberipuu', 'ExtensionData': None},
+]
+
+
+class Fetch(object):
+    def __init__(self, items):
+        self.items = items
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.items
+
+
+class ReferenceDataCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.path)
+
+        self.now = 1000.0
+        patcher = mock.patch('elvis.cache.time.time', lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_lists_expire_after_ttl(self):
+        cache = ReferenceDataCache(60)
+        fetch = Fetch(ASSORTMENT_TYPES)
+
+        self.assertEqual(cache.get('types', fetch), ASSORTMENT_TYPES)
+        self.now += 59
+        self.assertEqual(cache.get('types', fetch), ASSORTMENT_TYPES)
+        self.assertEqual(fetch.calls, 1)
+
+        self.now += 1
+        cache.get('types', fetch)
+        self.assertEqual(fetch.calls, 2)
+
+        cache.clear()
+        cache.get('types', fetch)
+        self.assertEqual(fetch.calls, 3)
+
+    def test_id_index(self):
+        cache = ReferenceDataCache(60)
+        fetch = Fetch(ASSORTMENT_TYPES)
+
+        index = cache.get_index('types', fetch)
+
+        self.assertEqual(index, {30: ASSORTMENT_TYPES[0], 31: ASSORTMENT_TYPES[1]})
+        self.assertIs(cache.get_index('types', fetch), index)
+        self.assertEqual(ReferenceDataCache(60, id_field='Name').get_index('types', fetch)['Palk']['Id'], 30)
+        self.assertEqual(fetch.calls, 2)
+
+    def test_lists_are_loaded_from_the_file(self):
+        path = os.path.join(self.path, 'reference_data.json')
+        fetch = Fetch(ASSORTMENT_TYPES)
+        ReferenceDataCache(60, path=path).get('types', fetch)
+
+        # A new cache (e.g. in the next process) reads the list and its fetch time from the file
+        self.now += 30
+        cache = ReferenceDataCache(60, path=path)
+        self.assertEqual(cache.get('types', fetch), ASSORTMENT_TYPES)
+        self.assertEqual(cache.get_index('types', fetch)[31]['Name'], 'Paberipuu')
+        self.assertEqual(fetch.calls, 1)
+
+        self.now += 30
+        ReferenceDataCache(60, path=path).get('types', fetch)
+        self.assertEqual(fetch.calls, 2)
+
+    def test_broken_file_is_ignored(self):
+        path = os.path.join(self.path, 'reference_data.json')
+        with open(path, 'w') as fHandle:
+            fHandle.write('{')
+
+        fetch = Fetch(ASSORTMENT_TYPES)
+        self.assertEqual(ReferenceDataCache(60, path=path).get('types', fetch), ASSORTMENT_TYPES)
+        self.assertEqual(fetch.calls, 1)
+
+    def test_save_errors_keep_the_fetched_data(self):
+        cache = ReferenceDataCache(60, path=os.path.join(self.path, 'missing', 'reference_data.json'))
+        fetch = Fetch(ASSORTMENT_TYPES)
+
+        with self.assertLogs('elvis.cache', 'WARNING'):
+            self.assertEqual(cache.get('types', fetch), ASSORTMENT_TYPES)
+
+        self.assertEqual(cache.get_index('types', fetch)[30]['Name'], 'Palk')
+        self.assertEqual(fetch.calls, 1)
+
+
+class FakeAssortmentTypesClient(ElvisClient):
+    def __init__(self, **kwargs):
+        super(FakeAssortmentTypesClient, self).__init__('http://localhost/%s', '1', session_token='x', **kwargs)
+        self.requests = []
+
+    def _ElvisClient__request(self, endpoint, method, attrs=None):
+        assert endpoint == 'getAssortmentTypes'
+        self.requests.append(attrs['assortment_type'])
+
+        items = ASSORTMENT_TYPES if attrs['assortment_type'] == AssortmentType.ELVIS else ASSORTMENT_TYPES[:1]
+        return {'Success': True, 'raw': {'getAssortmentTypesResult': json.loads(json.dumps(items))}}
+
+
+class CachedAssortmentTypesTestCase(unittest.TestCase):
+    def test_assortment_types_are_cached_per_type(self):
+        client = FakeAssortmentTypesClient()
+
+        self.assertEqual(client.get_cached_assortment_types(), ASSORTMENT_TYPES)
+        self.assertEqual(sorted(client.get_assortment_type_index()), [30, 31])
+        self.assertEqual(list(client.get_assortment_type_index(AssortmentType.COMPANY)), [30])
+        self.assertEqual(client.requests, [AssortmentType.ELVIS, AssortmentType.COMPANY])
+
+    def test_reference_data_path(self):
+        path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, path)
+        path = os.path.join(path, 'reference_data.json')
+
+        FakeAssortmentTypesClient(reference_data_path=path).get_cached_assortment_types()
+
+        client = FakeAssortmentTypesClient(reference_data_path=path)
+        self.assertEqual(client.get_assortment_type_index()[31]['Name'], 'Paberipuu')
+        self.assertEqual(client.requests, [])
@@ -0,0 +1,234 @@
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+from elvis.api import ElvisException
+from elvis.enums import WaybillListItemSearchField, WaybillRoleContext, WaybillStatus
+from elvis.models import Waybill, WaybillListItem, WaybillStatusInfo
+from elvis.sync import MemorySyncStore, SqliteSyncStore, WaybillSync
+from elvis.utils import ELVIS_TIMEZONE, decode_elvis_timestamp
+
+from . import fixtures
+
+
+NOW = ELVIS_TIMEZONE.localize(datetime(2021, 7, 7, 12, 0))
+
+
+class FakeClient(object):
+    """Serves waybills from memory, documents are dicts with the created time, status and version of a waybill"""
+
+    DEFAULT_WORKERS = 2
+
+    def __init__(self):
+        self.documents = {}
+        self.status_requests = []
+        self.missing = set()  # get_waybills returns None for these
+        self.status_errors = set()
+        self.download_errors = set()
+
+    def add(self, number, created_on, status=WaybillStatus.Composing):
+        self.documents[number] = {'created_on': created_on, 'status': status, 'version': 1}
+
+    def update(self, number, status):
+        self.documents[number]['status'] = status
+        self.documents[number]['version'] += 1
+
+    def search_waybills_all(self, context, filters, sorting, workers):
+        created_from = [item.Value for item in filters if item.Field == WaybillListItemSearchField.CreatedOnStart][0]
+        if created_from.tzinfo is None:
+            created_from = ELVIS_TIMEZONE.localize(created_from)
+
+        return [
+            self._list_item(number, document)
+            for number, document in sorted(self.documents.items()) if document['created_on'] >= created_from
+        ]
+
+    @staticmethod
+    def _list_item(number, document):
+        data = fixtures.waybill_list_item(number, document['status'])
+        data['Version'] = [document['version']]
+        return WaybillListItem(dict_data=data)
+
+    def get_waybills(self, numbers, workers):
+        results = []
+        for number in numbers:
+            if number in self.missing:
+                results.append(None)
+            elif number in self.download_errors:
+                results.append(ElvisException('Download failed', None))
+            else:
+                document = self.documents[number]
+                data = fixtures.waybill(number, n_batches=1, status=document['status'])
+                data['Version'] = [document['version']]
+                results.append(Waybill(dict_data=data))
+
+        return results
+
+    def get_waybill_statuses(self, numbers, workers):
+        self.status_requests.append(list(numbers))
+
+        results = []
+        for number in numbers:
+            if number in self.status_errors:
+                results.append(ElvisException('Status not available', None))
+            else:
+                document = self.documents[number]
+                results.append(WaybillStatusInfo(dict_data={
+                    'Number': number, 'Status': document['status'], 'Version': [document['version']],
+                }))
+
+        return results
+
+
+class WaybillSyncTestCase(unittest.TestCase):
+    def setUp(self):
+        self.client = FakeClient()
+        self.store = MemorySyncStore()
+        self.now = NOW
+
+    def run_sync(self):
+        sync = WaybillSync(self.client, WaybillRoleContext.Transporter, self.store, lookback=timedelta(hours=1))
+        sync._now = lambda: self.now
+        return sync.run()
+
+    def stored_status(self, number):
+        return self.store.documents['waybills'][number].Status
+
+    def test_first_run_downloads_the_window(self):
+        self.client.add('W1', NOW - timedelta(days=10))
+        self.client.add('W2', NOW - timedelta(days=1), WaybillStatus.Finalized)
+
+        result = self.run_sync()
+
+        self.assertEqual(result.added, ['W1', 'W2'])
+        self.assertEqual(sorted(self.store.documents['waybills']), ['W1', 'W2'])
+        self.assertEqual(result.watermark['open'], ['W1'])
+        self.assertEqual(decode_elvis_timestamp(result.watermark['window_from']), NOW - timedelta(hours=1))
+
+    def test_open_documents_before_the_window_are_rechecked(self):
+        self.client.add('W1', NOW - timedelta(days=10))
+        self.client.add('W2', NOW - timedelta(days=10), WaybillStatus.Cancelled)
+        self.run_sync()
+
+        # W1 is created long before the next window, its status changes
+        self.now = NOW + timedelta(days=2)
+        self.client.update('W1', WaybillStatus.Confirmed)
+
+        result = self.run_sync()
+
+        self.assertEqual(self.client.status_requests, [['W1']])
+        self.assertEqual(result.changed, ['W1'])
+        self.assertEqual(self.stored_status('W1'), WaybillStatus.Confirmed)
+
+        # Nothing changed
+        result = self.run_sync()
+        self.assertEqual((result.added, result.changed, result.unchanged), ([], [], 1))
+
+        # Once W1 reaches a terminal status it's not checked anymore
+        self.client.update('W1', WaybillStatus.Finalized)
+        result = self.run_sync()
+
+        self.assertEqual(result.changed, ['W1'])
+        self.assertEqual(self.stored_status('W1'), WaybillStatus.Finalized)
+        self.assertEqual(result.watermark['open'], [])
+        self.assertEqual(result.watermark['versions'], {})
+
+        self.run_sync()
+        self.assertEqual(self.client.status_requests, [['W1'], ['W1'], ['W1']])
+
+    def test_failed_status_checks_are_retried(self):
+        self.client.add('W1', NOW - timedelta(days=10))
+        self.run_sync()
+
+        self.now = NOW + timedelta(days=2)
+        self.client.update('W1', WaybillStatus.Confirmed)
+        self.client.status_errors.add('W1')
+
+        result = self.run_sync()
+        self.assertEqual(list(result.failed), ['W1'])
+        self.assertEqual(result.watermark['open'], ['W1'])
+        self.assertEqual(self.stored_status('W1'), WaybillStatus.Composing)
+
+        self.client.status_errors.clear()
+        result = self.run_sync()
+        self.assertEqual(result.changed, ['W1'])
+        self.assertEqual(self.stored_status('W1'), WaybillStatus.Confirmed)
+
+    def test_failed_downloads_are_retried(self):
+        self.client.add('W1', NOW - timedelta(days=10))
+        self.client.add('W2', NOW - timedelta(days=10), WaybillStatus.Finalized)
+        self.client.download_errors.update(['W1', 'W2'])
+
+        result = self.run_sync()
+        self.assertEqual(sorted(result.failed), ['W1', 'W2'])
+        self.assertEqual(result.added, [])
+        self.assertEqual(result.watermark['open'], ['W1', 'W2'])
+        self.assertEqual(result.watermark['versions'], {'W1': None, 'W2': None})
+        self.assertNotIn('waybills', self.store.documents)
+
+        # Both have left the window, they are downloaded once the status check sees them
+        self.now = NOW + timedelta(days=2)
+        self.client.download_errors.clear()
+        result = self.run_sync()
+
+        self.assertEqual(self.client.status_requests, [['W1', 'W2']])
+        self.assertEqual(result.added, ['W1', 'W2'])
+        self.assertEqual(result.failed, {})
+        self.assertEqual(sorted(self.store.documents['waybills']), ['W1', 'W2'])
+        self.assertEqual(result.watermark['open'], ['W1'])
+        self.assertEqual(list(result.watermark['versions']), ['W1'])
+
+    def test_failed_downloads_of_changed_documents_are_retried(self):
+        self.client.add('W1', NOW - timedelta(days=10))
+        self.run_sync()
+
+        self.now = NOW + timedelta(days=2)
+        self.client.update('W1', WaybillStatus.Finalized)
+        self.client.download_errors.add('W1')
+        result = self.run_sync()
+
+        self.assertEqual(list(result.failed), ['W1'])
+        self.assertEqual(result.watermark['open'], ['W1'])
+        self.assertEqual(self.stored_status('W1'), WaybillStatus.Composing)
+
+        self.client.download_errors.clear()
+        result = self.run_sync()
+        self.assertEqual(result.changed, ['W1'])
+        self.assertEqual(self.stored_status('W1'), WaybillStatus.Finalized)
+        self.assertEqual(result.watermark['open'], [])
+
+    def test_missing_documents_are_deleted(self):
+        self.client.add('W1', NOW - timedelta(days=10))
+        self.client.add('W2', NOW - timedelta(days=10))
+        self.run_sync()
+
+        self.client.update('W1', WaybillStatus.Confirmed)
+        self.client.missing.add('W1')
+        result = self.run_sync()
+
+        self.assertEqual(result.deleted, ['W1'])
+        self.assertEqual(sorted(self.store.documents['waybills']), ['W2'])
+        self.assertNotIn('W1', result.watermark['versions'])
+        self.assertNotIn('W1', result.watermark['open'])
+
+    def test_sqlite_store(self):
+        path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, path)
+        self.store = SqliteSyncStore(os.path.join(path, 'sync.sqlite3'))
+
+        self.client.add('W1', NOW - timedelta(days=10))
+        self.client.add('W2', NOW - timedelta(days=10))
+        self.run_sync()
+
+        self.now = NOW + timedelta(days=2)
+        self.client.update('W1', WaybillStatus.Confirmed)
+        self.client.update('W2', WaybillStatus.Confirmed)
+        self.client.missing.add('W2')
+        result = self.run_sync()
+
+        self.assertEqual((result.changed, result.deleted), (['W1'], ['W2']))
+        self.assertEqual(self.store.get_document_data('waybills', 'W1')['Status'], WaybillStatus.Confirmed)
+        self.assertIsNone(self.store.get_document_data('waybills', 'W2'))
+        self.assertEqual(self.store.get_watermark('waybills:%d' % WaybillRoleContext.Transporter)['open'], ['W1'])
@@ -0,0 +1,187 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from elvis.api import ElvisClient, ElvisException
+from elvis.tokens import FileTokenStore, SqliteTokenStore
+
+
+class FakeResponse(object):
+    def __init__(self, status_code, data):
+        self.status_code = status_code
+        self.content = json.dumps(data).encode('utf-8')
+
+
+class FakeProxy(object):
+    """Issues numbered session tokens, only the latest one is accepted"""
+
+    def __init__(self, authorize_delay=0):
+        self.authorize_delay = authorize_delay
+        self.token = None
+        self.issued = 0
+        self.requests = []
+
+        self._lock = threading.Lock()
+
+    def authorize(self):
+        # A slow authorization makes concurrent refreshes overlap
+        time.sleep(self.authorize_delay)
+
+        with self._lock:
+            self.issued += 1
+            self.token = 'token-%d' % self.issued
+            return self.token
+
+    def expire(self):
+        self.token = None
+
+
+class FakeClient(ElvisClient):
+    """Sends requests to a FakeProxy instead of the network"""
+
+    def __init__(self, proxy, token_store, **kwargs):
+        super(FakeClient, self).__init__('http://localhost/%s', '1', token_store=token_store, **kwargs)
+        self.load_cert_from_base64str('certificate')
+        self.proxy = proxy
+
+    def _ElvisClient__send(self, endpoint, method, attrs):
+        self.proxy.requests.append(endpoint)
+
+        if endpoint == 'Authorize':
+            token = self.proxy.authorize()
+            return FakeResponse(200, {'AuthorizeResult': {'Success': True, 'access_token': token, 'expires_in': 60}})
+
+        if self.session_token is None or self.session_token != self.proxy.token:
+            return FakeResponse(401, {'Message': 'Authorization has been denied for this request.'})
+
+        return FakeResponse(200, {'GetInformationResult': {'Version': '1.1.0'}})
+
+
+class TokenStoreTestMixin(object):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.path)
+
+    def make_store(self):
+        raise NotImplementedError
+
+    def test_tokens_are_shared_between_instances(self):
+        store = self.make_store()
+        store.set('1:default', 'token-1', time.time() + 60)
+        store.set('2:default', 'token-2', time.time() + 60)
+
+        other = self.make_store()
+        self.assertEqual(other.get('1:default'), 'token-1')
+        self.assertEqual(other.get('2:default'), 'token-2')
+
+        other.delete('1:default')
+        self.assertIsNone(store.get('1:default'))
+        self.assertEqual(store.get('2:default'), 'token-2')
+        self.assertIsNone(store.get('3:default'))
+
+    def test_expired_tokens_are_not_returned(self):
+        store = self.make_store()
+        store.set('1:default', 'token-1', time.time() - 1)
+
+        self.assertIsNone(store.get('1:default'))
+
+        store.set('1:default', 'token-2', time.time() + 60)
+        self.assertEqual(store.get('1:default'), 'token-2')
+
+    def test_lock_is_reentrant(self):
+        store = self.make_store()
+
+        with store.lock('1:default'):
+            with store.lock('1:default'):
+                store.set('1:default', 'token-1', time.time() + 60)
+
+            self.assertEqual(store.get('1:default'), 'token-1')
+
+        self.assertEqual(self.make_store().get('1:default'), 'token-1')
+
+    def test_clients_sharing_a_store_authorize_once(self):
+        proxy = FakeProxy()
+        clients = [FakeClient(proxy, self.make_store()) for _ in range(3)]
+
+        for client in clients:
+            client.authorize()
+
+        self.assertEqual(proxy.requests, ['Authorize'])
+        self.assertEqual([client.session_token for client in clients], ['token-1'] * 3)
+
+    def test_concurrent_refreshes_authorize_once(self):
+        proxy = FakeProxy(authorize_delay=0.05)
+        clients = [FakeClient(proxy, self.make_store()) for _ in range(4)]
+        clients[0].authorize()
+        for client in clients[1:]:
+            client.authorize()
+
+        # All clients get a 401 at the same time
+        proxy.expire()
+        barrier = threading.Barrier(len(clients))
+        results = []
+
+        def get_info(client):
+            barrier.wait()
+            results.append(client.server_info())
+
+        threads = [threading.Thread(target=get_info, args=(client, )) for client in clients]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, [{'Version': '1.1.0'}] * len(clients))
+        self.assertEqual(proxy.issued, 2)
+        self.assertEqual(proxy.requests.count('Authorize'), 2)
+        self.assertEqual([client.session_token for client in clients], ['token-2'] * len(clients))
+
+
+class FileTokenStoreTestCase(TokenStoreTestMixin, unittest.TestCase):
+    def make_store(self):
+        return FileTokenStore(os.path.join(self.path, 'tokens.json'))
+
+
+class SqliteTokenStoreTestCase(TokenStoreTestMixin, unittest.TestCase):
+    def make_store(self):
+        return SqliteTokenStore(os.path.join(self.path, 'tokens.sqlite3'))
+
+
+class TokenRefreshTestCase(unittest.TestCase):
+    def setUp(self):
+        path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, path)
+
+        self.proxy = FakeProxy()
+        self.client = FakeClient(self.proxy, FileTokenStore(os.path.join(path, 'tokens.json')))
+        self.client.authorize()
+
+    def test_expired_token_is_refreshed_and_the_request_retried(self):
+        self.proxy.expire()
+        self.proxy.requests = []
+
+        self.assertEqual(self.client.server_info(), {'Version': '1.1.0'})
+        self.assertEqual(self.proxy.requests, ['GetInformation', 'Authorize', 'GetInformation'])
+        self.assertEqual(self.client.session_token, 'token-2')
+        self.assertEqual(self.client.token_store.get('1:default'), 'token-2')
+
+    def test_request_is_retried_only_once(self):
+        # The proxy rejects the new token as well
+        authorize = self.proxy.authorize
+        self.proxy.authorize = lambda: authorize() and 'rejected'
+        self.proxy.expire()
+        self.proxy.requests = []
+
+        self.assertRaises(ElvisException, self.client.server_info)
+        self.assertEqual(self.proxy.requests, ['GetInformation', 'Authorize', 'GetInformation'])
+
+    def test_tokens_are_not_refreshed_without_a_store(self):
+        client = FakeClient(self.proxy, None, session_token='stale')
+        self.proxy.requests = []
+
+        self.assertRaises(ElvisException, client.server_info)
+        self.assertEqual(self.proxy.requests, ['GetInformation'])
@@ -0,0 +1,129 @@
+import json
+import random
+import unittest
+from datetime import datetime, timedelta
+
+import pytz
+
+from elvis.api import ElvisEncoder
+from elvis.utils import (
+    DATE_PREFIX, DATE_SUFFIX, ELVIS_TIMEZONE, decode_elvis_timestamp, decode_many, encode_elvis_timestamp, encode_many,
+    numpy,
+)
+
+
+def encode(value):
+    return json.loads(json.dumps(value, cls=ElvisEncoder))
+
+
+class ElvisTimestampTestCase(unittest.TestCase):
+    def test_naive_datetimes_are_tallinn_wall_clock(self):
+        value = datetime(2021, 7, 7, 12, 30, 15)
+
+        self.assertEqual(encode(value), '/Date(1625661015000+0000)/')
+        self.assertEqual(decode_elvis_timestamp(encode(value)), ELVIS_TIMEZONE.localize(value))
+
+    def test_aware_datetimes_keep_the_instant(self):
+        for value in [
+            pytz.utc.localize(datetime(2021, 7, 7, 9, 30, 15)),
+            pytz.utc.localize(datetime(2021, 1, 15, 23, 59, 59)),
+            ELVIS_TIMEZONE.localize(datetime(2021, 10, 31, 3, 30), is_dst=False),
+            pytz.timezone('America/New_York').localize(datetime(2020, 3, 29, 1, 0)),
+        ]:
+            decoded = decode_elvis_timestamp(encode(value))
+
+            self.assertEqual(decoded, value)
+            self.assertEqual(decoded.tzinfo.zone, ELVIS_TIMEZONE.zone)
+
+    def test_round_trip_of_decoded_timestamps(self):
+        for timestamp in ['/Date(1625646000000+0300)/', '/Date(1610755199000+0200)/', '/Date(0+0000)/']:
+            decoded = decode_elvis_timestamp(timestamp)
+
+            self.assertEqual(decode_elvis_timestamp(encode(decoded)), decoded)
+
+
+def legacy_decode(timestamp):
+    """decode_elvis_timestamp before the regex based codec (with the host timezone fixed to UTC)"""
+    str_timestamp = str(timestamp).strip()
+    if str_timestamp.startswith(DATE_PREFIX) and str_timestamp.endswith(DATE_SUFFIX):
+        milliseconds = str_timestamp[len(DATE_PREFIX):-len(DATE_SUFFIX)]
+        timezone_offset = 0
+        try:
+            if "+" in milliseconds:
+                timezone_offset_string = milliseconds[milliseconds.index("+")+1:]
+                milliseconds = milliseconds[:milliseconds.index("+")]
+                if len(timezone_offset_string) == 4:
+                    timezone_offset = int(timezone_offset_string[:2])*60+int(timezone_offset_string[2:])
+            seconds = int(milliseconds) / 1000
+        except ValueError:
+            return timestamp
+
+        return ELVIS_TIMEZONE.localize(datetime.fromtimestamp(seconds, pytz.utc).astimezone(
+            pytz.FixedOffset(-timezone_offset)
+        ).replace(tzinfo=None))
+
+    return timestamp
+
+
+def legacy_encode(value):
+    """ElvisEncoder datetime encoding before encode_elvis_timestamp"""
+    if value.tzinfo is not None:
+        value = value.astimezone(ELVIS_TIMEZONE).replace(tzinfo=None)
+
+    return '%s%d+0000%s' % (DATE_PREFIX, (value - datetime(1970, 1, 1)).total_seconds() * 1000, DATE_SUFFIX)
+
+
+class ElvisTimestampCodecTestCase(unittest.TestCase):
+    def setUp(self):
+        rng = random.Random(2)
+
+        # Random instants between 1990 and 2040 plus every hour around the 2021 DST transitions
+        self.timestamps = [
+            '/Date(%d+%s)/' % (rng.randint(631152000000, 2208988800000), rng.choice(['0300', '0200', '0000']))
+            for _ in range(2000)
+        ]
+        for transition in [datetime(2021, 3, 28), datetime(2021, 10, 31)]:
+            for hour in range(-3, 6):
+                milliseconds = (transition + timedelta(hours=hour) - datetime(1970, 1, 1)) // timedelta(milliseconds=1)
+                self.timestamps.extend(['/Date(%d+0000)/' % milliseconds, '/Date(%d+0300)/' % milliseconds])
+
+    def test_decode_matches_legacy_codec(self):
+        values = self.timestamps + [
+            '/Date(1625646000000)/', ' /Date(1625646000000+0300)/ ', '/Date(1625646000000+030)/',
+            '/Date(-86400000+0200)/', '/Date(abc)/', '/Date(1625646000000+03xx)/', '/Date()/', 'Date(1)', '', None, 1,
+        ]
+
+        for value in values:
+            self.assertEqual(decode_elvis_timestamp(value), legacy_decode(value), value)
+
+        self.assertEqual(decode_many(values), [legacy_decode(value) for value in values])
+
+    def test_decoded_tzinfo_matches_legacy_codec(self):
+        for value in self.timestamps:
+            self.assertEqual(decode_elvis_timestamp(value).utcoffset(), legacy_decode(value).utcoffset(), value)
+
+    def test_encode_matches_legacy_codec(self):
+        values = [decode_elvis_timestamp(value) for value in self.timestamps]
+        values += [value.astimezone(pytz.utc) for value in values[:100]]
+        values += [value.replace(tzinfo=None) for value in values[:100]]
+
+        for value in values:
+            self.assertEqual(encode_elvis_timestamp(value), legacy_encode(value), value)
+
+        self.assertEqual(encode_many(values), [legacy_encode(value) for value in values])
+
+    @unittest.skipIf(numpy is None, 'numpy is not installed')
+    def test_decode_many_as_numpy(self):
+        values = self.timestamps + ['/Date(abc)/', None]
+        result = decode_many(values, as_numpy=True)
+
+        for value, instant in zip(values, result.tolist()):
+            decoded = legacy_decode(value)
+            if isinstance(decoded, datetime):
+                self.assertEqual(instant, decoded.astimezone(pytz.utc).replace(tzinfo=None), value)
+            else:
+                self.assertIsNone(instant)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import json
+import unittest
+
+from elvis.api import ElvisClient
+
+from . import fixtures
+
+
+class FakeWarehouseClient(ElvisClient):
+    """Answers GetWarehouse from a dict of warehouse id -> data (None for missing warehouses)"""
+
+    def __init__(self, warehouses):
+        super(FakeWarehouseClient, self).__init__('http://localhost/%s', '1', session_token='x')
+        self.warehouses = warehouses
+        self.requests = []
+
+    def _ElvisClient__request(self, endpoint, method, attrs=None):
+        assert endpoint == 'GetWarehouse'
+        self.requests.append(attrs['warehouse_id'])
+
+        # Each response is new data, like a decoded response body
+        data = json.loads(json.dumps(self.warehouses.get(attrs['warehouse_id'])))
+        return {'Success': True, 'raw': {'GetWarehouseResult': data}}
+
+
+class WarehouseCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.client = FakeWarehouseClient({1: fixtures.timber_warehouse(1, n_batches=2), 2: None})
+
+    def test_cached_warehouses_are_reused(self):
+        first = self.client.get_warehouse_cached(1)
+        second = self.client.get_warehouse_cached(1)
+
+        self.assertEqual(self.client.requests, [1])
+        self.assertIsNot(first, second)
+        self.assertEqual(second.Id, 1)
+        self.assertEqual(len(second.TimberBatches), 2)
+
+    def test_other_versions_are_fetched(self):
+        self.client.get_warehouse_cached(1)
+        self.client.get_warehouse_cached(1, version=[0, 0, 0, 0, 0, 0, 0, 2])
+
+        self.assertEqual(self.client.requests, [1, 1])
+
+    def test_missing_warehouses(self):
+        self.assertIsNone(self.client.get_warehouse(2))
+        self.assertIsNone(self.client.get_warehouse_cached(2))
+        self.assertIsNone(self.client.get_warehouse_cached(2))
+        self.assertEqual(self.client.requests, [2, 2, 2])
+        self.assertIsNone(self.client.get_warehouses([2])[0])
+
+    def test_warehouses_that_disappear_are_dropped_from_the_cache(self):
+        self.client.get_warehouse_cached(1)
+        self.client.warehouses[1] = None
+
+        self.assertIsNone(self.client.get_warehouse(1))
+        self.assertIsNone(self.client.get_warehouse_cached(1))
+        self.assertEqual(self.client.requests, [1, 1, 1])
@@ -0,0 +1,245 @@
+import asyncio
+import threading
+import unittest
+from unittest import mock
+
+from elvis.api import ElvisException
+from elvis.enums import TransportOrderStatus, WaybillStatus
+from elvis.models import TransportOrderStatusInfo, WaybillStatusInfo
+from elvis.watcher import TRANSPORT_ORDER, WAYBILL, AsyncStatusWatcher, StatusWatcher
+
+
+class FakeClient(object):
+    """Returns the statuses of documents from dicts of number -> (status, version) or an exception"""
+
+    DEFAULT_WORKERS = 2
+
+    def __init__(self):
+        self.waybills = {}
+        self.transport_orders = {}
+        self.requests = []
+        self.on_request = None  # Called with the kind and numbers before the results are made
+
+    def _get_statuses(self, kind, documents, info_class, numbers):
+        self.requests.append((kind, list(numbers)))
+        if self.on_request is not None:
+            self.on_request(kind, numbers)
+
+        results = []
+        for number in numbers:
+            document = documents[number]
+            if isinstance(document, Exception):
+                results.append(document)
+            else:
+                results.append(info_class(dict_data={'Number': number, 'Status': document[0], 'Version': document[1]}))
+
+        return results
+
+    def get_waybill_statuses(self, numbers, workers=None):
+        return self._get_statuses(WAYBILL, self.waybills, WaybillStatusInfo, numbers)
+
+    def get_transport_order_statuses(self, numbers, workers=None):
+        return self._get_statuses(TRANSPORT_ORDER, self.transport_orders, TransportOrderStatusInfo, numbers)
+
+
+class AsyncFakeClient(FakeClient):
+    async def get_waybill_statuses(self, numbers, workers=None):
+        return super(AsyncFakeClient, self).get_waybill_statuses(numbers)
+
+    async def get_transport_order_statuses(self, numbers, workers=None):
+        return super(AsyncFakeClient, self).get_transport_order_statuses(numbers)
+
+
+class StatusWatcherTestCase(unittest.TestCase):
+    def setUp(self):
+        self.now = 1000.0
+        patcher = mock.patch('elvis.watcher.time.monotonic', lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.client = FakeClient()
+        self.changes = []
+        self.errors = []
+        self.watcher = StatusWatcher(
+            self.client, on_change=self.changes.append, on_error=lambda *args: self.errors.append(args),
+            min_interval=10, max_interval=100, backoff=2,
+            status_max_intervals={WaybillStatus.Confirmed: 40},
+        )
+
+    def poll_due(self):
+        """Move the clock to the next due document and poll it"""
+        self.now += self.watcher.next_poll_in()
+        return self.watcher.poll()
+
+    def test_first_poll_reports_the_status(self):
+        self.client.waybills['W1'] = (WaybillStatus.Composing, [1])
+        self.watcher.watch_waybill('W1')
+
+        self.assertEqual(self.watcher.next_poll_in(), 0)
+        changes = self.watcher.poll()
+
+        self.assertEqual([(x.number, x.previous_status, x.status) for x in changes], [
+            ('W1', None, WaybillStatus.Composing),
+        ])
+        self.assertEqual(self.changes, changes)
+        self.assertEqual(self.watcher.next_poll_in(), 10)
+
+    def test_backoff_is_capped(self):
+        self.client.waybills['W1'] = (WaybillStatus.Composing, [1])
+        self.client.waybills['W2'] = (WaybillStatus.Confirmed, [1])
+        self.watcher.watch_waybill('W1', WaybillStatus.Composing, [1])
+        self.watcher.watch_waybill('W2', WaybillStatus.Confirmed, [1])
+        self.watcher.poll()
+
+        def interval(number):
+            return self.watcher._documents[(WAYBILL, number)].interval
+
+        self.assertEqual((interval('W1'), interval('W2')), (20, 20))
+
+        seen = {'W1': [], 'W2': []}
+        for _ in range(12):
+            for change in self.poll_due():
+                self.fail('Unexpected change %r' % change)
+
+            for number in seen:
+                seen[number].append(interval(number))
+
+        # Composing backs off to max_interval, Confirmed only to its status max interval
+        self.assertEqual(max(seen['W1']), 100)
+        self.assertEqual(max(seen['W2']), 40)
+        self.assertEqual(set(seen['W2']), {40})
+        self.assertEqual(self.changes, [])
+
+    def test_change_resets_the_interval(self):
+        self.client.waybills['W1'] = (WaybillStatus.Composing, [1])
+        self.watcher.watch_waybill('W1', WaybillStatus.Composing, [1])
+        for _ in range(5):
+            self.poll_due()
+
+        self.assertEqual(self.watcher.next_poll_in(), 100)
+
+        self.client.waybills['W1'] = (WaybillStatus.Composing, [2])
+        changes = self.poll_due()
+
+        self.assertEqual([(x.number, x.version) for x in changes], [('W1', [2])])
+        self.assertEqual(self.watcher.next_poll_in(), 10)
+
+    def test_terminal_documents_are_dropped(self):
+        self.client.waybills['W1'] = (WaybillStatus.Confirmed, [1])
+        self.client.transport_orders['T1'] = (TransportOrderStatus.Accepted, [1])
+        self.watcher.watch_waybill('W1', WaybillStatus.Confirmed, [1])
+        self.watcher.watch_transport_order('T1', TransportOrderStatus.Accepted, [1])
+        self.assertFalse(self.watcher.watch_waybill('W2', WaybillStatus.Cancelled))
+
+        self.client.waybills['W1'] = (WaybillStatus.Finalized, [2])
+        changes = self.watcher.poll()
+
+        self.assertEqual([(x.number, x.is_terminal) for x in changes], [('W1', True)])
+        self.assertNotIn((WAYBILL, 'W1'), self.watcher)
+        self.assertIn((TRANSPORT_ORDER, 'T1'), self.watcher)
+        self.assertEqual(len(self.watcher), 1)
+
+        self.client.transport_orders['T1'] = (TransportOrderStatus.Cancelled, [2])
+        self.poll_due()
+        self.assertEqual(len(self.watcher), 0)
+        self.assertIsNone(self.watcher.next_poll_in())
+
+        # run returns right away when nothing is tracked
+        self.watcher.run()
+
+    def test_errors_are_reported_and_retried(self):
+        error = ElvisException('Status not available', None)
+        self.client.waybills['W1'] = error
+        self.watcher.watch_waybill('W1', WaybillStatus.Composing, [1])
+
+        self.assertEqual(self.watcher.poll(), [])
+        self.assertEqual(self.errors, [(WAYBILL, 'W1', error)])
+        self.assertEqual(self.watcher.next_poll_in(), 20)
+
+        self.client.waybills['W1'] = (WaybillStatus.Confirmed, [2])
+        self.assertEqual([x.status for x in self.poll_due()], [WaybillStatus.Confirmed])
+        self.assertEqual(len(self.errors), 1)
+
+    def test_unwatch_during_poll(self):
+        self.client.waybills['W1'] = (WaybillStatus.Composing, [1])
+        self.client.waybills['W2'] = (WaybillStatus.Composing, [1])
+        self.watcher.watch_waybill('W1', WaybillStatus.Composing, [1])
+        self.watcher.watch_waybill('W2', WaybillStatus.Composing, [1])
+
+        self.client.waybills['W1'] = (WaybillStatus.Confirmed, [2])
+        self.client.on_request = lambda kind, numbers: self.watcher.unwatch(WAYBILL, 'W1')
+
+        self.assertEqual(self.watcher.poll(), [])
+        self.assertNotIn((WAYBILL, 'W1'), self.watcher)
+        self.assertEqual(self.watcher.next_poll_in(), 20)
+
+        self.poll_due()
+        self.assertEqual(self.client.requests[-1], (WAYBILL, ['W2']))
+
+    def test_watch_again_during_poll(self):
+        self.client.waybills['W1'] = (WaybillStatus.Composing, [1])
+        self.watcher.watch_waybill('W1', WaybillStatus.Composing, [1])
+        self.client.on_request = lambda kind, numbers: self.watcher.watch_waybill('W1')
+
+        self.watcher.poll()
+
+        # The new watch wins, the document is due right away
+        self.assertEqual(self.watcher.next_poll_in(), 0)
+
+
+class StatusWatcherRunTestCase(unittest.TestCase):
+    def test_watch_while_computing_the_wait_wakes_up(self):
+        client = FakeClient()
+        client.waybills['W1'] = (WaybillStatus.Composing, [1])
+        client.waybills['W2'] = (WaybillStatus.Composing, [1])
+
+        polled = threading.Event()
+        watcher = StatusWatcher(client, on_change=lambda change: polled.set(), min_interval=60, max_interval=60)
+        watcher.watch_waybill('W1', WaybillStatus.Composing, [1])
+        watcher.poll()
+
+        next_poll_in = watcher.next_poll_in
+
+        def watch_after_next_poll_in():
+            # W2 is watched by another thread right after the wait (for W1) has been computed
+            wait = next_poll_in()
+            if (WAYBILL, 'W2') not in watcher:
+                watcher.watch_waybill('W2')
+            return wait
+
+        watcher.next_poll_in = watch_after_next_poll_in
+
+        thread = threading.Thread(target=watcher.run)
+        thread.start()
+        try:
+            self.assertTrue(polled.wait(5), 'W2 was not polled before the wait for W1 ended')
+            self.assertEqual(client.requests[-1], (WAYBILL, ['W2']))
+        finally:
+            watcher.stop()
+            thread.join()
+
+
+class AsyncStatusWatcherTestCase(unittest.TestCase):
+    def test_changes_are_queued(self):
+        client = AsyncFakeClient()
+        client.waybills['W1'] = (WaybillStatus.Confirmed, [1])
+        client.transport_orders['T1'] = (TransportOrderStatus.Accepted, [1])
+
+        async def poll():
+            # The watcher (and its queue) is made inside the loop
+            watcher = AsyncStatusWatcher(client)
+            watcher.watch_waybill('W1', WaybillStatus.Confirmed, [1])
+            watcher.watch_transport_order('T1', TransportOrderStatus.Accepted, [1])
+
+            client.waybills['W1'] = (WaybillStatus.Finalized, [2])
+            return watcher, await watcher.poll()
+
+        loop = asyncio.new_event_loop()
+        try:
+            watcher, changes = loop.run_until_complete(poll())
+        finally:
+            loop.close()
+
+        self.assertEqual([(x.kind, x.number) for x in changes], [(WAYBILL, 'W1')])
+        self.assertIs(watcher.queue.get_nowait(), changes[0])
+        self.assertEqual(len(watcher), 1)
@@ -0,0 +1,132 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from elvis.api import ElvisClient
+from elvis.cache import WaybillCache
+
+from . import fixtures
+
+
+class WaybillCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.path)
+
+    def test_version_hits_and_misses(self):
+        cache = WaybillCache()
+        cache.set('W1', [0, 1], b'one')
+
+        self.assertEqual(cache.get('W1', [0, 1]), b'one')
+        self.assertIsNone(cache.get('W1', [0, 2]))
+        self.assertIsNone(cache.get('W2', [0, 1]))
+        self.assertEqual((cache.hits, cache.misses), (1, 2))
+
+        cache.set('W1', [0, 2], b'two')
+        self.assertEqual(cache.get('W1', [0, 2]), b'two')
+        self.assertIsNone(cache.get('W1', [0, 1]))
+
+        cache.delete('W1')
+        self.assertIsNone(cache.get('W1', [0, 2]))
+        self.assertEqual((cache.hits, cache.misses), (2, 4))
+
+    def test_memory_is_bounded(self):
+        cache = WaybillCache(maxsize=2)
+        cache.set('W1', [1], b'one')
+        cache.set('W2', [1], b'two')
+
+        # W1 is used more recently than W2, so W2 is dropped
+        self.assertEqual(cache.get('W1', [1]), b'one')
+        cache.set('W3', [1], b'three')
+
+        self.assertEqual(len(cache._memory), 2)
+        self.assertIsNone(cache.get('W2', [1]))
+        self.assertEqual(cache.get('W1', [1]), b'one')
+        self.assertEqual(cache.get('W3', [1]), b'three')
+
+    def test_sqlite_is_shared_between_instances(self):
+        path = os.path.join(self.path, 'waybills.sqlite3')
+        cache = WaybillCache(path, maxsize=1)
+        cache.set('W1', [1], b'one')
+        cache.set('W2', [1], b'two')
+
+        # W1 was dropped from memory but is read back from the database
+        self.assertEqual(cache.get('W1', [1]), b'one')
+
+        other = WaybillCache(path)
+        self.assertEqual(other.get('W2', [1]), b'two')
+        self.assertIsNone(other.get('W2', [2]))
+
+        other.delete('W2')
+        other.clear()
+        self.assertIsNone(WaybillCache(path).get('W1', [1]))
+        self.assertEqual((other.hits, other.misses), (1, 1))
+
+
+class FakeWaybillClient(ElvisClient):
+    """Answers GetWaybillStatus and GetWaybill from a dict of number -> waybill data (missing numbers aren't found)"""
+
+    def __init__(self, waybills, **kwargs):
+        super(FakeWaybillClient, self).__init__('http://localhost/%s', '1', session_token='x', **kwargs)
+        self.waybills = waybills
+        self.requests = []
+
+    def _ElvisClient__request(self, endpoint, method, attrs=None):
+        number = attrs['waybill_id']
+        self.requests.append((endpoint, number))
+
+        data = self.waybills.get(number)
+        if endpoint == 'GetWaybillStatus':
+            result = None if data is None else {'Number': number, 'Status': data['Status'], 'Version': data['Version']}
+        else:
+            assert endpoint == 'GetWaybill'
+            # Each response is new data, like a decoded response body
+            result = json.loads(json.dumps(data))
+
+        return {'Success': True, 'raw': {'%sResult' % endpoint: result}}
+
+
+class GetWaybillCachedTestCase(unittest.TestCase):
+    def setUp(self):
+        self.cache = WaybillCache()
+        self.client = FakeWaybillClient({'W1': fixtures.waybill('W1', n_batches=1)}, waybill_cache=self.cache)
+
+    def test_unchanged_waybills_are_not_downloaded(self):
+        first = self.client.get_waybill_cached('W1')
+        second = self.client.get_waybill_cached('W1')
+
+        self.assertEqual(self.client.requests, [
+            ('GetWaybillStatus', 'W1'), ('GetWaybill', 'W1'), ('GetWaybillStatus', 'W1'),
+        ])
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+        self.assertIsNot(first, second)
+        self.assertEqual(second.Number, 'W1')
+        self.assertEqual(len(second.ReceivedAssortments), 1)
+
+    def test_changed_waybills_are_downloaded(self):
+        self.client.get_waybill_cached('W1')
+        self.client.waybills['W1']['Version'] = [0, 0, 0, 0, 0, 1, 2, 4]
+        self.client.waybills['W1']['Status'] = 7003
+
+        waybill = self.client.get_waybill_cached('W1')
+
+        self.assertEqual(waybill.Status, 7003)
+        self.assertEqual(self.client.requests.count(('GetWaybill', 'W1')), 2)
+        self.assertEqual(self.client.get_waybill_cached('W1').Status, 7003)
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 2))
+
+    def test_missing_waybills(self):
+        # The empty status of a missing waybill has the default version []
+        self.assertEqual(self.client.get_waybill_status('W2').Version, [])
+
+        self.assertIsNone(self.client.get_waybill_cached('W2'))
+        self.assertIsNone(self.cache.get('W2', []))
+
+        # A waybill that disappears is dropped from the cache
+        self.client.get_waybill_cached('W1')
+        version = self.client.waybills.pop('W1')['Version']
+
+        self.assertIsNone(self.client.get_waybill_cached('W1'))
+        self.assertIsNone(self.cache.get('W1', version))